@@ -0,0 +1,125 @@
+"""
+So sánh tốc độ các bộ giải trong linsolve.py với cách cài đặt thuần Python
+trước đây (khử Gauss ba vòng lặp của bptt.py, quét Thomas trong spline.py)
+tại n = 10, 100, 1000.
+
+Chạy: python bench_linsolve.py [--batch 1000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from linsolve import solve_banded, solve_cholesky, solve_dense, solve_tridiagonal
+
+
+def gaussian_elimination_py(A, b):
+    """
+    Khử Gauss thuần Python với pivoting (bản cũ của bptt.gaussian_elimination).
+    """
+    n = len(b)
+    M = [row[:] + [b_i] for row, b_i in zip(A, b)]
+    for k in range(n):
+        max_row = max(range(k, n), key=lambda i: abs(M[i][k]))
+        M[k], M[max_row] = M[max_row], M[k]
+        for i in range(k+1, n):
+            factor = M[i][k] / M[k][k]
+            for j in range(k, n+1):
+                M[i][j] -= factor * M[k][j]
+    x = [0]*n
+    for i in range(n-1, -1, -1):
+        s = M[i][n]
+        for j in range(i+1, n):
+            s -= M[i][j] * x[j]
+        x[i] = s / M[i][i]
+    return x
+
+
+def thomas_py(lower, diag, upper, rhs):
+    """
+    Quét Thomas thuần Python (như vòng l, mu, z trong spline.py).
+    """
+    n = len(diag)
+    mu = [0.0]*n
+    z = [0.0]*n
+    mu[0] = upper[0] / diag[0]
+    z[0] = rhs[0] / diag[0]
+    for i in range(1, n):
+        l = diag[i] - lower[i]*mu[i-1]
+        mu[i] = upper[i] / l
+        z[i] = (rhs[i] - lower[i]*z[i-1]) / l
+    x = [0.0]*n
+    x[n-1] = z[n-1]
+    for j in range(n-2, -1, -1):
+        x[j] = z[j] - mu[j]*x[j+1]
+    return x
+
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch', type=int, default=1000,
+                        help="số hệ giải cùng lúc ở chế độ theo lô")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'bài toán':<28}{'n':>6}{'thuần Python (s)':>18}{'linsolve (s)':>15}{'tăng tốc':>10}")
+    for n in (10, 100, 1000):
+        repeat = 1 if n >= 1000 else 5
+        A = rng.normal(size=(n, n)) + n*np.eye(n)
+        b = rng.normal(size=n)
+        A_list, b_list = A.tolist(), b.tolist()
+        S = A @ A.T
+        lower, upper = rng.normal(size=n), rng.normal(size=n)
+        diag = 4 + np.abs(lower) + np.abs(upper)
+        ab = np.vstack([np.roll(upper, 1), diag, np.roll(lower, -1)])
+
+        rows = [
+            ("dense (pivoting)",
+             lambda: gaussian_elimination_py(A_list, b_list),
+             lambda: solve_dense(A, b)),
+            ("cholesky (đối xứng)",
+             lambda: gaussian_elimination_py(S.tolist(), b_list),
+             lambda: solve_cholesky(S, b)),
+            ("ba đường chéo",
+             lambda: thomas_py(lower.tolist(), diag.tolist(), upper.tolist(), b_list),
+             lambda: solve_tridiagonal(lower, diag, upper, b)),
+            ("dải (l=u=1)",
+             lambda: thomas_py(lower.tolist(), diag.tolist(), upper.tolist(), b_list),
+             lambda: solve_banded((1, 1), ab, b)),
+        ]
+        for name, old, new in rows:
+            t_old = best_time(old, repeat)
+            t_new = best_time(new, repeat)
+            print(f"{name:<28}{n:>6}{t_old:>18.6f}{t_new:>15.6f}{t_old/t_new:>9.1f}x")
+
+        # Chế độ theo lô: nhiều hệ cùng kích thước trong một lần gọi
+        m = args.batch if n <= 100 else max(1, args.batch // 100)
+        lo_b, up_b = rng.normal(size=(m, n)), rng.normal(size=(m, n))
+        di_b = 4 + np.abs(lo_b) + np.abs(up_b)
+        rhs_b = rng.normal(size=(m, n))
+        lists = [(lo_b[i].tolist(), di_b[i].tolist(), up_b[i].tolist(), rhs_b[i].tolist())
+                 for i in range(m)]
+        t_old = best_time(lambda: [thomas_py(*args_i) for args_i in lists], repeat)
+        t_new = best_time(lambda: solve_tridiagonal(lo_b, di_b, up_b, rhs_b), repeat)
+        print(f"{f'ba đường chéo x{m} (lô)':<28}{n:>6}{t_old:>18.6f}{t_new:>15.6f}{t_old/t_new:>9.1f}x")
+        if n == 10:
+            A_b = rng.normal(size=(m, n, n)) + n*np.eye(n)
+            b_b = rng.normal(size=(m, n))
+            pairs = [(A_b[i].tolist(), b_b[i].tolist()) for i in range(m)]
+            t_old = best_time(lambda: [gaussian_elimination_py(*p) for p in pairs], 1)
+            t_new = best_time(lambda: solve_dense(A_b, b_b), 1)
+            print(f"{f'dense x{m} (lô)':<28}{n:>6}{t_old:>18.6f}{t_new:>15.6f}{t_old/t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
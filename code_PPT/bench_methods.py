@@ -0,0 +1,364 @@
+"""
+Đo các phương pháp trong code_PPT (Lagrange, Newton phân sai, spline bậc ba
+tự nhiên, bình phương tối thiểu) so với cách src/ dùng scipy/NumPy
+(CubicSpline, np.polyfit, nội suy barycentric của scipy) trên dữ liệu tổng
+hợp có seed: nét vẽ y(x) có nhiễu và đường biên kín (x(t), y(t) theo độ dài
+cung), từ 10 tới 10^6 điểm.
+
+Mỗi dòng kết quả: thời gian khớp, thời gian đánh giá trên lưới --m điểm
+(lấy tốt nhất của vài lần chạy), đỉnh bộ nhớ Python (tracemalloc, một lần
+chạy riêng) và sai khác tương đối lớn nhất so với bản tham chiếu tính cùng
+phép toán (ví dụ cubic_spline_natural với CubicSpline(bc_type='natural')).
+Phương pháp có độ phức tạp cao bị bỏ qua ở cỡ mà thời gian dự đoán vượt
+--budget giây hoặc bộ nhớ dự đoán vượt --max-mem-mb.
+
+Kết quả ghi ra JSON (kèm phiên bản Python/NumPy/SciPy, máy) làm mốc; lần
+sau so với mốc và báo các dòng chậm hơn quá --threshold hoặc sai số tăng.
+Mốc chỉ có nghĩa trên cùng một máy. Chạy offline, chỉ cần CPU.
+
+Chạy:
+    python bench_methods.py --save baseline.json
+    python bench_methods.py --baseline baseline.json [--threshold 0.25]
+    python bench_methods.py --sizes 10 100 1000 --methods spline_natural bptt
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.interpolate import BarycentricInterpolator, CubicSpline
+
+from bptt import evaluate_poly, least_squares_poly
+from larange import BarycentricLagrange, lagrange_interpolation
+from newton import divided_difference, newton_polynomial
+from spline import (cubic_spline_batch, cubic_spline_natural, evaluate_spline,
+                    evaluate_spline_array)
+
+DEFAULT_SIZES = (10, 100, 1000, 10**4, 10**5, 10**6)
+DEGREE = 5
+
+
+# ---- dữ liệu tổng hợp ----
+
+def stroke_data(n, rng):
+    """
+    Nét vẽ y(x): x tăng ngặt (lưới đều có xê dịch), y là tổng vài sóng sin
+    cộng nhiễu tay run. Trả về (x [n], [y [n]]).
+    """
+    h = 10.0 / max(n - 1, 1)
+    x = np.linspace(0, 10, n) + rng.uniform(-0.3, 0.3, n) * h
+    freq = rng.uniform(0.5, 2, 3)
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    y = np.sin(freq[:, None] * x + phase[:, None]).sum(axis=0)
+    return x, [y + rng.normal(0, 0.05, n)]
+
+
+def contour_data(n, rng):
+    """
+    Đường biên kín r(theta) có nhiễu, tham số t là độ dài cung chuẩn hóa
+    về [0, 1] (như smooth_draw_spline_poly). Trả về (t [n], [x [n], y [n]]).
+    """
+    theta = np.linspace(0, 2 * np.pi, n)
+    phase = rng.uniform(0, 2 * np.pi)
+    r = 1 + 0.3 * np.sin(3 * theta) + 0.1 * np.sin(7 * theta + phase)
+    x = r * np.cos(theta) + rng.normal(0, 0.005, n)
+    y = r * np.sin(theta) + rng.normal(0, 0.005, n)
+    step = np.hypot(np.diff(x), np.diff(y))
+    t = np.concatenate([[0], np.cumsum(step)])
+    return t / t[-1], [x, y]
+
+
+DATASETS = {'stroke': stroke_data, 'contour': contour_data}
+
+
+# ---- các phương pháp: fit(x, y) -> mô hình, evaluate(mô hình, lưới) -> giá trị ----
+
+def _scipy_natural(x, y):
+    return CubicSpline(x, y, bc_type='natural')
+
+
+def _polyfit(x, y):
+    return np.poly1d(np.polyfit(x, y, DEGREE))
+
+
+class Method:
+    """
+    Một phương pháp cần đo: hàm khớp, hàm đánh giá, tên phương pháp tham
+    chiếu tính cùng phép toán (None: chính nó là tham chiếu), bậc tăng thời
+    gian theo n (để dự đoán cỡ tiếp theo) và ước lượng bộ nhớ (byte) theo
+    (n, m).
+    """
+
+    def __init__(self, name, fit, evaluate, reference=None, order=1, memory=None):
+        self.name = name
+        self.fit = fit
+        self.evaluate = evaluate
+        self.reference = reference
+        self.order = order
+        self.memory = memory or (lambda n, m: 0)
+
+
+def _call(model, q):
+    return model(q)
+
+
+METHODS = {m.name: m for m in [
+    # code_PPT, thuần Python
+    Method('lagrange', lambda x, y: (x.tolist(), y.tolist()),
+           lambda model, q: np.array([lagrange_interpolation(*model, v) for v in q.tolist()]),
+           reference='scipy_barycentric', order=2),
+    Method('newton', lambda x, y: (x.tolist(), divided_difference(x.tolist(), y.tolist())),
+           lambda model, q: newton_polynomial(model[0], model[1], q),
+           reference='scipy_barycentric', order=2),
+    Method('spline_natural',
+           lambda x, y: (x.tolist(), cubic_spline_natural(x.tolist(), y.tolist())),
+           lambda model, q: np.array([evaluate_spline(model[0], model[1], v)
+                                      for v in q.tolist()]),
+           reference='scipy_natural'),
+    Method('bptt', lambda x, y: least_squares_poly(x, y, DEGREE),
+           lambda model, q: evaluate_poly(model, q),
+           reference='np_polyfit'),
+    # code_PPT, bản NumPy
+    Method('lagrange_barycentric', BarycentricLagrange, _call,
+           reference='scipy_barycentric', order=2,
+           memory=lambda n, m: 8 * (2 * n * n + 3 * n * m)),
+    Method('spline_batch', lambda x, y: (x, cubic_spline_batch(x, y)),
+           lambda model, q: evaluate_spline_array(model[0], model[1], q),
+           reference='scipy_natural'),
+    # Tham chiếu (cách src/ dùng scipy/NumPy)
+    Method('scipy_barycentric', BarycentricInterpolator, _call, order=2,
+           memory=lambda n, m: 8 * 3 * n * m),
+    Method('scipy_natural', _scipy_natural, _call),
+    Method('scipy_cubicspline', CubicSpline, _call),
+    Method('np_polyfit', _polyfit, _call),
+]}
+
+
+# ---- đo ----
+
+def best_time(fn, min_total=0.2, max_repeat=5):
+    """
+    Chạy fn cho tới khi tổng thời gian >= min_total giây hoặc đủ max_repeat
+    lần; trả về (thời gian nhỏ nhất, kết quả lần cuối).
+    """
+    best, total, runs = float('inf'), 0.0, 0
+    while runs < max_repeat and (runs == 0 or total < min_total):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best, total, runs = min(best, elapsed), total + elapsed, runs + 1
+    return best, result
+
+
+def peak_memory_mb(fn):
+    """Đỉnh bộ nhớ cấp phát (MB) của một lần chạy fn, đo bằng tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def run_method(method, t, values, grid, measure_memory=True):
+    """
+    Khớp và đánh giá method cho từng dãy giá trị (một với nét, x và y với
+    đường biên). Trả về dict thời gian, bộ nhớ và giá trị trên lưới [số dãy, m].
+    """
+    fit_s, eval_s, out = 0.0, 0.0, []
+    with np.errstate(all='ignore'):
+        for y in values:
+            dt, model = best_time(lambda: method.fit(t, y))
+            fit_s += dt
+            dt, result = best_time(lambda: method.evaluate(model, grid))
+            eval_s += dt
+            out.append(np.asarray(result, dtype=float))
+        peak = None
+        if measure_memory:
+            peak = max(peak_memory_mb(lambda: method.evaluate(method.fit(t, y), grid))
+                       for y in values)
+    return {'fit_s': fit_s, 'eval_s': eval_s, 'peak_mb': peak, 'values': np.array(out)}
+
+
+def relative_error(values, reference):
+    """Sai khác lớn nhất so với tham chiếu, chia cho độ lớn của tham chiếu."""
+    with np.errstate(all='ignore'):
+        scale = max(1.0, float(np.nanmax(np.abs(reference))))
+        err = float(np.max(np.abs(values - reference))) / scale
+    return err if math.isfinite(err) else float('inf')
+
+
+def run_suite(sizes, methods, datasets, m=1000, seed=0, budget=10.0, max_mem_mb=1024,
+              measure_memory=True, log=print):
+    """
+    Chạy mọi tổ hợp (dữ liệu, n, phương pháp). Dữ liệu của mỗi (dữ liệu, n)
+    sinh từ seed cố định. Trả về danh sách dòng kết quả (dict, sẵn để ghi JSON).
+    """
+    rows = []
+    for dataset in datasets:
+        last = {}  # phương pháp -> (n, tổng thời gian) lần đo gần nhất
+        for n in sizes:
+            rng = np.random.default_rng([seed, n, list(DATASETS).index(dataset)])
+            t, values = DATASETS[dataset](n, rng)
+            grid = np.linspace(t[0], t[-1], m)
+            measured = {}
+            # Đo tham chiếu trước để tính sai số cho các phương pháp còn lại
+            needed = [name for name in methods if name in METHODS]
+            needed += [METHODS[name].reference for name in needed
+                       if METHODS[name].reference and METHODS[name].reference not in needed]
+            order = sorted(needed, key=lambda name: METHODS[name].reference is not None)
+            for name in order:
+                method = METHODS[name]
+                row = {'dataset': dataset, 'n': n, 'method': name, 'reference': method.reference}
+                skip = None
+                if name in last:
+                    prev_n, prev_s = last[name]
+                    if prev_s is None:
+                        skip = "đã bỏ qua hoặc lỗi ở cỡ nhỏ hơn"
+                    elif prev_s * (n / prev_n) ** method.order > budget:
+                        skip = f"dự kiến {prev_s * (n / prev_n) ** method.order:.0f}s > {budget:g}s"
+                if skip is None and method.memory(n, m) / 2 ** 20 > max_mem_mb:
+                    skip = f"dự kiến {method.memory(n, m) / 2 ** 20:.0f} MB > {max_mem_mb:g} MB"
+                if skip is not None:
+                    row['skipped'] = skip
+                    last[name] = (n, None)
+                    if name in methods:
+                        rows.append(row)
+                    continue
+                try:
+                    result = run_method(method, t, values, grid, measure_memory)
+                except Exception as e:
+                    row['error'] = f"{type(e).__name__}: {e}"
+                    last[name] = (n, None)
+                    if name in methods:
+                        rows.append(row)
+                        log(format_row(row))
+                    continue
+                measured[name] = result['values']
+                last[name] = (n, result['fit_s'] + result['eval_s'])
+                row.update(fit_s=result['fit_s'], eval_s=result['eval_s'],
+                           peak_mb=result['peak_mb'])
+                if method.reference in measured:
+                    row['max_rel_err'] = relative_error(result['values'],
+                                                        measured[method.reference])
+                if name in methods:
+                    rows.append(row)
+                    log(format_row(row))
+    return rows
+
+
+def format_row(row):
+    name = f"{row['dataset']:<8}{row['n']:>9}  {row['method']:<22}"
+    if 'skipped' in row:
+        return f"{name}bỏ qua ({row['skipped']})"
+    if 'error' in row:
+        return f"{name}lỗi ({row['error']})"
+    peak = f"{row['peak_mb']:9.1f}" if row.get('peak_mb') is not None else f"{'-':>9}"
+    err = f"{row['max_rel_err']:11.2e}" if 'max_rel_err' in row else f"{'-':>11}"
+    return f"{name}{row['fit_s'] * 1000:12.3f}{row['eval_s'] * 1000:12.3f}{peak}{err}"
+
+
+HEADER = (f"{'dữ liệu':<8}{'n':>9}  {'phương pháp':<22}{'khớp ms':>12}{'đánh giá ms':>12}"
+          f"{'đỉnh MB':>9}{'sai số':>11}")
+
+
+def machine_info():
+    import scipy
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count()}
+
+
+def compare(rows, baseline, threshold=0.25, min_delta_s=5e-4):
+    """
+    So với mốc: một dòng bị báo nếu thời gian khớp hoặc đánh giá lớn hơn mốc
+    quá threshold (và chênh hơn min_delta_s giây, tránh nhiễu ở cỡ nhỏ),
+    sai số tương đối tăng quá 2 lần (cộng 1e-12), hoặc dòng đo được ở mốc
+    nay bị bỏ qua. Trả về danh sách (dòng, lý do).
+    """
+    base = {(r['dataset'], r['n'], r['method']): r for r in baseline['results']}
+    flagged = []
+    for row in rows:
+        old = base.get((row['dataset'], row['n'], row['method']))
+        if old is None or 'skipped' in old or 'error' in old:
+            continue
+        if 'skipped' in row or 'error' in row:
+            flagged.append((row, row.get('error') or "bị bỏ qua, mốc đo được"))
+            continue
+        for key in ('fit_s', 'eval_s'):
+            if row[key] > old[key] * (1 + threshold) and row[key] - old[key] > min_delta_s:
+                flagged.append((row, f"{key} {old[key] * 1000:.3f} -> {row[key] * 1000:.3f} ms "
+                                     f"(+{(row[key] / old[key] - 1) * 100:.0f}%)"))
+        if 'max_rel_err' in row and 'max_rel_err' in old:
+            if row['max_rel_err'] > 2 * old['max_rel_err'] + 1e-12:
+                flagged.append((row, f"sai số {old['max_rel_err']:.2e} -> "
+                                     f"{row['max_rel_err']:.2e}"))
+    return flagged
+
+
+def _json_float(value):
+    # JSON không có inf/nan: ghi thành chuỗi
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=list(METHODS))
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument('--m', type=int, default=1000, help="số điểm lưới đánh giá")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help="bỏ qua cỡ mà thời gian dự đoán của một phương pháp vượt N giây")
+    parser.add_argument('--max-mem-mb', type=float, default=1024)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="không đo bộ nhớ (bỏ lần chạy tracemalloc)")
+    parser.add_argument('--save', default=None, help="ghi kết quả ra file JSON (làm mốc)")
+    parser.add_argument('--baseline', default=None, help="so với file mốc JSON")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="tỉ lệ chậm hơn mốc bị coi là thụt lùi (mặc định 0.25)")
+    args = parser.parse_args(argv)
+
+    print(HEADER)
+    rows = run_suite(args.sizes, args.methods, args.datasets, args.m, args.seed,
+                     args.budget, args.max_mem_mb, not args.no_memory)
+    for row in rows:
+        if 'skipped' in row:
+            print(format_row(row))
+
+    report = {'meta': dict(machine_info(), seed=args.seed, m=args.m, degree=DEGREE,
+                           sizes=args.sizes, budget=args.budget),
+              'results': [{k: _json_float(v) for k, v in row.items()} for row in rows]}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"Đã ghi {len(rows)} dòng kết quả: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for row in baseline['results']:
+            if isinstance(row.get('max_rel_err'), str):
+                row['max_rel_err'] = float(row['max_rel_err'])
+        if baseline['meta'].get('platform') != report['meta']['platform']:
+            print("Lưu ý: mốc được đo trên máy khác, so sánh thời gian không đáng tin.")
+        flagged = compare(rows, baseline, args.threshold)
+        for row, reason in flagged:
+            print(f"THỤT LÙI  {row['dataset']} n={row['n']} {row['method']}: {reason}")
+        print(f"{len(flagged)} dòng thụt lùi so với {args.baseline} "
+              f"(ngưỡng {args.threshold * 100:.0f}%)")
+        return 1 if flagged else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
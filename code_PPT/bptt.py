@@ -1,6 +1,10 @@
 import re
 import math
 
+import numpy as np
+
+from linsolve import solve_cholesky, solve_dense
+
 
 def parse_input_list(prompt):
     """
@@ -23,26 +27,73 @@ def gaussian_elimination(A, b):
     A: ma trận kích thước n x n, b: vector độ dài n.
     Trả về vector x.
     """
-    n = len(b)
-    # Gộp b vào A
-    M = [row[:] + [b_i] for row, b_i in zip(A, b)]
-    for k in range(n):
-        # pivot
-        max_row = max(range(k, n), key=lambda i: abs(M[i][k]))
-        M[k], M[max_row] = M[max_row], M[k]
-        # eliminate
-        for i in range(k+1, n):
-            factor = M[i][k] / M[k][k]
-            for j in range(k, n+1):
-                M[i][j] -= factor * M[k][j]
-    # back substitution
-    x = [0]*n
-    for i in range(n-1, -1, -1):
-        s = M[i][n]
-        for j in range(i+1, n):
-            s -= M[i][j] * x[j]
-        x[i] = s / M[i][i]
-    return x
+    return [float(v) for v in solve_dense(A, b)]
+
+
+class LeastSquaresAccumulator:
+    """
+    Bộ tích lũy cho bình phương tối thiểu bậc 'degree'.
+    Chỉ giữ các thống kê đủ:
+        S[k] = sum x^k       (k = 0..2*degree)
+        T[k] = sum x^k * y   (k = 0..degree)
+    nên bộ nhớ không phụ thuộc số điểm. Dữ liệu được cộng dồn theo từng
+    khối bằng NumPy, hai bộ tích lũy (ví dụ từ hai tiến trình) có thể gộp
+    lại, và có thể giải ra hệ số bất cứ lúc nào mà không duyệt lại dữ liệu.
+    """
+
+    def __init__(self, degree, chunk_size=65536):
+        self.degree = degree
+        self.chunk_size = chunk_size
+        self.S = np.zeros(2*degree + 1)
+        self.T = np.zeros(degree + 1)
+
+    @property
+    def count(self):
+        return int(self.S[0])
+
+    def update(self, x_vals, y_vals):
+        """
+        Cộng thêm các điểm (x_vals, y_vals) vào thống kê.
+        """
+        x_vals = np.asarray(x_vals, dtype=float).ravel()
+        y_vals = np.asarray(y_vals, dtype=float).ravel()
+        if x_vals.shape != y_vals.shape:
+            raise ValueError("x_vals và y_vals phải cùng độ dài.")
+        m = self.degree
+        for start in range(0, len(x_vals), self.chunk_size):
+            x = x_vals[start:start + self.chunk_size]
+            y = y_vals[start:start + self.chunk_size]
+            powers = np.vander(x, 2*m + 1, increasing=True)
+            self.S += powers.sum(axis=0)
+            self.T += y @ powers[:, :m + 1]
+        return self
+
+    def merge(self, other):
+        """
+        Gộp thống kê của một bộ tích lũy khác (cùng bậc) vào bộ này.
+        """
+        if other.degree != self.degree:
+            raise ValueError("Chỉ gộp được hai bộ tích lũy cùng bậc.")
+        self.S += other.S
+        self.T += other.T
+        return self
+
+    def solve(self):
+        """
+        Giải hệ phương trình chuẩn, trả về list hệ số coeffs độ dài degree+1.
+        """
+        m = self.degree
+        if self.count < m + 1:
+            raise ValueError(f"Cần ít nhất {m + 1} điểm cho đa thức bậc {m}.")
+        # Ma trận hệ số (m+1)x(m+1), đối xứng: A[i][j] = S[i+j]
+        idx = np.arange(m+1)
+        A = self.S[idx[:, None] + idx[None, :]]
+        try:
+            coeffs = solve_cholesky(A, self.T)
+        except ValueError:
+            # Dữ liệu suy biến (ví dụ nhiều x trùng nhau): dùng pivoting
+            coeffs = solve_dense(A, self.T)
+        return [float(c) for c in coeffs]
 
 
 def least_squares_poly(x_vals, y_vals, degree):
@@ -51,17 +102,7 @@ def least_squares_poly(x_vals, y_vals, degree):
     Trả về list hệ số coeffs độ dài degree+1 sao cho
     P(x) = coeffs[0] + coeffs[1]*x + ... + coeffs[degree]*x^degree.
     """
-    n = len(x_vals)
-    m = degree
-    # Tính các tổng x^k
-    S = [sum(x**k for x in x_vals) for k in range(2*m+1)]
-    # Tính các tổng x^k * y
-    T = [sum((x_vals[i]**k) * y_vals[i] for i in range(n)) for k in range(m+1)]
-    # Ma trận hệ số (m+1)x(m+1)
-    A = [[S[i+j] for j in range(m+1)] for i in range(m+1)]
-    b = T[:]  # vector bên phải
-    coeffs = gaussian_elimination(A, b)
-    return coeffs
+    return LeastSquaresAccumulator(degree).update(x_vals, y_vals).solve()
 
 
 def evaluate_poly(coeffs, x):
@@ -1,6 +1,8 @@
 import math
 import re
 
+import numpy as np
+
 
 def parse_function(prompt):
     """
@@ -46,6 +48,82 @@ def lagrange_interpolation(x_vals, y_vals, x_eval):
     return result
 
 
+class BarycentricLagrange:
+    """
+    Nội suy Lagrange dạng barycentric.
+    Trọng số w_j = 1 / prod_{k != j} (x_j - x_k) được tính một lần, O(n^2);
+    sau đó mỗi điểm cần nội suy chỉ tốn O(n) và có thể tính cho cả mảng:
+        P(x) = sum(w_j*y_j/(x - x_j)) / sum(w_j/(x - x_j)).
+    Thêm một node mới chỉ cập nhật trọng số trong O(n).
+    Như scipy, các hiệu x_j - x_k được nhân với 4 / (max x - min x) trước
+    khi lấy tích (cùng hệ số cho mọi j nên P(x) không đổi); nếu không, tích
+    n - 1 hiệu tràn số hoặc về 0 khi n lớn hay khoảng quá rộng/hẹp.
+    """
+
+    def __init__(self, x_vals, y_vals):
+        self.x = np.asarray(x_vals, dtype=float).copy()
+        self.y = np.asarray(y_vals, dtype=float).copy()
+        if self.x.shape != self.y.shape or self.x.ndim != 1:
+            raise ValueError("x_vals và y_vals phải là hai dãy cùng độ dài.")
+        if len(np.unique(self.x)) != len(self.x):
+            raise ValueError("Các node x_i phải khác nhau.")
+        width = np.ptp(self.x) if len(self.x) else 0.0
+        # Hệ số co giãn các hiệu, giữ nguyên khi thêm node
+        self.x_scale = 4.0 / width if width > 0 else 1.0
+        diff = (self.x[:, None] - self.x[None, :]) * self.x_scale
+        np.fill_diagonal(diff, 1.0)
+        self.w = 1.0 / np.prod(diff, axis=1)
+        # self.w lưu trọng số (của các hiệu đã co giãn) chia cho exp(self.log_scale)
+        self.log_scale = 0.0
+        self._rescale()
+
+    def _rescale(self, log_new=None):
+        # Chia mọi w_j cho cùng một hằng số (không đổi P(x)) để max |w_j| = 1;
+        # log_new: log |w| của node vừa thêm, đặt vào self.w[-1] sau khi chia
+        logs = [np.log(np.max(np.abs(self.w)))] if np.any(self.w) else []
+        if log_new is not None:
+            logs.append(log_new)
+        if logs:
+            shift = max(logs)
+            self.w *= np.exp(-shift)
+            self.log_scale += shift
+            if log_new is not None:
+                self.w[-1] = np.exp(log_new - shift)
+
+    def add_node(self, x_new, y_new):
+        """
+        Thêm node (x_new, y_new), cập nhật trọng số trong O(n).
+        """
+        x_new = float(x_new)
+        if np.any(self.x == x_new):
+            raise ValueError(f"Node x = {x_new} đã tồn tại.")
+        diff = (self.x - x_new) * self.x_scale
+        # w_new = 1 / prod(-diff), tính theo log để tích không tràn số
+        sign = -1.0 if np.count_nonzero(diff > 0) % 2 else 1.0
+        log_new = -np.sum(np.log(np.abs(diff))) - self.log_scale
+        self.w = np.append(self.w / diff, 0.0)
+        self.x = np.append(self.x, x_new)
+        self.y = np.append(self.y, float(y_new))
+        self._rescale(log_new)
+        self.w[-1] *= sign
+
+    def __call__(self, x_eval):
+        """
+        Tính P(x_eval); x_eval là số hoặc mảng.
+        Điểm trùng node trả về đúng y_i tương ứng.
+        """
+        q = np.asarray(x_eval, dtype=float)
+        flat = q.reshape(-1)
+        diff = flat[:, None] - self.x[None, :]
+        exact = diff == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            temp = self.w / diff
+            result = (temp @ self.y) / temp.sum(axis=1)
+        hit_row, hit_col = np.nonzero(exact)
+        result[hit_row] = self.y[hit_col]
+        return result.reshape(q.shape)
+
+
 if __name__ == "__main__":
     print("=== Nội suy Lagrange tổng quát ===")
     # Nhập biểu thức hàm
@@ -68,9 +146,11 @@ if __name__ == "__main__":
 
     # Nhập điểm cần nội suy
     x_eval_list = parse_values("Nhập giá trị x cần nội suy (có thể nhập nhiều): ")
-    for x_eval in x_eval_list:
-        try:
-            P = lagrange_interpolation(x_vals, y_vals, x_eval)
-            print(f"P({x_eval}) = {P:.10f}")
-        except Exception as e:
-            print("Lỗi khi tính nội suy cho x =", x_eval, ":", e)
+    try:
+        interp = BarycentricLagrange(x_vals, y_vals)
+        P_vals = interp(x_eval_list)
+    except Exception as e:
+        print("Lỗi khi tính nội suy:", e)
+        exit(1)
+    for x_eval, P in zip(x_eval_list, P_vals):
+        print(f"P({x_eval}) = {P:.10f}")
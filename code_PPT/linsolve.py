@@ -0,0 +1,210 @@
+"""
+Các bộ giải hệ tuyến tính dùng chung cho code_PPT (bptt.py, spline.py).
+
+Mọi hàm đều nhận mảng NumPy và hỗ trợ chế độ theo lô: thêm các chiều ở đầu
+(A kích thước [..., n, n], b kích thước [..., n]) để giải nhiều hệ cùng
+kích thước trong một lần gọi.
+  - solve_dense:       khử Gauss với pivoting từng phần.
+  - solve_cholesky:    phân tích Cholesky cho hệ đối xứng xác định dương
+                       (ví dụ hệ phương trình chuẩn của bình phương tối thiểu).
+  - solve_tridiagonal: hệ ba đường chéo, O(n).
+  - solve_banded:      hệ dải tổng quát (lưu trữ kiểu LAPACK), O(n).
+"""
+import numpy as np
+
+
+def _as_batch(A, b):
+    # Đưa A về [B, n, n] và b về [B, n], trả kèm hình dạng gốc của b
+    A = np.asarray(A, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = A.shape[-1]
+    if A.shape[-2] != n or b.shape[-1] != n:
+        raise ValueError("A phải vuông và cùng kích thước với b.")
+    shape = np.broadcast_shapes(A.shape[:-2], b.shape[:-1]) + (n,)
+    A = np.broadcast_to(A, shape + (n,)).reshape(-1, n, n)
+    b = np.broadcast_to(b, shape).reshape(-1, n)
+    return A, b, shape
+
+
+def _back_substitution(U, y):
+    """
+    Giải U x = y với U tam giác trên, theo lô [B, n, n].
+    """
+    n = y.shape[-1]
+    x = np.empty_like(y)
+    for i in range(n-1, -1, -1):
+        s = y[:, i] - np.einsum('bj,bj->b', U[:, i, i+1:], x[:, i+1:])
+        x[:, i] = s / U[:, i, i]
+    return x
+
+
+def solve_dense(A, b):
+    """
+    Giải Ax = b bằng khử Gauss với pivoting từng phần.
+    Mỗi bước khử cập nhật cả khối con bên dưới cùng lúc (và cho cả lô),
+    chỉ vòng lặp theo cột pivot là vòng lặp Python.
+    """
+    A, b, shape = _as_batch(A, b)
+    B, n = b.shape
+    M = np.concatenate([A, b[:, :, None]], axis=2)
+    rows = np.arange(B)
+    for k in range(n):
+        # pivot
+        piv = k + np.argmax(np.abs(M[:, k:, k]), axis=1)
+        if np.any(M[rows, piv, k] == 0):
+            raise ValueError("Ma trận suy biến, không giải được hệ.")
+        top = M[rows, piv].copy()
+        M[rows, piv] = M[:, k]
+        M[:, k] = top
+        # eliminate
+        factor = M[:, k+1:, k] / M[:, k, k][:, None]
+        M[:, k+1:, k:] -= factor[:, :, None] * M[:, None, k, k:]
+    return _back_substitution(M[:, :, :n], M[:, :, n]).reshape(shape)
+
+
+def solve_cholesky(A, b):
+    """
+    Giải Ax = b với A đối xứng xác định dương: A = L L^T,
+    sau đó thế tiến L y = b và thế lùi L^T x = y.
+    """
+    A, b, shape = _as_batch(A, b)
+    B, n = b.shape
+    L = np.zeros_like(A)
+    for j in range(n):
+        d = A[:, j, j] - np.einsum('bk,bk->b', L[:, j, :j], L[:, j, :j])
+        if np.any(d <= 0):
+            raise ValueError("Ma trận không xác định dương.")
+        L[:, j, j] = np.sqrt(d)
+        L[:, j+1:, j] = (A[:, j+1:, j]
+                         - np.einsum('bik,bk->bi', L[:, j+1:, :j], L[:, j, :j])
+                         ) / L[:, j, j][:, None]
+    y = np.empty_like(b)
+    for i in range(n):
+        s = b[:, i] - np.einsum('bj,bj->b', L[:, i, :i], y[:, :i])
+        y[:, i] = s / L[:, i, i]
+    return _back_substitution(np.swapaxes(L, 1, 2), y).reshape(shape)
+
+
+def solve_tridiagonal(lower, diag, upper, rhs):
+    """
+    Giải hệ ba đường chéo, có thể theo lô: các mảng có kích thước [..., n],
+    mỗi hàng cuối là một hệ độc lập. lower[..., 0] và upper[..., -1] bị bỏ qua.
+    Lô nhỏ dùng khử vòng song song (log2(n) bước trên cả mảng),
+    lô lớn dùng quét Thomas với mỗi bước vector hóa theo chiều lô.
+    Ma trận cần chéo trội (đúng với hệ spline) để phép khử ổn định.
+    """
+    diag = np.asarray(diag, dtype=float)
+    n = diag.shape[-1]
+    batch = diag.size // n if n else 0
+    if batch >= _THOMAS_MIN_BATCH:
+        return _thomas_batch(lower, diag, upper, rhs)
+    return _cyclic_reduction(lower, diag, upper, rhs)
+
+
+# Từ kích thước lô này trở lên, quét Thomas theo lô nhanh hơn khử vòng
+_THOMAS_MIN_BATCH = 32
+
+
+def _thomas_batch(lower, diag, upper, rhs):
+    """
+    Quét Thomas: vòng lặp theo n, mỗi bước tính đồng thời cho cả lô.
+    """
+    shape = np.shape(rhs)
+    n = shape[-1]
+    # Đưa chiều n lên đầu để mỗi bước quét đọc một hàng liên tục
+    L = np.ascontiguousarray(np.reshape(lower, (-1, n)).T, dtype=float)
+    D = np.ascontiguousarray(np.reshape(diag, (-1, n)).T, dtype=float)
+    U = np.ascontiguousarray(np.reshape(upper, (-1, n)).T, dtype=float)
+    R = np.ascontiguousarray(np.reshape(rhs, (-1, n)).T, dtype=float)
+    cp = np.empty_like(D)
+    dp = np.empty_like(R)
+    cp[0] = U[0] / D[0]
+    dp[0] = R[0] / D[0]
+    for i in range(1, n):
+        den = D[i] - L[i] * cp[i-1]
+        cp[i] = U[i] / den
+        dp[i] = (R[i] - L[i] * dp[i-1]) / den
+    for i in range(n-2, -1, -1):
+        dp[i] -= cp[i] * dp[i+1]
+    return dp.T.reshape(shape)
+
+
+def _cyclic_reduction(lower, diag, upper, rhs):
+    """
+    Khử vòng song song (parallel cyclic reduction): mỗi bước là vài phép
+    toán trên cả mảng, chỉ cần khoảng log2(n) bước.
+    """
+    diag = np.array(diag, dtype=float)
+    rhs = np.array(rhs, dtype=float)
+    lower = np.array(lower, dtype=float)
+    upper = np.array(upper, dtype=float)
+    lower[..., 0] = 0.0
+    upper[..., -1] = 0.0
+    n = diag.shape[-1]
+
+    def shift(arr, s, fill):
+        # shift(arr, s)[..., i] = arr[..., i - s], ngoài biên điền fill
+        out = np.full_like(arr, fill)
+        if s > 0:
+            out[..., s:] = arr[..., :-s]
+        else:
+            out[..., :s] = arr[..., -s:]
+        return out
+
+    stride = 1
+    while stride < n:
+        alpha = -lower / shift(diag, stride, 1.0)
+        gamma = -upper / shift(diag, -stride, 1.0)
+        new_diag = (diag + alpha * shift(upper, stride, 0.0)
+                    + gamma * shift(lower, -stride, 0.0))
+        rhs = (rhs + alpha * shift(rhs, stride, 0.0)
+               + gamma * shift(rhs, -stride, 0.0))
+        lower = alpha * shift(lower, stride, 0.0)
+        upper = gamma * shift(upper, -stride, 0.0)
+        diag = new_diag
+        stride *= 2
+    return rhs / diag
+
+
+def solve_banded(l_and_u, ab, b):
+    """
+    Giải hệ dải với l đường chéo dưới và u đường chéo trên.
+    ab lưu theo kiểu LAPACK (như scipy.linalg.solve_banded):
+        ab[..., u + i - j, j] = A[i, j],  kích thước [..., l+u+1, n].
+    Khử Gauss không pivoting trong dải, O(n*l*u); cần A chéo trội hoặc
+    đối xứng xác định dương (đúng với các hệ spline).
+    """
+    l, u = l_and_u
+    ab = np.asarray(ab, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = ab.shape[-1]
+    if l == 1 and u == 1:
+        lower = np.zeros(ab.shape[:-2] + (n,))
+        upper = np.zeros(ab.shape[:-2] + (n,))
+        lower[..., 1:] = ab[..., 2, :-1]
+        upper[..., :-1] = ab[..., 0, 1:]
+        lower, diag, upper, b = np.broadcast_arrays(lower, ab[..., 1, :],
+                                                    upper, b)
+        return solve_tridiagonal(lower, diag, upper, b)
+    shape = np.broadcast_shapes(ab.shape[:-2], b.shape[:-1]) + (n,)
+    ab = np.broadcast_to(ab, shape[:-1] + ab.shape[-2:]).reshape(-1, l+u+1, n)
+    x = np.broadcast_to(b, shape).reshape(-1, n).copy()
+    # Lưu theo hàng: R[:, i, d] = A[i, i + d - l]
+    R = np.zeros((x.shape[0], n, l+u+1))
+    for d in range(l+u+1):
+        off = d - l
+        lo, hi = max(0, -off), max(0, min(n, n - off))
+        R[:, lo:hi, d] = ab[:, u - off, lo+off:hi+off]
+    for k in range(n):
+        piv = R[:, k, l]
+        if np.any(piv == 0):
+            raise ValueError("Gặp pivot bằng 0 khi khử hệ dải.")
+        for i in range(1, min(l, n-1-k) + 1):
+            f = R[:, k+i, l-i] / piv
+            R[:, k+i, l-i:l-i+u+1] -= f[:, None] * R[:, k, l:l+u+1]
+            x[:, k+i] -= f * x[:, k]
+    for k in range(n-1, -1, -1):
+        w = min(u, n-1-k)
+        s = np.einsum('bj,bj->b', R[:, k, l+1:l+1+w], x[:, k+1:k+1+w])
+        x[:, k] = (x[:, k] - s) / R[:, k, l]
+    return x.reshape(shape)
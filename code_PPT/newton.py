@@ -1,5 +1,7 @@
 import re
 
+import numpy as np
+
 
 def parse_input_list(prompt):
     """
@@ -45,6 +47,52 @@ def newton_polynomial(x, coef, x_eval):
     return result
 
 
+class NewtonInterpolator:
+    """
+    Nội suy Newton phân sai dạng tăng dần cho dữ liệu đến từng điểm.
+    Lưu đường chéo cuối của bảng phân sai
+        diag = [f[x_k], f[x_{k-1}, x_k], ..., f[x_0, ..., x_k]]
+    nên thêm một node chỉ tốn O(n), không cần tính lại cả bảng.
+    """
+
+    def __init__(self, x=(), y=()):
+        self.x = []
+        self.coef = []
+        self._diag = []
+        for xi, yi in zip(x, y):
+            self.add_point(xi, yi)
+
+    def add_point(self, x_new, y_new):
+        """
+        Thêm node (x_new, y_new), cập nhật hệ số trong O(n).
+        """
+        x_new = float(x_new)
+        diag = [float(y_new)]
+        k = len(self.x)
+        for j in range(1, k + 1):
+            dx = x_new - self.x[k - j]
+            if dx == 0:
+                raise ValueError(f"Node x = {x_new} đã tồn tại.")
+            diag.append((diag[j-1] - self._diag[j-1]) / dx)
+        self.x.append(x_new)
+        self._diag = diag
+        self.coef.append(diag[-1])
+
+    def __call__(self, x_eval):
+        """
+        Tính P(x_eval) bằng lược đồ Horner lồng nhau; x_eval là số hoặc mảng,
+        mọi điểm được tính trong cùng một lượt duyệt hệ số.
+        """
+        if not self.coef:
+            raise ValueError("Chưa có điểm dữ liệu nào.")
+        q = np.asarray(x_eval, dtype=float)
+        result = np.full(q.shape, self.coef[-1])
+        for i in range(len(self.coef) - 2, -1, -1):
+            result *= q - self.x[i]
+            result += self.coef[i]
+        return result
+
+
 if __name__ == "__main__":
     print("=== Nội suy Newton phân sai (tổng quát) ===")
     try:
@@ -68,11 +116,12 @@ if __name__ == "__main__":
     if not x_eval_list:
         print("Vui lòng nhập giá trị x cần nội suy.")
         exit(1)
-    x_eval = x_eval_list[0]
 
     try:
-        coef = divided_difference(xs, ys)
-        result = newton_polynomial(xs, coef, x_eval)
-        print(f"P({x_eval}) = {result:.10f}")
+        interp = NewtonInterpolator(xs, ys)
+        results = interp(x_eval_list)
     except Exception as e:
         print("Có lỗi khi tính nội suy:", e)
+        exit(1)
+    for x_eval, result in zip(x_eval_list, results):
+        print(f"P({x_eval}) = {result:.10f}")
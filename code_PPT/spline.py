@@ -1,6 +1,10 @@
 import math
 import re
 
+import numpy as np
+
+from linsolve import solve_tridiagonal
+
 
 def parse_input_list(prompt):
     """
@@ -84,18 +88,123 @@ def cubic_spline_clamped(x, y, fp0, fpn):
     return a, b, c[:-1], d
 
 
+def cubic_spline_batch(x, y, bc_type='natural', fp0=0.0, fpn=0.0):
+    """
+    Phiên bản NumPy của cubic_spline_natural / cubic_spline_clamped.
+    x, y: mảng kích thước [n] hoặc một lô [m, n] (x có thể dùng chung [n]).
+    bc_type: 'natural' hoặc 'clamped' (khi đó dùng fp0 = f'(x0), fpn = f'(xn),
+    là số hoặc mảng [m]).
+    Trả về a, b, c, d cùng ý nghĩa như bản gốc, kích thước [..., n-1].
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+    n = y.shape[-1]
+    if n < 2:
+        raise ValueError("Cần ít nhất 2 điểm để nội suy spline.")
+    h = np.diff(x, axis=-1)
+    slope = np.diff(y, axis=-1) / h
+
+    lower = np.zeros(y.shape)
+    diag = np.ones(y.shape)
+    upper = np.zeros(y.shape)
+    alpha = np.zeros(y.shape)
+    lower[..., 1:-1] = h[..., :-1]
+    diag[..., 1:-1] = 2 * (h[..., :-1] + h[..., 1:])
+    upper[..., 1:-1] = h[..., 1:]
+    alpha[..., 1:-1] = 3 * (slope[..., 1:] - slope[..., :-1])
+
+    if bc_type == 'clamped':
+        fp0 = np.asarray(fp0, dtype=float)
+        fpn = np.asarray(fpn, dtype=float)
+        diag[..., 0] = 2 * h[..., 0]
+        upper[..., 0] = h[..., 0]
+        alpha[..., 0] = 3 * (slope[..., 0] - fp0)
+        lower[..., -1] = h[..., -1]
+        diag[..., -1] = 2 * h[..., -1]
+        alpha[..., -1] = 3 * (fpn - slope[..., -1])
+    elif bc_type != 'natural':
+        raise ValueError("bc_type phải là 'natural' hoặc 'clamped'.")
+
+    c = solve_tridiagonal(lower, diag, upper, alpha)
+    a = y[..., :-1]
+    b = slope - h * (c[..., 1:] + 2 * c[..., :-1]) / 3
+    d = (c[..., 1:] - c[..., :-1]) / (3 * h)
+    return a, b, c[..., :-1], d
+
+
+def _is_uniform(v, rtol=1e-9):
+    """
+    Kiểm tra dãy tăng v có cách đều hay không, trả về bước h (hoặc None).
+    """
+    if len(v) < 2:
+        return None
+    h = (v[-1] - v[0]) / (len(v) - 1)
+    if h <= 0:
+        return None
+    if np.all(np.abs(np.diff(v) - h) <= rtol * abs(h) + 1e-15):
+        return h
+    return None
+
+
+def find_intervals(x, x_eval):
+    """
+    Tìm chỉ số khoảng i (0 <= i <= n-2) cho từng x_eval sao cho
+    x[i] <= x_eval < x[i+1]; điểm nằm ngoài được gán khoảng đầu/cuối.
+    - Nút cách đều: tính thẳng floor((x_eval - x0) / h), O(m).
+    - Lưới truy vấn cách đều (ví dụ np.linspace): đếm nút theo lưới, O(n + m).
+    - Trường hợp chung: tìm kiếm nhị phân np.searchsorted, O(m log n).
+    """
+    x = np.asarray(x, dtype=float)
+    q = np.asarray(x_eval, dtype=float)
+    last = len(x) - 2
+    h = _is_uniform(x)
+    if h is not None:
+        idx = np.floor((q - x[0]) / h)
+        return np.clip(np.nan_to_num(idx), 0, last).astype(np.intp)
+    flat = q.ravel()
+    dq = _is_uniform(flat) if flat.size > len(x) else None
+    if dq is not None:
+        # Chỉ số lưới đầu tiên >= mỗi nút trong; cộng dồn ra số nút <= q
+        first = np.ceil((x[1:-1] - flat[0]) / dq).astype(np.intp)
+        counts = np.bincount(np.clip(first, 0, flat.size),
+                             minlength=flat.size + 1)
+        return np.cumsum(counts[:flat.size]).reshape(q.shape)
+    idx = np.searchsorted(x, q, side='right') - 1
+    return np.clip(idx, 0, last)
+
+
+def evaluate_spline_array(x, coeffs, x_eval, mode='raise'):
+    """
+    Đánh giá spline tại cả mảng x_eval cùng lúc.
+    coeffs = (a,b,c,d), mỗi hệ số có kích thước [n-1] hoặc [..., n-1]
+    (ví dụ kết quả theo lô của cubic_spline_batch với x dùng chung).
+    mode xử lý điểm nằm ngoài [x0, xn]:
+      'raise'       - báo lỗi như evaluate_spline,
+      'clamp'       - lấy giá trị tại đầu mút gần nhất,
+      'extrapolate' - kéo dài đa thức của khoảng đầu/cuối.
+    """
+    x = np.asarray(x, dtype=float)
+    a, b, c, d = (np.asarray(k, dtype=float) for k in coeffs)
+    q = np.asarray(x_eval, dtype=float)
+    if mode == 'raise':
+        if not np.all((q >= x[0]) & (q <= x[-1])):
+            raise ValueError("x_eval ngoài khoảng của spline")
+    elif mode == 'clamp':
+        q = np.clip(q, x[0], x[-1])
+    elif mode != 'extrapolate':
+        raise ValueError("mode phải là 'raise', 'clamp' hoặc 'extrapolate'.")
+    idx = find_intervals(x, q)
+    dx = q - x[idx]
+    # Horner: a + dx*(b + dx*(c + dx*d))
+    return a[..., idx] + dx*(b[..., idx] + dx*(c[..., idx] + dx*d[..., idx]))
+
+
 def evaluate_spline(x, coeffs, x_eval):
     """
     Đánh giá spline tại x_eval.
     coeffs = (a,b,c,d)
     """
-    a, b, c, d = coeffs
-    # tìm interval i sao cho x[i] <= x_eval <= x[i+1]
-    for i in range(len(a)):
-        if x_eval >= x[i] and x_eval <= x[i+1]:
-            dx = x_eval - x[i]
-            return a[i] + b[i]*dx + c[i]*dx**2 + d[i]*dx**3
-    raise ValueError("x_eval ngoài khoảng của spline")
+    return float(evaluate_spline_array(x, coeffs, x_eval))
 
 if __name__ == "__main__":
     print("=== Cubic Spline Interpolation ===")
@@ -111,10 +220,10 @@ if __name__ == "__main__":
     if typ=='clamped':
         fp0 = float(input("Nhập f'(x0): "))
         fpn = float(input("Nhập f'(xn): "))
-        coeffs = cubic_spline_clamped(x, y, fp0, fpn)
+        coeffs = cubic_spline_batch(x, y, 'clamped', fp0, fpn)
     else:
-        coeffs = cubic_spline_natural(x, y)
+        coeffs = cubic_spline_batch(x, y)
     xs = parse_input_list("Nhập các giá trị x cần nội suy: ")
-    for xv in xs:
-        val = evaluate_spline(x, coeffs, xv)
+    vals = evaluate_spline_array(x, coeffs, xs)
+    for xv, val in zip(xs, vals):
         print(f"S({xv}) = {val:.10f}")
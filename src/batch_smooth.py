@@ -0,0 +1,364 @@
+"""
+Chế độ chạy hàng loạt, không giao diện, cho quy trình làm mượt ảnh
+(cùng các bước với main_with_upload_img.py).
+
+Ví dụ:
+    python batch_smooth.py scans/ "more/*.png" --workers 8 --out-dir output/batch
+Đo thời gian từng bước (mở trace.json bằng chrome://tracing hoặc Perfetto):
+    python batch_smooth.py scans/ --trace output/trace.json [--trace-memory]
+Dùng lại hệ số đã khớp cho ảnh đã gặp (cùng nội dung và tham số):
+    python batch_smooth.py scans/ --cache-dir ../data/cache
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from smoothing.image_pipeline import process_image, process_image_strokes
+from smoothing.strokes import join_rows
+from smoothing.adaptive_sample import format_report
+from smoothing.bezier import segment_columns, write_svg
+from smoothing.raster import save_render
+from smoothing.cache import ResultCache
+from smoothing.curve_store import CurveStore
+from smoothing import trace
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Bộ nhớ đệm của tiến trình worker, mở ở lần dùng đầu
+_cache = None
+
+
+def worker_cache(cache_dir):
+    """ResultCache của tiến trình hiện tại trên thư mục cache_dir (None: không dùng)."""
+    global _cache
+    if cache_dir is None:
+        return None
+    if _cache is None:
+        _cache = ResultCache(cache_dir)
+    return _cache
+
+
+def collect_images(inputs):
+    """
+    Mở rộng danh sách thư mục / glob thành danh sách file ảnh (không trùng).
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(os.path.join(item, name) for name in os.listdir(item))
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+        paths.extend(p for p in candidates
+                     if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTENSIONS))
+    return list(dict.fromkeys(paths))
+
+
+def output_stems(paths):
+    """
+    Tên gốc file kết quả (<tên>.png, .svg, .csv, _figure.png, _thumb.png)
+    cho từng ảnh, không trùng nhau (không phân biệt hoa thường): mặc định là
+    tên ảnh bỏ phần mở rộng; các ảnh trùng tên (a/x.png và b/x.png, x.png và
+    x.jpg, x.png và x_figure.png) dùng đường dẫn tương đối so với thư mục
+    chung, thêm phần mở rộng, và nếu vẫn trùng thì thêm 8 ký tự băm của
+    đường dẫn.
+    """
+    def names(stem):
+        stem = stem.lower()
+        return (stem, stem + '_figure', stem + '_thumb')
+
+    def duplicated(stems):
+        counts = {}
+        for stem in stems.values():
+            for name in names(stem):
+                counts[name] = counts.get(name, 0) + 1
+        return {p for p, stem in stems.items() if any(counts[n] > 1 for n in names(stem))}
+
+    stems = {p: os.path.splitext(os.path.basename(p))[0] for p in paths}
+    clashes = duplicated(stems)
+    if clashes:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in clashes])
+        for p in clashes:
+            rel = os.path.relpath(os.path.abspath(p), root)
+            stems[p] = rel.replace(os.sep, '_').replace('.', '_')
+        for p in duplicated(stems):
+            digest = hashlib.sha256(os.path.abspath(p).encode()).hexdigest()[:8]
+            stems[p] = f"{stems[p]}_{digest}"
+    return stems
+
+
+def save_plot(result, png_path):
+    """
+    Lưu hình có chú thích, lưới bằng Matplotlib (backend Agg, dpi=300).
+    Chậm và tốn bộ nhớ; mặc định --png dùng raster.save_render.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(result['x'], result['y'], 'r.', label='Gốc (thô)', alpha=0.3)
+    x_dense = join_rows(np.atleast_2d(result['x_dense']))
+    plt.plot(x_dense, join_rows(np.atleast_2d(result['y_spline'])), 'b-',
+             label='Spline nội suy', linewidth=2)
+    plt.plot(x_dense, join_rows(np.atleast_2d(result['y_bptt'])), 'g--',
+             label='BPTT bậc 5', linewidth=2)
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    with trace.stage('savefig'):
+        fig.savefig(png_path, dpi=300)
+    plt.close(fig)
+
+
+def process_one(image_path, max_points, out_dir, png=False, tolerance=1.0,
+                coarse_factor=None, strip_rows=None, all_strokes=False, svg=False,
+                sample_tolerance=None, figure=False, thumbnail=None, cache_dir=None,
+                stem=None):
+    """
+    Xử lý một ảnh trong tiến trình con (hình kết quả được lưu ngay tại đây).
+    all_strokes=True: xử lý mọi nét trong ảnh, mỗi nét một đường cong.
+    svg=True: lưu spline dạng đường Bezier trong <ảnh>.svg.
+    sample_tolerance: lấy mẫu spline thích nghi với sai lệch tối đa này (px).
+    png=True: vẽ nhanh bằng raster (kèm ảnh xem trước cạnh dài 'thumbnail'
+    nếu đặt); figure=True: hình Matplotlib có chú thích <ảnh>_figure.png.
+    cache_dir: thư mục bộ nhớ đệm hệ số đã khớp (dùng chung giữa các worker).
+    stem: tên gốc các file kết quả (mặc định tên ảnh, xem output_stems).
+    Trả về (image_path, lỗi hoặc None, (dict cột BPTT [số nét, số hàng],
+    điểm điều khiển Bezier, offsets theo nét, mẫu thích nghi và báo cáo hoặc
+    None, 'hit' / 'miss' / None theo bộ nhớ đệm), các sự kiện đo thời gian
+    của ảnh này) để tiến trình chính ghi vào kho; một ảnh hỏng không dừng
+    cả lô.
+    """
+    with trace.stage('image', source=image_path) as span:
+        image_path, error, output = _process_one(
+            image_path, max_points, out_dir, png, tolerance, coarse_factor, strip_rows,
+            all_strokes, svg, sample_tolerance, figure, thumbnail, cache_dir, stem)
+        span.set(error=error)
+    return image_path, error, output, trace.collect()
+
+
+def _process_one(image_path, max_points, out_dir, png, tolerance, coarse_factor,
+                 strip_rows, all_strokes, svg, sample_tolerance, figure, thumbnail,
+                 cache_dir, stem):
+    try:
+        cache = worker_cache(cache_dir)
+        if all_strokes:
+            result = process_image_strokes(image_path, max_points, tolerance=tolerance,
+                                           sample_tolerance=sample_tolerance, cache=cache)
+        else:
+            result = process_image(image_path, max_points, tolerance=tolerance,
+                                   coarse_factor=coarse_factor, strip_rows=strip_rows,
+                                   sample_tolerance=sample_tolerance, cache=cache)
+        if stem is None:
+            stem = os.path.splitext(os.path.basename(image_path))[0]
+        columns = {name: np.atleast_2d(result[name]) for name in ('x_dense', 'y_bptt')}
+        if png:
+            save_render(result, os.path.join(out_dir, stem + ".png"), thumbnail=thumbnail)
+        if figure:
+            save_plot(result, os.path.join(out_dir, stem + "_figure.png"))
+        if svg:
+            write_svg(os.path.join(out_dir, stem + ".svg"),
+                      [(result['bezier'], result['bezier_offsets'], 'blue')])
+        samples = (result['samples'], result['sampling']) if sample_tolerance else None
+        return image_path, None, (columns, result['bezier'], result['bezier_offsets'], samples,
+                                  result.get('cache'))
+    except Exception as e:
+        return image_path, f"{type(e).__name__}: {e}", None
+
+
+def run_pool(jobs, task, workers=None, initializer=None, initargs=()):
+    """
+    Chạy task(*job) cho mọi job trên process pool, sinh (job, kết quả, lỗi)
+    theo thứ tự xong; lỗi là chuỗi hoặc None. Một worker chết (segfault
+    trong cv2, bị hệ điều hành dừng khi hết bộ nhớ) làm hỏng cả pool
+    (BrokenProcessPool): các job chưa xong được chạy lại trên pool mới.
+    Pool giao job theo thứ tự gửi, tối đa workers + 1 job một lúc, nên job
+    gây lỗi nằm trong số đó; job bị nghi hai lần được chạy riêng trong pool
+    một worker, hỏng nữa thì ghi lỗi cho đúng job đó.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = list(jobs)
+    suspected = [0] * len(pending)
+    order = list(range(len(pending)))
+    while order:
+        alone = [i for i in order if suspected[i] >= 2]
+        together = [i for i in order if suspected[i] < 2]
+        order = []
+        if together:
+            with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                     initargs=initargs) as pool:
+                futures = {pool.submit(task, *pending[i]): i for i in together}
+                unfinished = []
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        unfinished.append(i)
+                        continue
+                    except Exception as e:
+                        yield pending[i], None, f"{type(e).__name__}: {e}"
+                        continue
+                    yield pending[i], result, None
+            if unfinished:
+                unfinished.sort()
+                for i in unfinished[:workers + 1]:
+                    suspected[i] += 1
+                order = unfinished
+        for i in alone:
+            with ProcessPoolExecutor(max_workers=1, initializer=initializer,
+                                     initargs=initargs) as pool:
+                try:
+                    result = pool.submit(task, *pending[i]).result()
+                except BrokenProcessPool:
+                    yield pending[i], None, "BrokenProcessPool: tiến trình worker bị dừng đột ngột"
+                    continue
+                except Exception as e:
+                    yield pending[i], None, f"{type(e).__name__}: {e}"
+                    continue
+            yield pending[i], result, None
+
+
+def run_batch(paths, max_points, out_dir, workers=None, png=False, tolerance=1.0,
+              coarse_factor=None, strip_rows=None, all_strokes=False, csv=False,
+              svg=False, sample_tolerance=None, figure=False, thumbnail=None,
+              trace_memory=None, cache_dir=None):
+    """
+    Chạy process_one cho mọi ảnh trên một process pool (run_pool: worker
+    chết chỉ làm hỏng ảnh gây ra nó). Kết quả của mọi ảnh
+    được ghi thêm vào kho out_dir/curves.crv kèm ảnh nguồn và tham số: mỗi
+    nét một đường cong BPTT (x_dense, y_bptt) và một mảng đoạn Bezier của
+    spline (kind='bezier'); csv=True xuất thêm <ảnh>.csv cho phần BPTT.
+    Các file theo từng ảnh đặt tên theo output_stems nên ảnh trùng tên ở
+    hai thư mục không ghi đè lên nhau.
+    Với sample_tolerance, mẫu thích nghi của spline được ghi thêm
+    (kind='samples', cột x, y) và in tổng số mẫu so với lưới đều.
+    trace_memory: True/False để bật đo thời gian từng bước trong các worker
+    (True: đo cả đỉnh bộ nhớ); sự kiện được gom về trace của tiến trình này.
+    cache_dir: dùng lại hệ số đã khớp trong thư mục này (cache.ResultCache)
+    và in số lần trúng / trượt.
+    Trả về (số ảnh thành công, danh sách (ảnh, lỗi), thời gian chạy).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    failures = []
+    done = 0
+    start = time.perf_counter()
+    params = {'max_points': max_points, 'tolerance': tolerance,
+              'coarse_factor': coarse_factor, 'strip_rows': strip_rows,
+              'all_strokes': all_strokes}
+    sampled = {'samples': 0, 'uniform': 0, 'uniform_same_error': 0}
+    cached = {'hit': 0, 'miss': 0}
+    initializer, initargs = (None, ()) if trace_memory is None else (trace.enable, (trace_memory,))
+    stems = output_stems(paths)
+    jobs = [(p, max_points, out_dir, png, tolerance, coarse_factor, strip_rows, all_strokes,
+             svg, sample_tolerance, figure, thumbnail, cache_dir, stems[p]) for p in paths]
+    with CurveStore(os.path.join(out_dir, "curves.crv")) as store:
+        for job, result, error in run_pool(jobs, process_one, workers, initializer, initargs):
+            path = job[0]
+            if error is None:
+                _, error, output, events = result
+                trace.extend(events)
+            if error is None:
+                columns, bezier, offsets, samples, hit = output
+                if hit is not None:
+                    cached[hit] += 1
+                written = store.append_many(columns, source=path, method='savgol+bptt', **params)
+                for s in range(len(offsets) - 1):
+                    store.append(segment_columns(bezier[offsets[s]:offsets[s + 1]]),
+                                 kind='bezier', stroke=s, source=path,
+                                 method='savgol+spline', **params)
+                if samples is not None:
+                    points, report = samples
+                    for s in range(len(points)):
+                        store.append({'x': points[s][:, 0], 'y': points[s][:, 1]},
+                                     kind='samples', stroke=s, source=path,
+                                     sample_tolerance=sample_tolerance, **params)
+                    for key in sampled:
+                        sampled[key] += report[key]
+                if csv:
+                    store.to_csv(os.path.join(out_dir, stems[path] + ".csv"), written)
+                done += 1
+            else:
+                failures.append((path, error))
+                print(f"❌ {path}: {error}", file=sys.stderr)
+    if sample_tolerance:
+        print(format_report(dict(sampled, tolerance=sample_tolerance)))
+    if cache_dir is not None:
+        print(f"Bộ nhớ đệm {cache_dir}: trúng {cached['hit']}, trượt {cached['miss']}")
+    return done, failures, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Làm mượt hàng loạt ảnh nét vẽ, không mở giao diện.")
+    parser.add_argument("inputs", nargs="+", help="thư mục hoặc mẫu glob của ảnh")
+    parser.add_argument("--max-points", type=int, default=500,
+                        help="số điểm gốc tối đa của đường biên (mặc định 500)")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="sai lệch tối đa (px) khi rút gọn đường biên; âm để tắt")
+    parser.add_argument("--coarse-factor", type=int, default=None,
+                        help="tìm đường biên thô-mịn với ảnh thu nhỏ N lần (ảnh lớn)")
+    parser.add_argument("--strip-rows", type=int, default=None,
+                        help="đọc và dò đường biên theo dải N hàng (ảnh quá lớn so với RAM)")
+    parser.add_argument("--all-strokes", action="store_true",
+                        help="xử lý mọi nét trong ảnh thay vì chỉ nét dài nhất "
+                             "(bỏ qua --coarse-factor, --strip-rows)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="số tiến trình (mặc định: số CPU)")
+    parser.add_argument("--out-dir", default="output/batch",
+                        help="thư mục ghi kho kết quả curves.crv và hình từng ảnh")
+    parser.add_argument("--csv", action="store_true",
+                        help="xuất thêm CSV cho từng ảnh (kết quả luôn ghi vào curves.crv)")
+    parser.add_argument("--sample-tolerance", type=float, default=None,
+                        help="lấy mẫu spline thích nghi theo độ cong, sai lệch tối đa (px)")
+    parser.add_argument("--svg", action="store_true",
+                        help="lưu spline dạng đường Bezier (SVG) cho từng ảnh")
+    parser.add_argument("--png", action="store_true",
+                        help="lưu thêm hình kết quả cho từng ảnh (vẽ nhanh bằng Pillow)")
+    parser.add_argument("--thumbnail", type=int, default=None,
+                        help="kèm ảnh xem trước <ảnh>_thumb.png, cạnh dài N điểm ảnh")
+    parser.add_argument("--figure", action="store_true",
+                        help="lưu hình Matplotlib có chú thích (chậm) <ảnh>_figure.png")
+    parser.add_argument("--trace", default=None,
+                        help="ghi thời gian từng bước: .jsonl (JSON lines) hoặc .json (trace Chrome)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="với --trace: đo cả đỉnh bộ nhớ từng bước (tracemalloc, chậm hơn)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="thư mục bộ nhớ đệm hệ số đã khớp, bỏ qua ảnh đã xử lý với cùng tham số")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.inputs)
+    if not paths:
+        print("Không tìm thấy ảnh nào.")
+        return 1
+
+    tolerance = args.tolerance if args.tolerance >= 0 else None
+    trace_memory = args.trace_memory if args.trace else None
+    if args.trace:
+        trace.enable(memory=args.trace_memory)
+    done, failures, elapsed = run_batch(paths, args.max_points, args.out_dir,
+                                        args.workers, args.png, tolerance,
+                                        args.coarse_factor, args.strip_rows,
+                                        args.all_strokes, args.csv, args.svg,
+                                        args.sample_tolerance, args.figure, args.thumbnail,
+                                        trace_memory, args.cache_dir)
+    if args.trace:
+        events = trace.collect()
+        trace.write(args.trace, events)
+        print(trace.format_summary(trace.summary(events)))
+        print(f"📊 Đã ghi {len(events)} sự kiện đo thời gian: {args.trace}")
+    rate = len(paths) / elapsed if elapsed > 0 else float('inf')
+    print(f"✅ Xong {done}/{len(paths)} ảnh trong {elapsed:.2f}s ({rate:.1f} ảnh/giây)")
+    if failures:
+        print(f"❌ {len(failures)} ảnh lỗi")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
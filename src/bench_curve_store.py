@@ -0,0 +1,73 @@
+"""
+Đo thời gian ghi và đọc lại nhiều đường cong bằng curve_store.CurveStore,
+so với ghi CSV bằng pandas như trước (mỗi đường cong một DataFrame).
+
+Chạy: python bench_curve_store.py [--curves 100000] [--rows 100] [--csv-curves 1000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from smoothing.curve_store import CurveStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo tốc độ kho đường cong nhị phân.")
+    parser.add_argument("--curves", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--csv-curves", type=int, default=1000,
+                        help="số đường cong ghi bằng pandas để so sánh (0 để bỏ qua)")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, args.rows)
+    ys = rng.normal(size=(args.curves, args.rows))
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "curves.crv")
+        start = time.perf_counter()
+        with CurveStore(path) as store:
+            for i in range(args.curves):
+                store.append({'x_dense': x, 'y_spline': ys[i]}, method='bench', item=i)
+        write_one = time.perf_counter() - start
+
+        path_many = os.path.join(tmp, "curves_many.crv")
+        start = time.perf_counter()
+        with CurveStore(path_many) as store:
+            store.append_many({'x_dense': np.broadcast_to(x, ys.shape), 'y_spline': ys},
+                              method='bench')
+        write_many = time.perf_counter() - start
+
+        start = time.perf_counter()
+        total = 0.0
+        with CurveStore(path, mode='r') as store:
+            for i in range(len(store)):
+                total += store[i]['y_spline'][-1]
+        read = time.perf_counter() - start
+        assert np.isclose(total, ys[:, -1].sum())
+
+        print(f"{args.curves} đường cong x {args.rows} hàng")
+        print(f"  append từng đường cong : {write_one:8.3f} s")
+        print(f"  append_many một lần    : {write_many:8.3f} s")
+        print(f"  mở lại + đọc memmap    : {read:8.3f} s")
+
+        if args.csv_curves:
+            import pandas as pd
+            n = min(args.csv_curves, args.curves)
+            start = time.perf_counter()
+            for i in range(n):
+                pd.DataFrame({'x_dense': x, 'y_spline': ys[i]}).to_csv(
+                    os.path.join(tmp, "curve.csv"), index=False)
+            per_curve = (time.perf_counter() - start) / n
+            print(f"  pandas to_csv (ước lượng cho {args.curves}): "
+                  f"{per_curve * args.curves:8.3f} s")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Đo smoothing.ingest.IngestPipeline với nhiều bút tổng hợp chạy đồng thời:
+mỗi bút gửi các nét theo thời gian thực (rate sự kiện mỗi giây), một
+người đọc kết quả (có thể cố ý chậm để thấy áp lực ngược) và một task in
+số liệu định kỳ. Cuối cùng so vài kết quả với smooth_and_fit gọi trực tiếp.
+
+Chạy: python bench_ingest.py [--pens 200] [--strokes 3] [--rate 100]
+                             [--consumer-delay-ms 0] [--threads]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from smoothing.ingest import IngestPipeline, smooth_and_fit
+from smoothing.synthetic import synthetic_strokes
+
+
+async def pen(pipeline, pen_id, strokes, rate, per_event):
+    # Một bút: gửi từng nét theo nhịp rate sự kiện/giây, nghỉ ngắn giữa các nét
+    for s, points in enumerate(strokes):
+        for i in range(0, len(points), per_event):
+            await pipeline.push((pen_id, s), points[i:i + per_event])
+            await asyncio.sleep(1 / rate)
+        await pipeline.end((pen_id, s))
+        await asyncio.sleep(0.05)
+
+
+async def consume(pipeline, results, delay):
+    async for result in pipeline.results():
+        results.append(result)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def monitor(pipeline, interval, peaks, loop_delays):
+    # In số liệu định kỳ và đo độ trễ của chính vòng lặp sự kiện
+    last_print = time.perf_counter()
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        loop_delays.append(time.perf_counter() - start - 0.01)
+        m = pipeline.metrics()
+        peaks['queued_chunks'] = max(peaks['queued_chunks'], m['queued_chunks'])
+        peaks['result_queue'] = max(peaks['result_queue'], m['result_queue'])
+        if time.perf_counter() - last_print >= interval:
+            last_print = time.perf_counter()
+            print(f"  nét đang nhận {m['active_streams']:4d}, khối chờ {m['queued_chunks']:5d}, "
+                  f"trễ lớn nhất {m['max_lag_ms']:7.1f} ms, hàng khớp {m['fit_queue']:3d}, "
+                  f"hàng kết quả {m['result_queue']:4d}, xong {m['strokes_done']}")
+
+
+async def run(args):
+    rng = np.random.default_rng(args.seed)
+    strokes = [synthetic_strokes(rng, args.strokes) for _ in range(args.pens)]
+    executor = ThreadPoolExecutor(args.workers or 1) if args.threads else None
+    pipeline = IngestPipeline(executor=executor, workers=args.workers,
+                              stream_queue=args.stream_queue, fit_queue=args.fit_queue,
+                              result_queue=args.result_queue,
+                              max_batch=args.max_batch, n_dense=args.n_dense)
+    await pipeline.start()
+    results = []
+    peaks = {'queued_chunks': 0, 'result_queue': 0}
+    loop_delays = []
+    reader = asyncio.create_task(consume(pipeline, results, args.consumer_delay_ms / 1000))
+    watcher = asyncio.create_task(monitor(pipeline, 0.5, peaks, loop_delays))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[pen(pipeline, p, strokes[p], args.rate, args.points_per_event)
+                           for p in range(args.pens)])
+    sent = time.perf_counter() - start
+    await pipeline.close()
+    await reader
+    elapsed = time.perf_counter() - start
+    watcher.cancel()
+    if executor is not None:
+        executor.shutdown()
+    return pipeline, strokes, results, peaks, loop_delays, sent, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo pipeline nhận nét bất đồng bộ.")
+    parser.add_argument("--pens", type=int, default=200)
+    parser.add_argument("--strokes", type=int, default=3, help="số nét mỗi bút")
+    parser.add_argument("--rate", type=float, default=100, help="sự kiện mỗi giây mỗi bút")
+    parser.add_argument("--points-per-event", type=int, default=1)
+    parser.add_argument("--consumer-delay-ms", type=float, default=0.0,
+                        help="thời gian người đọc xử lý mỗi kết quả")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", action="store_true",
+                        help="dùng ThreadPoolExecutor thay cho tiến trình")
+    parser.add_argument("--stream-queue", type=int, default=64)
+    parser.add_argument("--fit-queue", type=int, default=64)
+    parser.add_argument("--result-queue", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--n-dense", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    pipeline, strokes, results, peaks, loop_delays, sent, elapsed = asyncio.run(run(args))
+    m = pipeline.metrics()
+    n_points = sum(len(s) for pen_strokes in strokes for s in pen_strokes)
+    blocked = np.array([r['metrics']['blocked_ms'] for r in results])
+    delays = np.array(loop_delays) * 1000
+
+    print(f"{args.pens} bút, {len(results)} nét, {n_points} điểm: gửi xong sau {sent:.2f}s, "
+          f"xử lý xong sau {elapsed:.2f}s ({n_points / elapsed:.0f} điểm/giây)")
+    print(f"Độ trễ lớn nhất mỗi nét: p50 = {m['stream_lag_p50_ms']:.2f} ms, "
+          f"p99 = {m['stream_lag_p99_ms']:.2f} ms")
+    print(f"Từ lúc kết thúc nét tới khi có kết quả: p50 = {m['fit_p50_ms']:.1f} ms, "
+          f"p99 = {m['fit_p99_ms']:.1f} ms ({m['batches']} lô)")
+    print(f"Áp lực ngược: {np.count_nonzero(blocked > 1)} nét phải chờ khi push/end, "
+          f"tổng {blocked.sum():.0f} ms; khối chờ tối đa {peaks['queued_chunks']}, "
+          f"hàng kết quả tối đa {peaks['result_queue']}")
+    print(f"Độ trễ vòng lặp sự kiện: p50 = {np.percentile(delays, 50):.2f} ms, "
+          f"p99 = {np.percentile(delays, 99):.2f} ms; lỗi {m['errors']}")
+
+    # So với gọi trực tiếp từng nét
+    worst = 0.0
+    for result in results[::max(1, len(results) // 20)]:
+        if 'error' in result:
+            continue
+        p, s = result['stroke']
+        points = strokes[p][s]
+        ref = smooth_and_fit(points, [0, len(points)], n_dense=args.n_dense)[0]
+        for name in ('x_dense', 'y_bptt', 'bezier'):
+            worst = max(worst, float(np.abs(result[name] - ref[name]).max()))
+    print(f"Sai khác so với gọi trực tiếp: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -0,0 +1,62 @@
+"""
+So sánh thời gian và bộ nhớ của hình kết quả vẽ bằng raster.save_render
+với cách cũ (Matplotlib savefig dpi=300, batch_smooth.save_plot).
+
+Chạy: python bench_render.py anh.png [--repeat 10] [--thumbnail 256]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from batch_smooth import save_plot
+from smoothing.image_pipeline import process_image
+from smoothing.raster import save_render
+
+
+def measure(fn, repeat):
+    """
+    Thời gian trung bình mỗi lần (giây) và đỉnh bộ nhớ cấp phát qua Python
+    (tracemalloc, MB; không gồm bộ đệm ảnh trong C của Agg/Pillow) của fn().
+    """
+    fn()  # lần đầu: nạp module, font...
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo tốc độ vẽ hình kết quả.")
+    parser.add_argument("image", help="ảnh nét vẽ dùng làm dữ liệu")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--thumbnail", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    result = process_image(args.image, 500, sample_tolerance=0.1)
+    tmp = tempfile.mkdtemp()
+    try:
+        cases = [
+            ("matplotlib savefig dpi=300", lambda: save_plot(result, os.path.join(tmp, "fig.png"))),
+            ("raster 1200x720", lambda: save_render(result, os.path.join(tmp, "r.png"))),
+            (f"raster + thumbnail {args.thumbnail}",
+             lambda: save_render(result, os.path.join(tmp, "t.png"), thumbnail=args.thumbnail)),
+        ]
+        base = None
+        for name, fn in cases:
+            elapsed, peak = measure(fn, args.repeat)
+            base = base or elapsed
+            print(f"{name:32s} {elapsed * 1000:9.1f} ms  {peak:7.1f} MB  x{base / elapsed:5.1f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Đo thời gian spline làm mượt có phạt (smoothing_spline, chọn lam bằng GCV)
+trên một nét xoắn ốc có nhiễu khi số điểm tăng dần, so với spline nội suy +
+BPTT bậc 5 như trước (fit_parametric_ragged) và scipy make_smoothing_spline
+(cũng chọn lam bằng GCV, mỗi tọa độ một lần).
+
+Chạy: python bench_smoothing_spline.py [--sizes 100 1000 10000 100000] [--scipy-max 20000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from smoothing.smoothing_spline import smooth_parametric_ragged
+from smoothing.strokes import RaggedStrokes, arc_length_param, fit_parametric_ragged
+
+
+def spiral(n, noise, rng):
+    turns = max(n / 500, 1)
+    th = np.linspace(0, 2 * np.pi * turns, n)
+    r = 1 + th / (2 * np.pi)
+    pts = np.column_stack([r * np.cos(th), r * np.sin(th)])
+    return RaggedStrokes.from_list([pts + rng.normal(0, noise, pts.shape)])
+
+
+def timed(fn, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo tốc độ spline làm mượt có phạt.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scipy-max", type=int, default=20000,
+                        help="số điểm tối đa chạy make_smoothing_spline (0 để bỏ qua)")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'điểm':>8} {'GCV (µs/điểm)':>15} {'bậc tự do':>10} {'nội suy+BPTT':>14} {'scipy GCV':>12}")
+    for n in args.sizes:
+        strokes = spiral(n, args.noise, rng)
+        ours, (_, _, _, df) = timed(lambda: smooth_parametric_ragged(strokes), args.repeat)
+        old, _ = timed(lambda: fit_parametric_ragged(strokes), args.repeat)
+        ref = "-"
+        if n <= args.scipy_max:
+            from scipy.interpolate import make_smoothing_spline
+            t = arc_length_param(strokes)
+            try:
+                sec, _ = timed(lambda: [make_smoothing_spline(t, strokes.points[:, j])
+                                        for j in range(2)], 1)
+                ref = f"{sec / n * 1e6:.1f}"
+            except ValueError:
+                # GCV của scipy báo bài toán suy biến khi nét dài
+                ref = "lỗi"
+        print(f"{n:8d} {ours / n * 1e6:15.1f} {df[0]:10.1f} {old / n * 1e6:14.1f} {ref:>12}")
+
+
+if __name__ == "__main__":
+    main()
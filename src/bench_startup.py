@@ -0,0 +1,104 @@
+"""
+Đo chi phí khởi động: mỗi bước được import trong một tiến trình Python mới
+với -X importtime, báo thời gian chạy tổng, thời gian import và các gói
+tốn nhiều nhất. Kiểm tra thêm việc nạp gói smoothing không kéo theo
+scipy, cv2, matplotlib, pandas hay Pillow.
+
+Chạy: python bench_startup.py [--repeat 5] [--top 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CORE_MODULES = ('adaptive_sample', 'bezier', 'curve_store', 'image_pipeline', 'raster',
+                'savgol_stream', 'simplify', 'stroke_buffer', 'strokes', 'tiled_contour')
+CORE_IMPORT = "import " + ", ".join(f"smoothing.{m}" for m in CORE_MODULES)
+HEAVY = ('scipy', 'cv2', 'matplotlib', 'pandas', 'PIL')
+
+# (tên bước, câu lệnh import của bước đó)
+STAGES = [
+    ("python (không import)", "pass"),
+    ("numpy", "import numpy"),
+    ("lõi smoothing", CORE_IMPORT),
+    ("batch_smooth (CLI)", "import batch_smooth"),
+    ("spline: scipy.linalg", "from scipy.linalg import solve_banded"),
+    ("spline: scipy.interpolate", "from scipy.interpolate import CubicSpline"),
+    ("savgol: scipy.signal", "from scipy.signal import savgol_filter"),
+    ("đường biên: cv2", "import cv2"),
+    ("raster: Pillow", "from PIL import Image, ImageDraw"),
+    ("vẽ: matplotlib.pyplot", "import matplotlib.pyplot"),
+    ("pandas", "import pandas"),
+]
+
+
+def run_stage(statement):
+    """
+    Chạy 'python -X importtime -c statement' trong src/. Trả về
+    (thời gian chạy (giây), {gói cấp cao nhất: tổng thời gian import (giây)})
+    hoặc None nếu lệnh lỗi (thiếu gói).
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          cwd=HERE, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return None
+    per_package = Counter()
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return wall, per_package
+
+
+def heavy_modules_loaded(statement):
+    """Các gói nặng có trong sys.modules sau khi chạy statement."""
+    check = (f"{statement}\nimport sys\n"
+             f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-c", check], cwd=HERE,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    return proc.stdout.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo thời gian import theo từng bước.")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="số lần chạy mỗi bước, lấy trung vị")
+    parser.add_argument("--top", type=int, default=3,
+                        help="số gói tốn nhiều thời gian import nhất cần in")
+    args = parser.parse_args(argv)
+
+    print(f"{'bước':28s} {'chạy (ms)':>10s} {'import (ms)':>12s}  gói tốn nhất")
+    for name, statement in STAGES:
+        runs = [run_stage(statement) for _ in range(args.repeat)]
+        if any(r is None for r in runs):
+            print(f"{name:28s} {'(không có gói)':>10s}")
+            continue
+        wall = statistics.median(r[0] for r in runs)
+        totals = Counter()
+        for _, per_package in runs:
+            totals.update(per_package)
+        total = sum(totals.values()) / args.repeat
+        top = ", ".join(f"{pkg} {t / args.repeat * 1000:.0f}"
+                        for pkg, t in totals.most_common(args.top))
+        print(f"{name:28s} {wall * 1000:10.1f} {total * 1000:12.1f}  {top}")
+
+    for name, statement in [("lõi smoothing", CORE_IMPORT),
+                            ("batch_smooth (CLI)", "import batch_smooth")]:
+        loaded = heavy_modules_loaded(statement)
+        status = "chỉ NumPy" if not loaded else "kéo theo " + ", ".join(loaded)
+        print(f"Nạp {name}: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import time
+from collections import deque
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from smoothing.stroke_buffer import StrokeBuffer
+from smoothing.strokes import RaggedStrokes
+
+
+class FreehandDrawer:
+    """
+    Thu nét vẽ tay bằng chuột trên một cửa sổ Matplotlib.
+
+    Khi vẽ trực tiếp, nền tĩnh (trục, lưới, nhãn) được lưu lại một lần và
+    mỗi khung hình chỉ vẽ lại đường nét bằng blitting. Các sự kiện chuột
+    được gộp lại, vẽ tối đa target_fps khung hình mỗi giây, nên việc thu
+    điểm không bị chậm theo độ dài nét. Thời gian vẽ từng khung được lưu
+    trong frame_times (giây).
+
+    Nếu truyền smoother (ví dụ savgol_stream.StreamingSavgol), mỗi điểm
+    được đưa vào bộ lọc ngay khi thu và đường đã làm mượt được vẽ xem trước;
+    kết quả cuối lấy bằng smoother.result() sau khi thả chuột.
+
+    Điểm được lưu trong StrokeBuffer và giảm ngay khi thu: bỏ rung dưới
+    min_dist_px điểm ảnh, sự kiện cách nhau dưới min_dt giây, hoặc lấy mẫu
+    đều theo độ dài cung arc_step_px điểm ảnh. Ngưỡng điểm ảnh được đổi sang
+    đơn vị dữ liệu theo tỉ lệ trục lúc bắt đầu nét.
+
+    Có thể vẽ nhiều nét: mỗi lần thả chuột, nét vừa vẽ (và bản đã làm mượt)
+    được giữ lại, nhấn ENTER hoặc đóng cửa sổ để kết thúc.
+    """
+
+    def __init__(self, target_fps=60, blit=True, smoother=None,
+                 min_dist_px=1.0, min_dt=0.0, arc_step_px=None):
+        self.buffer = StrokeBuffer(min_dt=min_dt)
+        self.min_dist_px = min_dist_px
+        self.arc_step_px = arc_step_px
+        self.drawing = False
+        self.target_fps = target_fps
+        self.blit = blit
+        self.smoother = smoother
+        self.strokes = []
+        self.smoothed = []
+        self.frame_times = deque(maxlen=1000)
+        self._background = None
+        self._dirty = False
+        self._last_frame = 0.0
+        self._timer = None
+
+    @property
+    def xs(self):
+        return self.buffer.xs
+
+    @property
+    def ys(self):
+        return self.buffer.ys
+
+    def _data_per_pixel(self):
+        # Độ dài (đơn vị dữ liệu) của một điểm ảnh, lấy chiều nhỏ hơn
+        inv = self.ax.transData.inverted()
+        (x0, y0), (x1, y1) = inv.transform([(0, 0), (1, 1)])
+        return min(abs(x1 - x0), abs(y1 - y0))
+
+    def on_press(self, event):
+        if event.button == 1:  # Chuột trái
+            scale = self._data_per_pixel()
+            self.buffer.clear()
+            self.buffer.min_dist = self.min_dist_px * scale
+            self.buffer.arc_step = self.arc_step_px * scale if self.arc_step_px else None
+            if self.smoother is not None:
+                self.smoother.reset()
+            self.drawing = True
+
+    def on_motion(self, event):
+        if self.drawing and event.xdata is not None and event.ydata is not None:
+            added = self.buffer.append(event.xdata, event.ydata, time.perf_counter())
+            if len(added) == 0:
+                return
+            if self.smoother is not None:
+                for point in added:
+                    self.smoother.push(point)
+            self._dirty = True
+            if time.perf_counter() - self._last_frame >= 1.0 / self.target_fps:
+                self._render()
+
+    def on_release(self, event):
+        if event.button == 1 and self.drawing:
+            self.drawing = False
+            tail = self.buffer.finish()
+            if self.smoother is not None:
+                for point in tail:
+                    self.smoother.push(point)
+                self.smoother.finish()
+            if len(self.buffer) == 0:
+                return
+            self.strokes.append(self.buffer.points.copy())
+            self.ax.plot(self.xs, self.ys, 'r-', linewidth=2, scalex=False, scaley=False)
+            self.line.set_data([], [])
+            if self.smoother is not None:
+                smooth = self.smoother.result().copy()
+                self.smoothed.append(smooth)
+                self.ax.plot(smooth[:, 0], smooth[:, 1], 'b-', linewidth=1,
+                             scalex=False, scaley=False)
+                self.smooth_line.set_data([], [])
+            # Nét đã xong thành một phần của nền tĩnh: vẽ lại toàn bộ một lần
+            self._dirty = False
+            self.canvas.draw_idle()
+
+    def on_key(self, event):
+        if event.key == 'enter':
+            plt.close()  # Đóng cửa sổ sau khi vẽ xong
+
+    def on_draw(self, event):
+        # Vẽ lại toàn bộ (mở cửa sổ, đổi kích thước): lưu lại nền tĩnh mới
+        if self.blit:
+            self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+            self._draw_lines()
+
+    def _draw_lines(self):
+        self.ax.draw_artist(self.line)
+        if self.smoother is not None:
+            self.ax.draw_artist(self.smooth_line)
+
+    def _flush(self):
+        # Gọi theo timer: vẽ phần điểm còn tồn sau khung hình gần nhất
+        if self._dirty:
+            self._render()
+
+    def _render(self):
+        if not self._dirty:
+            return
+        start = time.perf_counter()
+        self.line.set_data(self.xs, self.ys)
+        if self.smoother is not None:
+            smooth = self.smoother.result()
+            self.smooth_line.set_data(smooth[:, 0], smooth[:, 1])
+        if self._background is not None:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.ax.bbox)
+        else:
+            self.canvas.draw_idle()
+        self._dirty = False
+        self._last_frame = time.perf_counter()
+        self.frame_times.append(self._last_frame - start)
+
+    def frame_stats(self):
+        """
+        Thống kê thời gian vẽ mỗi khung (ms): số khung, trung bình, lớn nhất.
+        """
+        if not self.frame_times:
+            return {'frames': 0, 'mean_ms': 0.0, 'max_ms': 0.0}
+        times = np.array(self.frame_times) * 1000
+        return {'frames': len(times), 'mean_ms': float(times.mean()),
+                'max_ms': float(times.max())}
+
+    def collect_strokes(self):
+        """
+        Mở cửa sổ vẽ, trả về mọi nét đã vẽ dưới dạng RaggedStrokes.
+        """
+        fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.canvas = fig.canvas
+        self.ax.set_title("🖱️ Giữ chuột trái để vẽ từng nét — ENTER để hoàn tất", fontsize=12, color='blue')
+        self.ax.set_xlabel("Trục X")
+        self.ax.set_ylabel("Trục Y")
+        self.ax.grid(True, linestyle='--', alpha=0.3)
+
+        self.blit = self.blit and getattr(self.canvas, 'supports_blit', False)
+        self.line, = self.ax.plot([], [], 'r-', linewidth=2, animated=self.blit)
+        self.smooth_line, = self.ax.plot([], [], 'b-', linewidth=1, animated=self.blit)
+
+        fig.canvas.mpl_connect('button_press_event', self.on_press)
+        fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        fig.canvas.mpl_connect('button_release_event', self.on_release)
+        fig.canvas.mpl_connect('key_press_event', self.on_key)
+        fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+        self._timer = fig.canvas.new_timer(interval=max(1, int(1000 / self.target_fps)))
+        self._timer.add_callback(self._flush)
+        self._timer.start()
+
+        plt.show()
+        self._timer.stop()
+        return RaggedStrokes.from_list(self.strokes)
+
+    def smoothed_strokes(self):
+        """
+        Các nét đã làm mượt bởi smoother, cùng thứ tự với collect_strokes().
+        """
+        return RaggedStrokes.from_list(self.smoothed)
@@ -1,11 +1,19 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.interpolate import CubicSpline
-import pandas as pd
 import os
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from smoothing.adaptive_sample import format_report, sample_graph, scipy_segments
+from smoothing.bezier import save_segments, scipy_spline_bezier, write_svg
+from smoothing.curve_store import save_curves
+from smoothing import trace
+
+STORE_PATH = "../data/smoothing_data.crv"
+# Đặt đường dẫn (ví dụ "../data/smoothing_data.csv") để xuất thêm CSV
+CSV_PATH = None
+# Sai lệch tối đa (đơn vị trục) khi lấy mẫu spline để vẽ
+SAMPLE_TOLERANCE = 1e-2
 
 def main():
     print("🎨 CHƯƠNG TRÌNH VẼ TAY & LÀM MƯỢT ĐƯỜNG")
@@ -51,19 +59,21 @@ def main():
 
     # Dữ liệu mịn để vẽ
     x_dense = np.linspace(min(x), max(x), 500)
-    y_natural = spline_natural(x_dense)
-    y_clamped = spline_clamped(x_dense)
     y_poly = poly(x_dense)
+    # Spline: lấy mẫu thích nghi theo độ cong thay vì lưới đều
+    natural, sampling = sample_graph(*scipy_segments(spline_natural), SAMPLE_TOLERANCE, n_uniform=500)
+    clamped, _ = sample_graph(*scipy_segments(spline_clamped), SAMPLE_TOLERANCE, n_uniform=500)
 
     # Bước 3: Vẽ kết quả
     print("✔️ Số điểm gốc:", len(x))
     print("📈 Min/Max x:", np.min(x), np.max(x))
-    print("📈 Min/Max y spline:", np.min(y_natural), np.max(y_natural))
+    print("📈 Min/Max y spline:", np.min(natural.points[:, 1]), np.max(natural.points[:, 1]))
+    print(format_report(sampling))
 
     plt.figure(figsize=(10, 6))
     plt.plot(x, y, 'ro', label='Dữ liệu gốc (vẽ tay)', markersize=6)
-    plt.plot(x_dense, y_natural, 'b-', label='Spline tự nhiên', linewidth=2)
-    plt.plot(x_dense, y_clamped, 'm--', label=f'Spline ràng buộc (đạo hàm={d1:.2f}, {d2:.2f})', linewidth=2)
+    plt.plot(natural.points[:, 0], natural.points[:, 1], 'b-', label='Spline tự nhiên', linewidth=2)
+    plt.plot(clamped.points[:, 0], clamped.points[:, 1], 'm--', label=f'Spline ràng buộc (đạo hàm={d1:.2f}, {d2:.2f})', linewidth=2)
     plt.plot(x_dense, y_poly, 'g-.', label='Bình phương tối thiểu (bậc 5)', linewidth=2)
 
     plt.title("📈 So sánh các phương pháp làm mượt đường vẽ tay", fontsize=14)
@@ -74,20 +84,31 @@ def main():
     plt.tight_layout()
 
     # Lưu kết quả
-    df = pd.DataFrame({
+    # Spline lưu đúng dạng các đoạn Bezier (số đoạn = số nút - 1), BPTT lấy mẫu
+    bezier_natural = scipy_spline_bezier(spline_natural)
+    bezier_clamped = scipy_spline_bezier(spline_clamped)
+    save_segments(STORE_PATH, bezier_natural, source='ginput', method='spline natural')
+    save_segments(STORE_PATH, bezier_clamped, source='ginput', method='spline clamped',
+                  clamped_derivatives=[d1, d2])
+    save_curves({
         'x_dense': x_dense,
-        'y_spline_natural': y_natural,
-        'y_spline_clamped': y_clamped,
         'y_bptt': y_poly
-    })
-    df.to_csv("../data/smoothing_data.csv", index=False)
-    plt.savefig("output/output.png", dpi=300)
+    }, STORE_PATH, CSV_PATH, source='ginput', method='bptt', degree=5)
+    write_svg("output/output.svg", [(bezier_natural, None, 'blue'),
+                                    (bezier_clamped, None, 'magenta')])
+    with trace.stage('savefig'):
+        plt.savefig("output/output.png", dpi=300)
 
     # Hiển thị
     plt.show()
 
     print("✅ Đã lưu ảnh vào: src/output/output.png")
-    print("✅ Đã xuất dữ liệu CSV vào: data/smoothing_data.csv")
+    print("✅ Đã lưu spline dạng Bezier: output/output.svg")
+    print(f"✅ Đã ghi thêm vào kho đường cong: {STORE_PATH}")
+    if CSV_PATH:
+        print(f"✅ Đã xuất CSV: {CSV_PATH}")
 
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    trace.enable_from_env()
     main()
@@ -1,112 +1,85 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import CubicSpline
-from scipy.signal import savgol_filter
-import pandas as pd
 import os
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-class FreehandDrawer:
-    def __init__(self):
-        self.xs = []
-        self.ys = []
-        self.drawing = False
+from freehand_drawer import FreehandDrawer
+from smoothing.savgol_stream import StreamingSavgol
+from smoothing.strokes import dedupe_x, fit_curves_ragged, join_rows
+from smoothing.adaptive_sample import format_report, sample_graph
+from smoothing.bezier import graph_to_bezier, save_segments, write_svg
+from smoothing.curve_store import save_curves
+from smoothing import trace
 
-    def on_press(self, event):
-        if event.button == 1:  # Chuột trái
-            self.xs = []
-            self.ys = []
-            self.drawing = True
-
-    def on_motion(self, event):
-        if self.drawing and event.xdata is not None and event.ydata is not None:
-            self.xs.append(event.xdata)
-            self.ys.append(event.ydata)
-            self.line.set_data(self.xs, self.ys)
-            self.ax.figure.canvas.draw()
-
-    def on_release(self, event):
-        if event.button == 1 and self.drawing:
-            self.drawing = False
-            plt.close()  # Đóng cửa sổ sau khi vẽ xong
-
-    def collect_points(self):
-        fig, self.ax = plt.subplots(figsize=(8, 6))
-        self.ax.set_title("🖱️ Giữ chuột trái để vẽ tay — thả chuột để hoàn tất", fontsize=12, color='blue')
-        self.ax.set_xlabel("Trục X")
-        self.ax.set_ylabel("Trục Y")
-        self.ax.grid(True, linestyle='--', alpha=0.3)
-
-        self.line, = self.ax.plot([], [], 'r-', linewidth=2)
-
-        fig.canvas.mpl_connect('button_press_event', self.on_press)
-        fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
-        fig.canvas.mpl_connect('button_release_event', self.on_release)
-
-        plt.show()
-        return np.array(self.xs), np.array(self.ys)
+STORE_PATH = "../data/smoothing_data.crv"
+# Đặt đường dẫn (ví dụ "../data/smoothing_data.csv") để xuất thêm CSV
+CSV_PATH = None
+# Sai lệch tối đa (đơn vị trục) khi lấy mẫu spline để vẽ
+SAMPLE_TOLERANCE = 1e-3
 
 def main():
     print("🖌️ VẼ TỰ DO BẰNG CHUỘT — DI CHUỘT ĐỂ VẼ ĐƯỜNG")
     
-    drawer = FreehandDrawer()
-    x, y = drawer.collect_points()
-
-    if len(x) < 2:
+    # Làm mượt nhẹ bằng Savitzky-Golay ngay trong lúc vẽ (giữ nguyên số điểm)
+    drawer = FreehandDrawer(smoother=StreamingSavgol(window=51, polyorder=3))
+    strokes = drawer.collect_strokes()
+    smooth = drawer.smoothed_strokes()
+
+    # Lọc x trùng trong từng nét, bỏ nét dưới 2 điểm
+    smooth = dedupe_x(smooth)
+    keep = smooth.lengths >= 2
+    if not np.any(keep):
         print("❌ Cần ít nhất 2 điểm.")
         return
-
-    # Lọc x trùng
-    x, unique_idx = np.unique(x, return_index=True)
-    y = y[unique_idx]
-
-    # Làm mượt nhẹ bằng Savitzky-Golay (nhưng giữ nguyên số điểm)
-    window = min(51, len(x) // 2 * 2 + 1)
-    if window >= 5:
-        x_smooth = savgol_filter(x, window_length=window, polyorder=3)
-        y_smooth = savgol_filter(y, window_length=window, polyorder=3)
-    else:
-        x_smooth = x
-        y_smooth = y
-
-    # Nội suy spline (đi qua tất cả điểm mượt)
-    spline = CubicSpline(x_smooth, y_smooth)
-    x_dense = np.linspace(min(x_smooth), max(x_smooth), 1000)
-    y_spline = spline(x_dense)
-
-    # Bình phương tối thiểu
-    poly = np.poly1d(np.polyfit(x_smooth, y_smooth, deg=5))
-    y_poly = poly(x_dense)
-
-    # Lưu CSV
-    os.makedirs("../data", exist_ok=True)
+    smooth = smooth.select_strokes(keep)
+    strokes = strokes.select_strokes(keep)
+    x, y = strokes.points[:, 0], strokes.points[:, 1]
+
+    # Nội suy spline (đi qua tất cả điểm mượt) và bình phương tối thiểu,
+    # mọi nét trong một lần gọi
+    x_dense, _, y_poly, spline = fit_curves_ragged(smooth, n_dense=1000, degree=5,
+                                                          return_spline=True)
+    # Spline đổi đúng sang các đoạn Bezier (không lấy mẫu)
+    x0, h, coef, seg_offsets = spline.segments()
+    bezier = graph_to_bezier(x0, h, coef)
+    # Lấy mẫu spline thích nghi theo độ cong thay vì lưới đều
+    samples, sampling = sample_graph(x0, h, coef, seg_offsets, SAMPLE_TOLERANCE)
+    print(format_report(sampling))
+    spline_pts = samples.with_breaks()
+
+    # Lưu kết quả, mỗi nét một đường cong
     os.makedirs("output", exist_ok=True)
-
-    df = pd.DataFrame({
+    save_segments(STORE_PATH, bezier, seg_offsets, source='freehand',
+                  method='savgol+spline', savgol_window=51, savgol_polyorder=3)
+    save_curves({
         'x_dense': x_dense,
-        'y_spline': y_spline,
         'y_bptt': y_poly
-    })
-    df.to_csv("../data/smoothing_data.csv", index=False)
+    }, STORE_PATH, CSV_PATH, source='freehand', method='savgol+bptt',
+        savgol_window=51, savgol_polyorder=3, degree=5)
+    write_svg("output/output.svg", [(bezier, seg_offsets, 'blue')])
 
     # Vẽ kết quả
     plt.figure(figsize=(10, 6))
     plt.plot(x, y, 'r.', label='Gốc (thô)', alpha=0.3)
-    plt.plot(x_dense, y_spline, 'b-', label='Spline nội suy', linewidth=2)
-    plt.plot(x_dense, y_poly, 'g--', label='BPTT bậc 5', linewidth=2)
+    plt.plot(spline_pts[:, 0], spline_pts[:, 1], 'b-', label='Spline nội suy', linewidth=2)
+    plt.plot(join_rows(x_dense), join_rows(y_poly), 'g--', label='BPTT bậc 5', linewidth=2)
     plt.title("📈 Làm mượt đường vẽ tay (Spline đi qua mọi điểm)", fontsize=14)
     plt.xlabel("x")
     plt.ylabel("y")
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig("output/output.png", dpi=300)
+    with trace.stage('savefig'):
+        plt.savefig("output/output.png", dpi=300)
     plt.show()
 
     print("✅ Đã lưu ảnh: output/output.png")
-    print("✅ Đã xuất CSV: ../data/smoothing_data.csv")
+    print("✅ Đã lưu spline dạng Bezier: output/output.svg")
+    print(f"✅ Đã ghi thêm vào kho đường cong: {STORE_PATH}")
+    if CSV_PATH:
+        print(f"✅ Đã xuất CSV: {CSV_PATH}")
 
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    trace.enable_from_env()
     main()
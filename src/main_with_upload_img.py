@@ -1,18 +1,26 @@
-import cv2
-import numpy as np
-import matplotlib.pyplot as plt
 from tkinter import filedialog, Tk, simpledialog
-from scipy.signal import savgol_filter
-from scipy.interpolate import CubicSpline
-import pandas as pd
 import os
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from smoothing.image_pipeline import process_image_strokes
+from smoothing.strokes import join_rows
+from smoothing.adaptive_sample import format_report
+from smoothing.bezier import save_segments, write_svg
+from smoothing.curve_store import save_curves
+from smoothing.cache import ResultCache, format_stats
+from smoothing import trace
 
 output_dir = "output"
 os.makedirs(output_dir, exist_ok=True)
 
+STORE_PATH = "../data/smoothing_data.crv"
+# Đặt đường dẫn (ví dụ "../data/smoothing_data.csv") để xuất thêm CSV
+CSV_PATH = None
+# Sai lệch tối đa (điểm ảnh) khi lấy mẫu spline để vẽ
+SAMPLE_TOLERANCE = 0.1
+# Bộ nhớ đệm hệ số đã khớp (chọn lại cùng ảnh thì không khớp lại); None để tắt
+CACHE_DIR = "../data/cache"
+
 def run(max_points):
     print("CHỌN ẢNH ĐỂ LÀM MƯỢT")
     
@@ -23,85 +31,63 @@ def run(max_points):
     if not image_path:
         return
     
-    # Đọc ảnh -> chuyển thành ảnh trắng đen với mỗi ô có giá trị 0-255 
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    
-    # Với ô > 127 thì thành 255, <= 127 thì thành 0
-    _, binary = cv2.threshold(img, 127, 255, cv2.THRESH_BINARY_INV)
-    
-    # Tìm ra các đường biên là các đường bao quanh nhóm các điểm 255
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-    if len(contours) == 0:
-        print("Không tìm thấy đường vẽ!")
+    cache = ResultCache(CACHE_DIR) if CACHE_DIR else None
+    try:
+        result = process_image_strokes(image_path, max_points,
+                                       sample_tolerance=SAMPLE_TOLERANCE, cache=cache)
+    except ValueError as e:
+        print(e)
         return
+    if cache is not None:
+        print(format_stats(cache.stats()))
+    timing = ", ".join(f"{k} = {v*1000:.1f} ms" for k, v in result['contour_timing'].items())
+    print(f"Thời gian tìm đường biên: {timing}")
+    stats = result['simplify']
+    print(f"Số nét: {len(result['strokes'])}")
+    print(f"Rút gọn đường biên: bỏ {stats['removed']} điểm, "
+          f"sai lệch tối đa {stats['max_deviation']:.2f} px, "
+          f"làm mượt {stats['points_smoothed']}/{stats['points_in']} điểm")
+    print(format_report(result['sampling']))
+    x, y = result['x'], result['y']
+    spline_pts = result['samples'].with_breaks()
+    x_dense = result['x_dense']
+    y_poly = result['y_bptt']
 
-    # Chọn đường biên dài nhất
-    contour = max(contours, key=len)
-    contour = contour[:, 0, :]  
-    
-    # Giới hạn số điểm gốc lại theo max_points
-    if contour.shape[0] > max_points:
-        idx_ds = np.linspace(0, contour.shape[0] - 1, max_points, dtype=int)
-        contour = contour[idx_ds]
-
-    # Chuyển về tọa độ x, y
-    x = contour[:, 0]
-    y = contour[:, 1]
-    
-    img_height = img.shape[0]
-    y = img_height - y
-
-    x, unique_idx = np.unique(x, return_index=True)
-    y = y[unique_idx]
-
-    polyorder = 3
-    max_window = min(51, len(x))
-    if max_window % 2 == 0:
-        max_window -= 1
-    window = max_window
-
-    if window >= polyorder + 2:
-        try:
-            x_smooth = savgol_filter(x, window_length=window, polyorder=polyorder)
-            y_smooth = savgol_filter(y, window_length=window, polyorder=polyorder)
-        except ValueError:
-            # Nếu vẫn lỗi, fallback về dữ liệu gốc
-            x_smooth, y_smooth = x, y
-    else:
-        x_smooth, y_smooth = x, y
-    
-    spline = CubicSpline(x_smooth, y_smooth)
-    x_dense = np.linspace(min(x_smooth), max(x_smooth), 1000)
-    y_spline = spline(x_dense)
-
-    poly = np.poly1d(np.polyfit(x_smooth, y_smooth, deg=5))
-    y_poly = poly(x_dense)
-
-    os.makedirs("../data", exist_ok=True)
     os.makedirs("output", exist_ok=True)
 
-    df = pd.DataFrame({
+    # Mỗi nét một đường cong
+    # Spline lưu đúng dạng các đoạn Bezier, BPTT lấy mẫu
+    save_segments(STORE_PATH, result['bezier'], result['bezier_offsets'],
+                  source=image_path, method='savgol+spline', max_points=max_points)
+    save_curves({
         'x_dense': x_dense,
-        'y_spline': y_spline,
         'y_bptt': y_poly
-    })
-    df.to_csv("../data/smoothing_data.csv", index=False)
+    }, STORE_PATH, CSV_PATH, source=image_path, method='savgol+bptt',
+        max_points=max_points, degree=5)
+    write_svg("output/output.svg", [(result['bezier'], result['bezier_offsets'], 'blue')])
+
+    # Matplotlib chỉ nạp khi cần vẽ, hộp thoại chọn ảnh hiện ra sớm hơn
+    import matplotlib.pyplot as plt
 
     plt.figure(figsize=(10, 6))
     plt.plot(x, y, 'r.', label='Gốc (thô)', alpha=0.3)
-    plt.plot(x_dense, y_spline, 'b-', label='Spline nội suy', linewidth=2)
-    plt.plot(x_dense, y_poly, 'g--', label='BPTT bậc 5', linewidth=2)
+    plt.plot(spline_pts[:, 0], spline_pts[:, 1], 'b-', label='Spline nội suy', linewidth=2)
+    plt.plot(join_rows(x_dense), join_rows(y_poly), 'g--', label='BPTT bậc 5', linewidth=2)
     plt.title("📈 Làm mượt đường vẽ tay (Spline đi qua mọi điểm)", fontsize=14)
     plt.xlabel("x")
     plt.ylabel("y")
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig("output/output.png", dpi=300)
+    with trace.stage('savefig'):
+        plt.savefig("output/output.png", dpi=300)
     plt.show()
 
     print("✅ Đã lưu ảnh: output/output.png")
-    print("✅ Đã xuất CSV: ../data/smoothing_data.csv")
+    print("✅ Đã lưu spline dạng Bezier: output/output.svg")
+    print(f"✅ Đã ghi thêm vào kho đường cong: {STORE_PATH}")
+    if CSV_PATH:
+        print(f"✅ Đã xuất CSV: {CSV_PATH}")
 
 def main():
     root = Tk()
@@ -121,4 +107,6 @@ def main():
     run(max_points)
 
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    trace.enable_from_env()
     main()
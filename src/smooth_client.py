@@ -0,0 +1,164 @@
+"""
+Client cho smooth_server.py và bài đo tải cục bộ: nhiều luồng gửi các nét
+tổng hợp cùng lúc, in thông lượng, độ trễ phía client và thống kê của
+dịch vụ (cỡ lô, p50/p99, hàng đợi). Kết quả được so với việc khớp trực
+tiếp smooth_strokes để chắc dịch vụ trả đúng.
+
+Chạy (tự bật dịch vụ ở một tiến trình con, không cần gì bên ngoài):
+    python smooth_client.py --spawn --requests 2000 --concurrency 32
+So sánh với không gom lô:
+    python smooth_client.py --spawn --max-batch 1
+Gửi tới dịch vụ đang chạy:
+    python smooth_client.py --port 8765 [--json]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from smooth_server import (BINARY_TYPE, decode_result, encode_strokes, prepare_strokes,
+                           smooth_strokes)
+from smoothing.strokes import RaggedStrokes
+from smoothing.synthetic import synthetic_strokes
+
+
+class SmoothClient:
+    """
+    Kết nối HTTP giữ mở tới dịch vụ làm mượt (mỗi luồng một client).
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, timeout=30):
+        self._conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body=None, headers=None):
+        self._conn.request(method, path, body=body, headers=headers or {})
+        response = self._conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{response.status}: {data.decode('utf-8', 'replace')}")
+        return data, response.getheader('Content-Type', '')
+
+    def smooth(self, strokes, n_dense=200, degree=5, binary=True):
+        """
+        Làm mượt một danh sách nét (mảng [n, 2]) hoặc RaggedStrokes.
+        Trả về (điểm điều khiển Bezier [m, 4, 2], offsets [k+1] của các
+        đoạn theo nét, BPTT [k, n_dense, 2]).
+        """
+        if not isinstance(strokes, RaggedStrokes):
+            strokes = RaggedStrokes.from_list(strokes)
+        path = f"/smooth?n_dense={n_dense}&degree={degree}"
+        if binary:
+            data, _ = self._request('POST', path, encode_strokes(strokes),
+                                    {'Content-Type': BINARY_TYPE})
+            return decode_result(data)
+        body = json.dumps({'strokes': [strokes[s].tolist() for s in range(len(strokes))]})
+        data, _ = self._request('POST', path, body.encode('utf-8'),
+                                {'Content-Type': 'application/json'})
+        parts = json.loads(data)['strokes']
+        ctrl = [np.asarray(p['bezier'], dtype=float).reshape(-1, 4, 2) for p in parts]
+        seg_offsets = np.concatenate([[0], np.cumsum([len(c) for c in ctrl])])
+        return np.concatenate(ctrl), seg_offsets, np.array([p['bptt'] for p in parts])
+
+    def stats(self):
+        return json.loads(self._request('GET', '/stats')[0])
+
+    def close(self):
+        self._conn.close()
+
+
+def spawn_server(host, workers, max_batch, max_wait_ms):
+    """
+    Chạy smooth_server.py ở tiến trình con trên cổng trống (tiến trình
+    riêng nên client không tranh GIL với dịch vụ). Trả về (Popen, cổng).
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smooth_server.py")
+    proc = subprocess.Popen([sys.executable, script, "--host", host, "--port", "0",
+                             "--workers", str(workers), "--max-batch", str(max_batch),
+                             "--max-wait-ms", str(max_wait_ms)],
+                            stdout=subprocess.PIPE, text=True, encoding='utf-8')
+    line = proc.stdout.readline()
+    match = re.search(r":(\d+)/smooth", line)
+    if match is None:
+        proc.kill()
+        raise RuntimeError(f"Không bật được dịch vụ: {line!r}")
+    return proc, int(match.group(1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo tải dịch vụ làm mượt cục bộ.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--spawn", action="store_true",
+                        help="bật smooth_server.py ở tiến trình con (cổng trống)")
+    parser.add_argument("--workers", type=int, default=2, help="(với --spawn)")
+    parser.add_argument("--max-batch", type=int, default=64, help="(với --spawn)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="(với --spawn)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--strokes-per-request", type=int, default=1)
+    parser.add_argument("--n-dense", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="gửi JSON thay vì nhị phân")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    host, port = args.host, args.port
+    if args.spawn:
+        server, port = spawn_server(host, args.workers, args.max_batch, args.max_wait_ms)
+
+    rng = np.random.default_rng(args.seed)
+    payloads = [synthetic_strokes(rng, args.strokes_per_request)
+                for _ in range(args.requests)]
+    local = threading.local()
+    latency = np.zeros(args.requests)
+
+    def send(i):
+        if not hasattr(local, 'client'):
+            local.client = SmoothClient(host, port)
+        start = time.perf_counter()
+        result = local.client.smooth(payloads[i], args.n_dense, binary=not args.json)
+        latency[i] = time.perf_counter() - start
+        return result
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(send, range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        # Kiểm tra: so với khớp trực tiếp từng yêu cầu
+        worst = 0.0
+        for i in range(0, args.requests, max(1, args.requests // 20)):
+            ctrl, seg_offsets, bptt = results[i]
+            ref = smooth_strokes(prepare_strokes(RaggedStrokes.from_list(payloads[i])),
+                                 args.n_dense)
+            worst = max(worst, np.abs(ctrl - ref[0]).max(), np.abs(bptt - ref[2]).max())
+
+        ms = latency * 1000
+        print(f"{args.requests} yêu cầu, {args.concurrency} luồng, "
+              f"{'JSON' if args.json else 'nhị phân'}: {elapsed:.2f}s "
+              f"({args.requests / elapsed:.0f} yêu cầu/giây)")
+        print(f"Độ trễ phía client: p50 = {np.percentile(ms, 50):.2f} ms, "
+              f"p99 = {np.percentile(ms, 99):.2f} ms")
+        print(f"Sai khác so với khớp trực tiếp: {worst:.2e}")
+        stats = SmoothClient(host, port).stats()
+        print(f"Dịch vụ: {stats['batches']} lô, trung bình {stats['mean_batch']:.1f} yêu cầu/lô, "
+              f"p50 = {stats['p50_ms']:.2f} ms, p99 = {stats['p99_ms']:.2f} ms, "
+              f"hàng đợi tối đa {stats['max_queue_depth']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -1,115 +1,90 @@
-import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import CubicSpline
-import pandas as pd
 import os
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-class FreehandDrawer:
-    def __init__(self):
-        self.xs = []
-        self.ys = []
-        self.drawing = False
+from freehand_drawer import FreehandDrawer
+from smoothing.strokes import drop_repeats, fit_parametric_ragged, join_rows
+from smoothing.smoothing_spline import smooth_parametric_ragged
+from smoothing.adaptive_sample import format_report, sample_parametric
+from smoothing.bezier import parametric_to_bezier, save_segments, write_svg
+from smoothing.curve_store import save_curves
+from smoothing import trace
 
-    def on_press(self, event):
-        if event.button == 1:
-            self.xs = []
-            self.ys = []
-            self.drawing = True
-
-    def on_motion(self, event):
-        if self.drawing and event.xdata is not None and event.ydata is not None:
-            self.xs.append(event.xdata)
-            self.ys.append(event.ydata)
-            self.line.set_data(self.xs, self.ys)
-            self.ax.figure.canvas.draw()
-
-    def on_release(self, event):
-        if event.button == 1 and self.drawing:
-            self.drawing = False
-            plt.close()
-
-    def collect_points(self):
-        fig, self.ax = plt.subplots(figsize=(8, 6))
-        self.ax.set_title("🖱️ Giữ chuột trái để vẽ tay — thả chuột để hoàn tất", fontsize=12, color='blue')
-        self.ax.set_xlabel("Trục X")
-        self.ax.set_ylabel("Trục Y")
-        self.ax.grid(True, linestyle='--', alpha=0.3)
-        self.line, = self.ax.plot([], [], 'r-', linewidth=2)
-        fig.canvas.mpl_connect('button_press_event', self.on_press)
-        fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
-        fig.canvas.mpl_connect('button_release_event', self.on_release)
-        plt.show()
-        return np.array(self.xs), np.array(self.ys)
+STORE_PATH = "../data/smoothing_data.crv"
+# Đặt đường dẫn (ví dụ "../data/smoothing_data.csv") để xuất thêm CSV
+CSV_PATH = None
+# Sai lệch tối đa (đơn vị trục) khi lấy mẫu spline để vẽ
+SAMPLE_TOLERANCE = 1e-3
+# True: một bước spline làm mượt có phạt, độ mượt từng nét chọn bằng GCV,
+# O(n) theo số điểm; False: spline nội suy bậc 3 và BPTT bậc 5 như cũ
+PENALIZED = True
 
 def main():
     print("🖌️ VẼ TỰ DO BẰNG CHUỘT — DI CHUỘT ĐỂ VẼ ĐƯỜNG")
     drawer = FreehandDrawer()
-    x, y = drawer.collect_points()
-    if len(x) < 2:
+    strokes = drawer.collect_strokes()
+    strokes = drop_repeats(strokes)
+    strokes = strokes.select_strokes(strokes.lengths >= 2)
+    if len(strokes) == 0:
         print("❌ Cần ít nhất 2 điểm.")
         return
-    # Tham số hóa theo t (arc-length)
-    points = np.column_stack((x, y))
-    dists = np.sqrt(np.sum(np.diff(points, axis=0)**2, axis=1))
-    t = np.concatenate(([0], np.cumsum(dists)))
-    if t[-1] == 0:
-        t = np.linspace(0, 1, len(x))
+    x, y = strokes.points[:, 0], strokes.points[:, 1]
+    # Mọi nét khớp một lần, tham số t theo độ dài cung trong từng nét
+    if PENALIZED:
+        # Spline làm mượt bậc 3 x(t), y(t) (nét 2 điểm: đoạn thẳng), lam từng
+        # nét chọn bằng GCV; t là độ dài cung của đường đã làm mượt sau một
+        # lần khớp với t đều (xem smooth_parametric_ragged)
+        spline_x, spline_y, lam, df = smooth_parametric_ragged(strokes)
+        for i, (l, d) in enumerate(zip(lam, df)):
+            print(f"Nét {i}: lam = {l:.3g}, số bậc tự do = {d:.1f} / {strokes.lengths[i]} điểm")
     else:
-        t = t / t[-1]
-    t_dense = np.linspace(0, 1, 1000)
-    # Spline bậc 3 2D
-    if len(x) >= 4:
-        spline_x = CubicSpline(t, x)
-        spline_y = CubicSpline(t, y)
-        x_spline = spline_x(t_dense)
-        y_spline = spline_y(t_dense)
-    else:
-        x_spline = np.interp(t_dense, t, x)
-        y_spline = np.interp(t_dense, t, y)
-    # Bình phương tối thiểu bậc 5 2D
-    if len(x) >= 6:
-        poly_x = np.poly1d(np.polyfit(t, x, deg=5))
-        poly_y = np.poly1d(np.polyfit(t, y, deg=5))
-        x_poly = poly_x(t_dense)
-        y_poly = poly_y(t_dense)
-    elif len(x) >= 2:
-        deg = min(3, len(x)-1)
-        poly_x = np.poly1d(np.polyfit(t, x, deg=deg))
-        poly_y = np.poly1d(np.polyfit(t, y, deg=deg))
-        x_poly = poly_x(t_dense)
-        y_poly = poly_y(t_dense)
-    else:
-        x_poly = x
-        y_poly = y
-    # Lưu CSV
-    os.makedirs("../data", exist_ok=True)
+        # Spline nội suy bậc 3 2D (nét dưới 4 điểm: nội suy tuyến tính) và
+        # BPTT bậc 5 2D (nét dưới 6 điểm: bậc <= 3) theo độ dài cung của điểm gốc
+        spline_x, spline_y, x_poly, y_poly = fit_parametric_ragged(strokes)
+    # x(t), y(t) cùng nút: mỗi khúc là đúng một đoạn Bezier 2D
+    _, h, coef_x, seg_offsets = spline_x.segments()
+    coef_y = spline_y.segments()[2]
+    bezier = parametric_to_bezier(h, coef_x, coef_y)
+    # Lấy mẫu spline thích nghi theo độ cong thay vì lưới đều
+    samples, sampling = sample_parametric(h, coef_x, coef_y, seg_offsets, SAMPLE_TOLERANCE)
+    print(format_report(sampling))
+    spline_pts = samples.with_breaks()
+    # Lưu kết quả, mỗi nét một đường cong
     os.makedirs("output", exist_ok=True)
-    df = pd.DataFrame({
-        'x_spline': x_spline,
-        'y_spline': y_spline,
-        'x_bptt': x_poly,
-        'y_bptt': y_poly
-    })
-    df.to_csv("../data/smoothing_data.csv", index=False)
+    save_segments(STORE_PATH, bezier, seg_offsets, source='freehand',
+                  method='penalized spline' if PENALIZED else 'parametric spline')
+    if not PENALIZED:
+        save_curves({
+            'x_bptt': x_poly,
+            'y_bptt': y_poly
+        }, STORE_PATH, CSV_PATH, source='freehand', method='parametric bptt', degree=5)
+    write_svg("output/output.svg", [(bezier, seg_offsets, 'blue')])
     # Vẽ kết quả
     plt.figure(figsize=(10, 6))
     plt.plot(x, y, 'r.', label='Gốc (thô)', alpha=0.5)
-    plt.plot(x_spline, y_spline, 'b-', label='Spline bậc 3 (2D)', linewidth=2)
-    plt.plot(x_poly, y_poly, 'g--', label='BPTT bậc 5 (2D)', linewidth=2)
-    plt.title("📈 Làm mượt đường vẽ tay (Spline 2D & BPTT)", fontsize=14)
+    if PENALIZED:
+        plt.plot(spline_pts[:, 0], spline_pts[:, 1], 'b-', label='Spline làm mượt (GCV)', linewidth=2)
+        plt.title("📈 Làm mượt đường vẽ tay (spline làm mượt 2D)", fontsize=14)
+    else:
+        plt.plot(spline_pts[:, 0], spline_pts[:, 1], 'b-', label='Spline bậc 3 (2D)', linewidth=2)
+        plt.plot(join_rows(x_poly), join_rows(y_poly), 'g--', label='BPTT bậc 5 (2D)', linewidth=2)
+        plt.title("📈 Làm mượt đường vẽ tay (Spline 2D & BPTT)", fontsize=14)
     plt.xlabel("x")
     plt.ylabel("y")
     plt.legend()
     plt.axis('equal')
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig("output/output.png", dpi=300)
+    with trace.stage('savefig'):
+        plt.savefig("output/output.png", dpi=300)
     plt.show()
     print("✅ Đã lưu ảnh: output/output.png")
-    print("✅ Đã xuất CSV: ../data/smoothing_data.csv")
+    print("✅ Đã lưu spline dạng Bezier: output/output.svg")
+    print(f"✅ Đã ghi thêm vào kho đường cong: {STORE_PATH}")
+    if CSV_PATH and not PENALIZED:
+        print(f"✅ Đã xuất CSV: {CSV_PATH}")
 
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    trace.enable_from_env()
     main()
@@ -0,0 +1,430 @@
+"""
+Dịch vụ làm mượt chạy nền trên máy cục bộ (HTTP, chỉ dùng thư viện chuẩn),
+để backend bảng vẽ không phải gọi script và trả chi phí khởi động cho
+từng nét.
+
+Các bước như smooth_draw_spline_poly.py: tham số độ dài cung, spline bậc 3
+x(t), y(t) (trả về dạng các đoạn Bezier, đúng tuyệt đối) và BPTT 2D trên
+lưới n_dense giá trị t. Các yêu cầu đến gần nhau được gom thành một lô
+(micro-batch) và khớp bằng một lần gọi fit_parametric_ragged.
+
+API:
+  POST /smooth?n_dense=200&degree=5
+      JSON {"strokes": [[[x, y], ...], ...]}
+        -> {"strokes": [{"bezier": [[[x, y] x 4], ...], "bptt": [[x, y], ...]}, ...]}
+      hoặc nhị phân (Content-Type: application/octet-stream, xem
+      encode_strokes) -> nhị phân (xem encode_result). JSON tiện để thử
+      nhưng chậm hơn nhiều vì phải đổi từng số thực ra chuỗi; backend nên
+      dùng nhị phân.
+  GET /stats   số yêu cầu, số lô, cỡ lô trung bình, độ trễ p50/p99 (ms),
+               độ sâu hàng đợi (và bộ nhớ đệm nếu bật)
+  GET /health  "ok"
+
+Chạy: python smooth_server.py [--port 8765] [--workers 2] [--max-batch 64] [--max-wait-ms 2]
+                              [--cache-items 4096] [--cache-dir ../data/stroke_cache]
+Đặt SMOOTHING_TRACE=trace.json để ghi thời gian từng bước khi dịch vụ dừng
+(chỉ SMOOTHING_TRACE_MAX_EVENTS sự kiện mới nhất, xem smoothing.trace).
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from smoothing.bezier import parametric_to_bezier
+from smoothing.cache import ResultCache, stroke_digests
+from smoothing.strokes import RaggedStrokes, drop_repeats, fit_parametric_ragged
+from smoothing import trace
+
+BINARY_TYPE = 'application/octet-stream'
+MAX_N_DENSE = 100000
+MAX_DEGREE = 15
+
+
+# ---- định dạng nhị phân (little-endian) ----
+
+def encode_strokes(strokes):
+    """
+    RaggedStrokes -> bytes: u4 k, u4 số điểm của từng nét [k],
+    f8 tọa độ [N, 2].
+    """
+    head = np.concatenate([[len(strokes)], strokes.lengths]).astype('<u4')
+    return head.tobytes() + np.ascontiguousarray(strokes.points, dtype='<f8').tobytes()
+
+
+def decode_strokes(body):
+    """Ngược lại với encode_strokes; sai kích thước thì ValueError."""
+    if len(body) < 4:
+        raise ValueError("Dữ liệu nhị phân quá ngắn")
+    k = int(np.frombuffer(body, dtype='<u4', count=1)[0])
+    if len(body) < 4 + 4 * k:
+        raise ValueError("Dữ liệu nhị phân quá ngắn")
+    lengths = np.frombuffer(body, dtype='<u4', count=k, offset=4).astype(np.int64)
+    n = int(lengths.sum())
+    if len(body) != 4 + 4 * k + 16 * n:
+        raise ValueError("Kích thước dữ liệu nhị phân không khớp số điểm")
+    points = np.frombuffer(body, dtype='<f8', count=2 * n, offset=4 + 4 * k).reshape(-1, 2)
+    return RaggedStrokes(points, np.concatenate([[0], np.cumsum(lengths)]))
+
+
+def decode_json_strokes(body):
+    """
+    JSON {"strokes": [[[x, y], ...], ...]} -> RaggedStrokes. Mỗi nét phải là
+    danh sách các cặp [x, y]; sai thì ValueError (không để reshape tự ghép
+    các số lại thành điểm).
+    """
+    strokes = json.loads(body)['strokes']
+    if not isinstance(strokes, list):
+        raise ValueError("'strokes' phải là danh sách các nét")
+    arrays = []
+    for i, stroke in enumerate(strokes):
+        try:
+            a = np.asarray(stroke, dtype=float)
+        except (ValueError, TypeError):
+            a = None
+        if a is None or a.ndim != 2 or a.shape[1] != 2:
+            raise ValueError(f"Nét {i} phải là danh sách các cặp [x, y] (số)")
+        arrays.append(a)
+    return RaggedStrokes.from_list(arrays)
+
+
+def encode_result(ctrl, seg_offsets, bptt):
+    """
+    Kết quả -> bytes: u4 k, u4 n_dense, u4 số đoạn Bezier của từng nét [k],
+    f8 điểm điều khiển [m, 4, 2], f8 BPTT [k, n_dense, 2].
+    """
+    k, n_dense = bptt.shape[:2]
+    head = np.concatenate([[k, n_dense], np.diff(seg_offsets)]).astype('<u4')
+    return (head.tobytes() + np.ascontiguousarray(ctrl, dtype='<f8').tobytes()
+            + np.ascontiguousarray(bptt, dtype='<f8').tobytes())
+
+
+def decode_result(body):
+    """Ngược lại với encode_result: (ctrl [m, 4, 2], seg_offsets [k+1], bptt [k, n_dense, 2])."""
+    k, n_dense = (int(v) for v in np.frombuffer(body, dtype='<u4', count=2))
+    segs = np.frombuffer(body, dtype='<u4', count=k, offset=8).astype(np.int64)
+    seg_offsets = np.concatenate([[0], np.cumsum(segs)])
+    start = 8 + 4 * k
+    m = int(seg_offsets[-1])
+    ctrl = np.frombuffer(body, dtype='<f8', count=8 * m, offset=start).reshape(m, 4, 2)
+    bptt = np.frombuffer(body, dtype='<f8', count=2 * k * n_dense,
+                         offset=start + 64 * m).reshape(k, n_dense, 2)
+    return ctrl, seg_offsets, bptt
+
+
+# ---- làm mượt theo lô ----
+
+def smooth_strokes(strokes, n_dense=1000, degree=5):
+    """
+    Làm mượt mọi nét một lần. Trả về (điểm điều khiển Bezier [m, 4, 2] của
+    spline, offsets [k+1] của các đoạn theo nét, BPTT [k, n_dense, 2]).
+    """
+    spline_x, spline_y, x_poly, y_poly = fit_parametric_ragged(strokes, n_dense, degree)
+    _, h, coef_x, seg_offsets = spline_x.segments()
+    ctrl = parametric_to_bezier(h, coef_x, spline_y.segments()[2])
+    return ctrl, seg_offsets, np.stack([x_poly, y_poly], axis=-1)
+
+
+def prepare_strokes(strokes):
+    """
+    Kiểm tra nét nhận từ ngoài trước khi đưa vào lô: bỏ điểm lặp liền nhau,
+    mỗi nét phải còn ít nhất 2 điểm hữu hạn. Sai thì ValueError.
+    """
+    if len(strokes) == 0:
+        raise ValueError("Không có nét nào")
+    if not np.all(np.isfinite(strokes.points)):
+        raise ValueError("Tọa độ phải là số hữu hạn")
+    strokes = drop_repeats(strokes)
+    if np.any(strokes.lengths < 2):
+        raise ValueError("Mỗi nét cần ít nhất 2 điểm khác nhau")
+    return strokes
+
+
+class MicroBatcher:
+    """
+    Gom các yêu cầu làm mượt thành lô cho một nhóm worker.
+
+    Luồng gom lấy yêu cầu đầu tiên trong hàng đợi rồi chờ thêm tối đa
+    max_wait giây (hoặc tới max_batch yêu cầu), sau đó giao cả lô cho một
+    worker. Luồng gom chỉ lấy lô mới khi có worker rảnh, nên khi tải cao
+    hàng đợi dồn lại và lô tự lớn lên. Các yêu cầu cùng (n_dense, degree)
+    trong lô được khớp bằng một lần gọi smooth_strokes; nếu lần gọi đó lỗi,
+    từng yêu cầu được khớp lại riêng để chỉ yêu cầu hỏng nhận lỗi.
+
+    cache: một cache.ResultCache; nếu có, kết quả được đệm theo từng nét
+    (nội dung điểm, n_dense, degree), chỉ các nét chưa gặp mới được khớp
+    (bảng vẽ thường gửi lại cả các nét cũ khi vẽ lại).
+    """
+
+    def __init__(self, workers=2, max_batch=64, max_wait=0.002, history=10000, cache=None):
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self.cache = cache
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='smooth')
+        self._slots = threading.Semaphore(workers)
+        self._lock = threading.Lock()
+        self._latency = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self._thread = threading.Thread(target=self._collect, name='batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, strokes, n_dense=1000, degree=5):
+        """
+        Đưa các nét (đã qua prepare_strokes) vào hàng đợi. Trả về Future
+        cho (ctrl, seg_offsets, bptt) của riêng các nét này.
+        """
+        future = Future()
+        self._queue.put((strokes, (n_dense, degree), future))
+        depth = self._queue.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def record(self, seconds):
+        """Ghi độ trễ của một yêu cầu (từ lúc nhận tới lúc trả lời)."""
+        with self._lock:
+            self._latency.append(seconds)
+
+    def _collect(self):
+        while True:
+            # Chờ worker rảnh trước khi lấy lô mới
+            self._slots.acquire()
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._pool.submit(self._run, batch)
+
+    def _run(self, batch):
+        try:
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for (n_dense, degree), items in groups.items():
+                self._fit_group(items, n_dense, degree)
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self._batch_sizes.append(len(batch))
+        finally:
+            self._slots.release()
+
+    def _fit_group(self, items, n_dense, degree):
+        parts = [strokes for strokes, _, _ in items]
+        try:
+            lengths = np.concatenate([p.lengths for p in parts])
+            merged = RaggedStrokes(np.concatenate([p.points for p in parts]),
+                                   np.concatenate([[0], np.cumsum(lengths)]))
+            ctrl, seg_offsets, bptt = self._smooth(merged, n_dense, degree)
+        except Exception as exc:
+            if len(items) > 1:
+                # Một yêu cầu hỏng không được làm hỏng cả lô: khớp lại riêng từng yêu cầu
+                for item in items:
+                    self._fit_group([item], n_dense, degree)
+                return
+            with self._lock:
+                self.errors += 1
+            items[0][2].set_exception(exc)
+            return
+        s0 = 0
+        for part, _, future in items:
+            s1 = s0 + len(part)
+            a, b = seg_offsets[s0], seg_offsets[s1]
+            future.set_result((ctrl[a:b], seg_offsets[s0:s1 + 1] - a, bptt[s0:s1]))
+            s0 = s1
+
+    def _smooth(self, strokes, n_dense, degree):
+        """smooth_strokes, dùng lại kết quả đã đệm của từng nét nếu có."""
+        if self.cache is None:
+            return smooth_strokes(strokes, n_dense, degree)
+        keys = [self.cache.key(digest, pipeline='smooth_server', n_dense=n_dense,
+                               degree=degree, bc_type='not-a-knot')
+                for digest in stroke_digests(strokes)]
+        with self._cache_lock:
+            found = [self.cache.get(key) for key in keys]
+        missing = np.array([value is None for value in found])
+        if np.any(missing):
+            ctrl, seg_offsets, bptt = smooth_strokes(strokes.select_strokes(missing),
+                                                     n_dense, degree)
+            with self._cache_lock:
+                for j, s in enumerate(np.flatnonzero(missing)):
+                    found[s] = {'ctrl': ctrl[seg_offsets[j]:seg_offsets[j + 1]],
+                                'bptt': bptt[j]}
+                    self.cache.put(keys[s], found[s])
+        segs = [len(value['ctrl']) for value in found]
+        return (np.concatenate([value['ctrl'] for value in found]),
+                np.concatenate([[0], np.cumsum(segs)]),
+                np.stack([value['bptt'] for value in found]))
+
+    def stats(self):
+        """Thống kê hiện tại: số yêu cầu, lô, độ trễ p50/p99 (ms), hàng đợi."""
+        with self._lock:
+            latency = np.array(self._latency) * 1000
+            sizes = np.array(self._batch_sizes)
+            result = {'requests': self.requests,
+                      'batches': self.batches,
+                      'errors': self.errors,
+                      'max_queue_depth': self.max_queue_depth}
+        result['queue_depth'] = self._queue.qsize()
+        result['mean_batch'] = float(sizes.mean()) if len(sizes) else 0.0
+        result['p50_ms'] = float(np.percentile(latency, 50)) if len(latency) else None
+        result['p99_ms'] = float(np.percentile(latency, 99)) if len(latency) else None
+        if self.cache is not None:
+            with self._cache_lock:
+                result['cache'] = self.cache.stats()
+        return result
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown()
+
+
+# ---- HTTP ----
+
+class SmoothHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Header và thân trả lời được ghi hai lần: tắt Nagle để không chờ ACK trễ
+    disable_nagle_algorithm = True
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/stats':
+            self._send(200, self.server.batcher.stats())
+        elif path == '/health':
+            self._send(200, b'ok', 'text/plain')
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        received = time.perf_counter()
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if url.path != '/smooth':
+            self._send(404, {'error': 'not found'})
+            return
+        binary = self.headers.get('Content-Type', '').startswith(BINARY_TYPE)
+        try:
+            query = parse_qs(url.query)
+            n_dense = int(query.get('n_dense', [1000])[0])
+            degree = int(query.get('degree', [5])[0])
+            if not (2 <= n_dense <= MAX_N_DENSE and 1 <= degree <= MAX_DEGREE):
+                raise ValueError(f"n_dense phải trong [2, {MAX_N_DENSE}], "
+                                 f"degree trong [1, {MAX_DEGREE}]")
+            if binary:
+                strokes = decode_strokes(body)
+            else:
+                strokes = decode_json_strokes(body)
+            strokes = prepare_strokes(strokes)
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send(400, {'error': str(exc)})
+            return
+
+        batcher = self.server.batcher
+        try:
+            ctrl, seg_offsets, bptt = batcher.submit(strokes, n_dense, degree).result()
+        except Exception as exc:
+            self._send(500, {'error': f"{type(exc).__name__}: {exc}"})
+            return
+        if binary:
+            self._send(200, encode_result(ctrl, seg_offsets, bptt), BINARY_TYPE)
+        else:
+            self._send(200, {'strokes': [
+                {'bezier': ctrl[seg_offsets[s]:seg_offsets[s + 1]].tolist(),
+                 'bptt': bptt[s].tolist()}
+                for s in range(len(bptt))]})
+        batcher.record(time.perf_counter() - received)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class SmoothServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Mặc định chỉ 5: nhiều client mở kết nối cùng lúc sẽ bị từ chối
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=8765, workers=2, max_batch=64, max_wait=0.002,
+                verbose=False, cache=None):
+    """
+    Tạo máy chủ (chưa chạy). port=0 để hệ điều hành chọn cổng trống;
+    cổng thực tế ở server.server_address[1]. Gọi serve_forever() để chạy,
+    shutdown() rồi server.batcher.close() để dừng. cache: xem MicroBatcher.
+    """
+    server = SmoothServer((host, port), SmoothHandler)
+    server.batcher = MicroBatcher(workers, max_batch, max_wait, cache=cache)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dịch vụ làm mượt nét vẽ cục bộ.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="số worker khớp lô")
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="số yêu cầu tối đa mỗi lô (1 = không gom)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="thời gian chờ gom thêm yêu cầu vào lô")
+    parser.add_argument("--cache-items", type=int, default=0,
+                        help="số nét đã khớp giữ trong bộ nhớ đệm (0 = không đệm)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="thư mục đệm kết quả trên đĩa (cần --cache-items > 0)")
+    parser.add_argument("--verbose", action="store_true", help="ghi log từng yêu cầu")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache_dir, max_items=args.cache_items) if args.cache_items else None
+    server = make_server(args.host, args.port, args.workers, args.max_batch,
+                         args.max_wait_ms / 1000, args.verbose, cache)
+    host, port = server.server_address[:2]
+    print(f"Dịch vụ làm mượt: http://{host}:{port}/smooth (Ctrl+C để dừng)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        print(json.dumps(server.batcher.stats(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    trace.enable_from_env()
+    main()
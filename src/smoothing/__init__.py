@@ -0,0 +1,24 @@
+"""
+Lõi làm mượt nét vẽ, dùng chung cho các script giao diện, chế độ hàng loạt
+và các tiến trình worker.
+
+Nạp gói hay bất kỳ module nào bên trong chỉ kéo theo NumPy. scipy, cv2 và
+Pillow được import ngay trong hàm cần tới, nên chỉ tốn thời gian khi bước
+đó thực sự chạy (đo bằng bench_startup.py):
+  - strokes         : RaggedStrokes, Savitzky-Golay, spline, BPTT theo lô
+                      (scipy.linalg khi giải spline)
+  - smoothing_spline: spline làm mượt có phạt, chọn lam bằng GCV, O(n)
+  - savgol_stream   : hệ số Savitzky-Golay, lọc trực tuyến
+  - stroke_buffer   : bộ đệm điểm khi đang vẽ
+  - simplify        : rút gọn đường gấp khúc (RDP)
+  - adaptive_sample : lấy mẫu spline theo độ cong
+  - bezier          : spline -> đoạn Bezier, SVG
+  - curve_store     : kho đường cong nhị phân
+  - image_pipeline  : ảnh -> đường biên -> đường cong (cv2, scipy)
+  - tiled_contour   : dò đường biên theo dải cho ảnh rất lớn (cv2)
+  - raster          : vẽ kết quả ra PNG (Pillow)
+  - ingest          : nhận nét bất đồng bộ từ nhiều bút, khớp theo lô
+  - synthetic       : nét tổng hợp để đo tải
+  - trace           : đo thời gian, số điểm, bộ nhớ từng bước (JSONL, trace Chrome)
+  - cache           : bộ nhớ đệm hệ số đã khớp theo nội dung ảnh và tham số
+"""
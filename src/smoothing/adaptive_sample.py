@@ -0,0 +1,144 @@
+"""
+Lấy mẫu thích nghi theo độ cong cho spline bậc 3, thay cho lưới đều
+np.linspace(..., 1000).
+
+Trên một khoảng tham số dài h, dây cung lệch khỏi đường cong không quá
+h^2 / 8 * max|P''|. Với spline bậc 3, P'' tuyến tính trên mỗi khúc nên
+max|P''| trên một khoảng con đạt tại hai đầu của nó. Bắt đầu từ các nút,
+mỗi mức chia đôi đồng thời mọi khoảng có cận sai số vượt 'tolerance'
+(vector hóa theo mức), dừng khi mọi khoảng đạt. Đoạn thẳng chỉ giữ hai
+đầu, chỗ gấp được chia dày, và sai lệch tối đa được bảo đảm.
+"""
+import numpy as np
+
+from .strokes import RaggedStrokes
+from . import trace
+
+
+def _second_derivative_norm(coefs, seg, d):
+    # |P''| tại tham số cục bộ d của khúc seg (mỗi trục một mảng hệ số [4, m])
+    total = 0.0
+    for coef in coefs:
+        total = total + (2 * coef[2, seg] + 6 * coef[3, seg] * d) ** 2
+    return np.sqrt(total)
+
+
+def adaptive_params(h, coefs, tolerance, max_level=30):
+    """
+    Chia đôi theo mức các khúc có độ dài tham số h [m] cho tới khi cận sai
+    số dây cung <= tolerance. coefs: danh sách hệ số [4, m] (thấp trước)
+    của từng trục cong (một trục với y(x), hai trục với x(t), y(t)).
+    Trả về (seg, d): khúc và tham số cục bộ của các điểm mẫu, đã sắp theo
+    khúc rồi theo d; gồm điểm đầu mỗi khúc, không gồm điểm cuối.
+    """
+    h = np.asarray(h, dtype=float)
+    m = len(h)
+    seg = np.arange(m)
+    a = np.zeros(m)
+    b = h.copy()
+    fa = _second_derivative_norm(coefs, seg, a)
+    fb = _second_derivative_norm(coefs, seg, b)
+    done_seg, done_a = [], []
+    for _ in range(max_level):
+        bound = (b - a) ** 2 / 8 * np.maximum(fa, fb)
+        ok = bound <= tolerance
+        done_seg.append(seg[ok])
+        done_a.append(a[ok])
+        if np.all(ok):
+            break
+        seg, a, b, fa, fb = seg[~ok], a[~ok], b[~ok], fa[~ok], fb[~ok]
+        mid = (a + b) / 2
+        fm = _second_derivative_norm(coefs, seg, mid)
+        # Mỗi khoảng thành hai: [a, mid] và [mid, b]
+        seg = np.concatenate([seg, seg])
+        a, b = np.concatenate([a, mid]), np.concatenate([mid, b])
+        fa, fb = np.concatenate([fa, fm]), np.concatenate([fm, fb])
+    else:
+        # Chạm max_level: giữ các khoảng còn lại
+        done_seg.append(seg)
+        done_a.append(a)
+    seg = np.concatenate(done_seg)
+    d = np.concatenate(done_a)
+    order = np.lexsort((d, seg))
+    return seg[order], d[order]
+
+
+def _polyval(coef, seg, d):
+    return coef[0, seg] + d * (coef[1, seg] + d * (coef[2, seg] + d * coef[3, seg]))
+
+
+def _assemble(points, seg, seg_offsets, end_points):
+    # Gom mẫu theo nét và thêm điểm cuối của mỗi nét sau các mẫu của nét đó
+    k = len(seg_offsets) - 1
+    stroke = np.searchsorted(seg_offsets, seg, side='right') - 1
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(stroke, minlength=k) + 1)])
+    out = np.empty((len(points) + k, 2))
+    out[np.arange(len(points)) + stroke] = points
+    out[offsets[1:] - 1] = end_points
+    return RaggedStrokes(out, offsets)
+
+
+def _report(samples, n_uniform, h, coefs, seg_offsets, tolerance):
+    # Số điểm lưới đều cần để có cùng cận sai số: mỗi nét theo max|P''| của nét
+    idx = np.arange(len(h))
+    M = np.maximum(_second_derivative_norm(coefs, idx, 0.0),
+                   _second_derivative_norm(coefs, idx, h))
+    starts = seg_offsets[:-1]
+    M_stroke = np.maximum.reduceat(M, starts)
+    L_stroke = np.add.reduceat(h, starts)
+    needed = np.ceil(L_stroke * np.sqrt(M_stroke / (8 * tolerance))) + 1
+    return {'samples': int(samples),
+            'uniform': int(n_uniform * len(starts)),
+            'uniform_same_error': int(needed.sum()),
+            'tolerance': tolerance}
+
+
+def scipy_segments(spline):
+    """
+    (x0, h, hệ số [4, m] thấp trước, offsets) của một scipy CubicSpline,
+    cùng dạng với RaggedSpline.segments().
+    """
+    return spline.x[:-1], np.diff(spline.x), spline.c[::-1], np.array([0, len(spline.x) - 1])
+
+
+@trace.traced('adaptive_sample')
+def sample_graph(x0, h, coef, seg_offsets, tolerance, n_uniform=1000):
+    """
+    Lấy mẫu thích nghi spline y(x) (các khúc từ RaggedSpline.segments()
+    hoặc scipy_segments) với sai lệch tối đa 'tolerance' theo phương y.
+    Trả về (RaggedStrokes các điểm (x, y),
+    báo cáo số mẫu so với lưới đều n_uniform điểm mỗi nét).
+    """
+    seg_offsets = np.asarray(seg_offsets)
+    seg, d = adaptive_params(h, [coef], tolerance)
+    points = np.column_stack([x0[seg] + d, _polyval(coef, seg, d)])
+    last = seg_offsets[1:] - 1
+    end_points = np.column_stack([x0[last] + h[last], _polyval(coef, last, h[last])])
+    result = _assemble(points, seg, seg_offsets, end_points)
+    report = _report(len(result.points), n_uniform, h, [coef], seg_offsets, tolerance)
+    return result, report
+
+
+@trace.traced('adaptive_sample')
+def sample_parametric(h, coef_x, coef_y, seg_offsets, tolerance, n_uniform=1000):
+    """
+    Như sample_graph cho spline tham số x(t), y(t) cùng nút; tolerance là
+    khoảng cách tối đa từ dây cung tới đường cong.
+    """
+    seg_offsets = np.asarray(seg_offsets)
+    coefs = [coef_x, coef_y]
+    seg, d = adaptive_params(h, coefs, tolerance)
+    points = np.column_stack([_polyval(coef_x, seg, d), _polyval(coef_y, seg, d)])
+    last = seg_offsets[1:] - 1
+    end_points = np.column_stack([_polyval(coef_x, last, h[last]),
+                                  _polyval(coef_y, last, h[last])])
+    result = _assemble(points, seg, seg_offsets, end_points)
+    report = _report(len(result.points), n_uniform, h, coefs, seg_offsets, tolerance)
+    return result, report
+
+
+def format_report(report):
+    """Một dòng báo cáo số mẫu thích nghi so với lưới đều."""
+    return (f"Lấy mẫu thích nghi (sai lệch <= {report['tolerance']:g}): "
+            f"{report['samples']} điểm, lưới đều đang dùng {report['uniform']} điểm, "
+            f"lưới đều cùng sai số cần {report['uniform_same_error']} điểm")
@@ -0,0 +1,143 @@
+"""
+Đổi spline bậc 3 từng khúc sang các đoạn Bezier bậc 3, xuất dạng SVG path
+hoặc mảng đoạn nhị phân.
+
+Mỗi khúc spline p(d) = c0 + c1*d + c2*d^2 + c3*d^3, d trong [0, h], là đúng
+một đường Bezier bậc 3 (không xấp xỉ), nên kích thước kết quả tỉ lệ với số
+nút chứ không với số điểm lấy mẫu, và có thể vẽ ở bất kỳ độ phân giải nào.
+Điểm điều khiển được trả về dạng mảng [số đoạn, 4, 2] (P0..P3, mỗi điểm x, y).
+"""
+import numpy as np
+
+from .curve_store import CurveStore
+from . import trace
+
+SEGMENT_COLUMNS = ('x0', 'y0', 'x1', 'y1', 'x2', 'y2', 'x3', 'y3')
+
+
+def power_to_bezier(coef, h):
+    """
+    Hệ số lũy thừa coef [4, m] (c0..c3 theo d, thấp trước) trên khúc dài h [m]
+    -> 4 hệ số Bezier [4, m] (giá trị của P0..P3 trên một trục).
+    """
+    a0 = coef[0]
+    a1 = coef[1] * h
+    a2 = coef[2] * h ** 2
+    a3 = coef[3] * h ** 3
+    return np.stack([a0,
+                     a0 + a1 / 3,
+                     a0 + 2 * a1 / 3 + a2 / 3,
+                     a0 + a1 + a2 + a3])
+
+
+@trace.traced('bezier')
+def graph_to_bezier(x0, h, coef):
+    """
+    Spline y(x): khúc thứ j bắt đầu tại x0[j], dài h[j], hệ số coef[:, j].
+    Trục x tuyến tính theo tham số nên điểm điều khiển chia đều khúc.
+    """
+    x0 = np.asarray(x0, dtype=float)
+    h = np.asarray(h, dtype=float)
+    xs = x0[None, :] + h[None, :] * (np.arange(4) / 3)[:, None]
+    ys = power_to_bezier(np.asarray(coef, dtype=float), h)
+    return np.stack([xs, ys], axis=-1).transpose(1, 0, 2)
+
+
+@trace.traced('bezier')
+def parametric_to_bezier(h, coef_x, coef_y):
+    """
+    Spline tham số x(t), y(t) cùng nút: khúc thứ j dài h[j] theo t.
+    """
+    h = np.asarray(h, dtype=float)
+    xs = power_to_bezier(np.asarray(coef_x, dtype=float), h)
+    ys = power_to_bezier(np.asarray(coef_y, dtype=float), h)
+    return np.stack([xs, ys], axis=-1).transpose(1, 0, 2)
+
+
+@trace.traced('bezier')
+def scipy_spline_bezier(spline):
+    """
+    Các đoạn Bezier của một scipy.interpolate.CubicSpline y(x).
+    """
+    return graph_to_bezier(spline.x[:-1], np.diff(spline.x), spline.c[::-1])
+
+
+def evaluate_bezier(ctrl, u):
+    """
+    Điểm trên các đoạn tại tham số u trong [0, 1]: ctrl [m, 4, 2] -> [m, len(u), 2].
+    """
+    u = np.asarray(u, dtype=float)[None, :, None]
+    v = 1 - u
+    p0, p1, p2, p3 = (ctrl[:, i, None, :] for i in range(4))
+    return v ** 3 * p0 + 3 * v ** 2 * u * p1 + 3 * v * u ** 2 * p2 + u ** 3 * p3
+
+
+def svg_path(ctrl, offsets=None, precision=3):
+    """
+    Dữ liệu thuộc tính d của SVG <path>: mỗi nét (các đoạn
+    ctrl[offsets[s]:offsets[s+1]]) là một lệnh M và một chuỗi lệnh C.
+    """
+    ctrl = np.asarray(ctrl, dtype=float)
+    if offsets is None:
+        offsets = [0, len(ctrl)]
+    nums = np.char.mod(f'%.{precision}f', ctrl.reshape(len(ctrl), 8))
+    pair = [np.char.add(np.char.add(nums[:, j], ','), nums[:, j + 1]) for j in range(0, 8, 2)]
+    moves = np.char.add('M', pair[0])
+    curves = np.char.add(np.char.add(np.char.add(np.char.add('C', pair[1]), ' '),
+                                     np.char.add(pair[2], ' ')), pair[3])
+    parts = []
+    for s in range(len(offsets) - 1):
+        if offsets[s + 1] > offsets[s]:
+            parts.append(moves[offsets[s]])
+            parts.extend(curves[offsets[s]:offsets[s + 1]])
+    return ' '.join(parts)
+
+
+def write_svg(svg_file, paths, margin=0.02):
+    """
+    Ghi file SVG với các đường cong Bezier. paths: danh sách
+    (ctrl [m, 4, 2], offsets hoặc None, màu nét). Trục y được lật để y
+    tăng lên trên như trong đồ thị.
+    """
+    boxes = [c.reshape(-1, 2) for c, _, _ in paths if len(c)]
+    pts = np.concatenate(boxes) if boxes else np.zeros((1, 2))
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    pad = margin * max(float(np.max(hi - lo)), 1e-9)
+    lo, hi = lo - pad, hi + pad
+    w, h = hi - lo
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'viewBox="{lo[0]:.3f} {-hi[1]:.3f} {w:.3f} {h:.3f}">',
+        '<g transform="scale(1,-1)" fill="none" stroke-width="'
+        f'{max(w, h) / 400:.4g}">',
+    ]
+    for ctrl, offsets, color in paths:
+        lines.append(f'<path stroke="{color}" d="{svg_path(ctrl, offsets)}"/>')
+    lines += ['</g>', '</svg>']
+    with open(svg_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def segment_columns(ctrl):
+    """
+    Điểm điều khiển [m, 4, 2] -> dict cột x0, y0, ..., x3, y3 (mỗi cột [m]),
+    để ghi vào curve_store như một mảng đoạn nhị phân.
+    """
+    flat = np.asarray(ctrl, dtype=float).reshape(len(ctrl), 8)
+    return {name: flat[:, j] for j, name in enumerate(SEGMENT_COLUMNS)}
+
+
+def save_segments(store_path, ctrl, offsets=None, **meta):
+    """
+    Ghi thêm các đoạn Bezier vào kho curve_store, mỗi nét một đường cong
+    với các cột x0..y3 (mỗi hàng một đoạn), metadata kind='bezier'.
+    Trả về danh sách chỉ số đường cong đã ghi.
+    """
+    if offsets is None:
+        offsets = [0, len(ctrl)]
+    written = []
+    with CurveStore(store_path) as store:
+        for s in range(len(offsets) - 1):
+            columns = segment_columns(ctrl[offsets[s]:offsets[s + 1]])
+            written.append(store.append(columns, kind='bezier', stroke=s, **meta))
+    return written
@@ -0,0 +1,233 @@
+"""
+Bộ nhớ đệm kết quả khớp theo nội dung: cùng ảnh (hay cùng các điểm) và cùng
+tham số thì không phải đọc ảnh, dò đường biên, lọc và khớp lại. Ảnh được
+băm theo file (image_pipeline), nét vẽ theo từng nét (stroke_digests, dùng
+trong smooth_server và ingest).
+
+Khóa là SHA-256 của: phiên bản quy trình, băm nội dung đầu vào (byte của
+file ảnh hoặc các mảng điểm) và mọi tham số (threshold, max_points,
+window, polyorder, degree, điều kiện biên...). Giá trị là một dict các mảng
+NumPy nhỏ (hệ số đã khớp, điểm gốc, thống kê), không phải hình đã vẽ.
+
+Hai lớp:
+  - bộ nhớ: LRU tối đa max_items mục trong tiến trình;
+  - đĩa: mỗi mục một file .npz trong <directory>/<phiên bản>/, ghi nguyên
+    tử (file tạm rồi os.replace) nên nhiều tiến trình dùng chung được; tổng
+    dung lượng vượt max_bytes thì xóa các mục lâu không dùng nhất (theo
+    mtime, được cập nhật mỗi lần đọc trúng).
+Phiên bản quy trình băm mã nguồn các module tạo ra giá trị đệm cùng phiên
+bản NumPy/SciPy/OpenCV; khi một trong số đó đổi, khóa cũ không còn trúng và
+thư mục của phiên bản cũ bị xóa ở lần mở sau.
+
+Ví dụ:
+    cache = ResultCache("../data/cache")
+    key = cache.key(file_digest(image_path), max_points=500, threshold=127)
+    model = cache.get(key)
+    if model is None:
+        model = ...  # khớp
+        cache.put(key, model)
+    print(cache.stats())
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from importlib import metadata
+
+import numpy as np
+
+# Module có mã ảnh hưởng tới giá trị được đệm
+PIPELINE_MODULES = ('image_pipeline.py', 'strokes.py', 'simplify.py', 'savgol_stream.py',
+                    'tiled_contour.py', 'bezier.py', 'ingest.py', 'cache.py')
+_DISTRIBUTIONS = (('numpy',), ('scipy',),
+                  ('opencv-python', 'opencv-python-headless', 'opencv-contrib-python',
+                   'opencv-contrib-python-headless'))
+_VERSION_DIR = re.compile(r'^[0-9a-f]{16}$')
+_version = None
+
+
+def pipeline_version():
+    """
+    Chuỗi 16 ký tự hex đại diện cho phiên bản quy trình: băm mã nguồn các
+    PIPELINE_MODULES và phiên bản các thư viện số (tính một lần mỗi tiến trình).
+    """
+    global _version
+    if _version is None:
+        h = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in PIPELINE_MODULES:
+            with open(os.path.join(here, name), 'rb') as f:
+                h.update(name.encode() + b'\0' + f.read())
+        for names in _DISTRIBUTIONS:
+            for name in names:
+                try:
+                    h.update(f"{name}={metadata.version(name)}".encode())
+                    break
+                except metadata.PackageNotFoundError:
+                    pass
+        _version = h.hexdigest()[:16]
+    return _version
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 (hex) của nội dung file, đọc theo khối."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def array_digest(*arrays):
+    """SHA-256 (hex) của các mảng, tính cả dtype và shape."""
+    h = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape}".encode())
+        h.update(a.data)
+    return h.hexdigest()
+
+
+def stroke_digests(strokes):
+    """array_digest của từng nét trong một RaggedStrokes (danh sách chuỗi hex)."""
+    return [array_digest(strokes.points[a:b])
+            for a, b in zip(strokes.offsets[:-1], strokes.offsets[1:])]
+
+
+class ResultCache:
+    """
+    Bộ nhớ đệm hai lớp (LRU trong bộ nhớ, file .npz trên đĩa) cho các dict
+    mảng NumPy. directory=None: chỉ dùng lớp bộ nhớ. Mảng trả về từ get()
+    là chỉ đọc vì có thể dùng chung giữa các lần gọi.
+    """
+
+    def __init__(self, directory=None, max_items=64, max_bytes=256 * 2 ** 20, version=None):
+        self.version = version or pipeline_version()
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self.counts = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'puts': 0,
+                       'evictions': 0}
+        self.directory = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            # Phiên bản khác: không bao giờ trúng nữa, xóa luôn
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name != self.version and _VERSION_DIR.match(name) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+            self.directory = os.path.join(directory, self.version)
+            os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, digest, **params):
+        """Khóa của một đầu vào (băm nội dung) với các tham số."""
+        text = json.dumps({'digest': digest, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.version}\0{text}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """dict mảng đã lưu với khóa này, hoặc None nếu chưa có."""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.counts['memory_hits'] += 1
+            return value
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    value = {name: data[name] for name in data.files}
+                os.utime(path)
+            except (OSError, ValueError):
+                # Không có, đang bị xóa bởi tiến trình khác hoặc file hỏng
+                value = None
+            if value is not None:
+                for a in value.values():
+                    a.setflags(write=False)
+                self._remember(key, value)
+                self.counts['disk_hits'] += 1
+                return value
+        self.counts['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        """Lưu dict tên -> mảng (hoặc số) vào cả hai lớp."""
+        value = {name: np.array(a) for name, a in value.items()}
+        for a in value.values():
+            a.setflags(write=False)
+        self._remember(key, value)
+        self.counts['puts'] += 1
+        if self.directory is None:
+            return
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **value)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.counts['evictions'] += 1
+            except OSError:
+                pass
+            total -= size
+
+    def disk_bytes(self):
+        if self.directory is None:
+            return 0
+        return sum(size for _, size, _ in self._entries())
+
+    def stats(self):
+        """Số lần trúng (bộ nhớ / đĩa), trượt, ghi, xóa và kích thước hiện tại."""
+        hits = self.counts['memory_hits'] + self.counts['disk_hits']
+        lookups = hits + self.counts['misses']
+        return dict(self.counts, hit_rate=hits / lookups if lookups else 0.0,
+                    memory_items=len(self._memory), disk_bytes=self.disk_bytes())
+
+    def clear(self):
+        """Xóa mọi mục của phiên bản hiện tại (cả hai lớp)."""
+        self._memory.clear()
+        if self.directory is not None:
+            for _, _, path in self._entries():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+def format_stats(stats):
+    return (f"Bộ nhớ đệm: trúng {stats['memory_hits']} (bộ nhớ) + {stats['disk_hits']} (đĩa), "
+            f"trượt {stats['misses']}, tỉ lệ trúng {stats['hit_rate'] * 100:.0f}%, "
+            f"đã xóa {stats['evictions']}, trên đĩa {stats['disk_bytes'] / 2 ** 20:.1f} MB")
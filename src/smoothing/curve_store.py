@@ -0,0 +1,248 @@
+"""
+Kho đường cong nhị phân, chỉ ghi nối thêm, thay cho việc ghi đè một file CSV.
+
+Một kho gồm ba file cùng tên gốc:
+  - <path>       : header 16 byte (magic, phiên bản) rồi dữ liệu float64 thô;
+                   mỗi đường cong là một khối [số cột, số hàng] liền nhau.
+  - <path>.idx   : mỗi đường cong một bản ghi int64
+                   (vị trí trong dữ liệu, số cột, số hàng, mã metadata).
+  - <path>.meta  : metadata dạng JSON, mỗi dòng cho một lần ghi
+                   (tên cột, phương pháp, tham số, nguồn...).
+Ghi thêm không đụng tới phần đã có; bản ghi chỉ mục được ghi sau cùng nên
+lần ghi bị ngắt giữa chừng không làm hỏng kho: khi mở, phần đuôi dở dang
+(bản ghi chỉ mục thiếu byte, dữ liệu chưa có chỉ mục, dòng metadata chưa
+có ký tự xuống dòng) bị bỏ qua, và bị cắt khỏi file nếu mở để ghi thêm.
+Khi đọc, mỗi cột là một view trên np.memmap của file dữ liệu, không sao chép.
+
+Ví dụ:
+    with CurveStore("../data/smoothing_data.crv") as store:
+        store.append({'x_dense': x_dense, 'y_spline': y_spline},
+                     method='spline', source='freehand')
+        curve = store[0]          # {'x_dense': memmap view, ...}
+        store.to_csv("../data/smoothing_data.csv")
+"""
+import json
+import os
+
+import numpy as np
+
+from . import trace
+
+MAGIC = b'CRVSTOR1'
+HEADER_BYTES = 16
+RECORD_FIELDS = 4  # offset, cols, rows, meta_id
+
+
+def _json_default(value):
+    # Số NumPy -> số Python, còn lại ghi dạng chuỗi
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class CurveStore:
+    """
+    Kho nhiều đường cong, mỗi đường cong là các cột float64 cùng độ dài.
+    mode='a' (mặc định) tạo kho nếu chưa có và cho phép ghi thêm;
+    mode='r' chỉ đọc.
+    """
+
+    def __init__(self, path, mode='a'):
+        if mode not in ('r', 'a'):
+            raise ValueError("mode phải là 'r' hoặc 'a'")
+        self.path = path
+        self.mode = mode
+        exists = os.path.exists(path)
+        if not exists:
+            if mode == 'r':
+                raise FileNotFoundError(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(MAGIC + np.array([1, 0], dtype='<u4').tobytes())
+            open(path + '.idx', 'wb').close()
+            open(path + '.meta', 'wb').close()
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Không phải kho đường cong: {path}")
+
+        index, self._meta, meta_bytes, data_end = self._recover(path)
+        self._index = [index]
+        self._count = len(index)
+        self._index_cache = None
+        self._map = None
+        self._data_values = (data_end - HEADER_BYTES) // 8
+
+        if mode == 'a':
+            # Cắt phần đuôi của lần ghi bị ngắt để lần ghi sau nối đúng chỗ
+            for name, size in ((path, data_end), (path + '.idx', index.nbytes),
+                               (path + '.meta', meta_bytes)):
+                if os.path.getsize(name) != size:
+                    os.truncate(name, size)
+            self._data = open(path, 'ab')
+            self._idx = open(path + '.idx', 'ab')
+            self._meta_file = open(path + '.meta', 'a', encoding='utf-8')
+
+    @staticmethod
+    def _recover(path):
+        """
+        Phần hợp lệ của kho: (bản ghi chỉ mục [số đường cong, 4], các mục
+        metadata, số byte metadata đến hết dòng đầy đủ cuối cùng, số byte dữ
+        liệu đến hết khối cuối cùng có chỉ mục).
+        """
+        with open(path + '.meta', 'rb') as f:
+            meta = f.read()
+        meta_bytes = meta.rfind(b'\n') + 1
+        entries = [json.loads(line) for line in meta[:meta_bytes].decode('utf-8').splitlines()
+                   if line.strip()]
+        n_meta = len(entries)
+        index = np.fromfile(path + '.idx', dtype='<i8')
+        index = index[:len(index) // RECORD_FIELDS * RECORD_FIELDS].reshape(-1, RECORD_FIELDS)
+        # Giữ đoạn đầu dài nhất các bản ghi trỏ tới dữ liệu và metadata có thật
+        n_values = (os.path.getsize(path) - HEADER_BYTES) // 8
+        ends = index[:, 0] + index[:, 1] * index[:, 2]
+        valid = (index[:, 0] >= 0) & (ends <= n_values) & (index[:, 3] < n_meta)
+        index = index[:np.argmin(valid) if not valid.all() else len(index)]
+        data_end = HEADER_BYTES + 8 * (int(ends[:len(index)].max()) if len(index) else 0)
+        return index, entries, meta_bytes, data_end
+
+    # ---- ghi ----
+
+    def append(self, columns, **meta):
+        """
+        Ghi một đường cong: columns là dict tên cột -> mảng 1 chiều cùng độ
+        dài; meta là metadata tùy ý (ghi dạng JSON). Trả về chỉ số đường cong.
+        """
+        batch = {name: np.asarray(col, dtype=float)[None] for name, col in columns.items()}
+        return self.append_many(batch, **meta)[0]
+
+    def append_many(self, columns, **meta):
+        """
+        Ghi k đường cong cùng lúc: mỗi cột là mảng [k, số hàng], dùng chung
+        metadata. Cả k khối dữ liệu được ghi bằng một lần write.
+        Trả về range chỉ số các đường cong vừa ghi.
+        """
+        if self.mode != 'a':
+            raise ValueError("Kho mở ở chế độ chỉ đọc")
+        names = list(columns)
+        block = np.stack([np.asarray(columns[name], dtype='<f8') for name in names], axis=1)
+        if block.ndim != 3:
+            raise ValueError("Mỗi cột phải là mảng [số đường cong, số hàng]")
+        k, n_cols, n_rows = block.shape
+
+        meta_id = len(self._meta)
+        entry = {'columns': names, 'meta': meta}
+        line = json.dumps(entry, ensure_ascii=False, default=_json_default)
+        self._meta_file.write(line + '\n')
+        self._meta_file.flush()
+        self._meta.append(json.loads(line))
+
+        start = self._data_values
+        self._data.write(np.ascontiguousarray(block).tobytes())
+        self._data.flush()
+        self._data_values += block.size
+
+        records = np.empty((k, RECORD_FIELDS), dtype='<i8')
+        records[:, 0] = start + np.arange(k) * n_cols * n_rows
+        records[:, 1] = n_cols
+        records[:, 2] = n_rows
+        records[:, 3] = meta_id
+        # Chỉ mục ghi sau cùng: là điểm xác nhận lần ghi
+        self._idx.write(records.tobytes())
+        self._idx.flush()
+        self._index.append(records)
+        self._index_cache = None
+        self._count += k
+        return range(self._count - k, self._count)
+
+    # ---- đọc ----
+
+    @property
+    def index(self):
+        """Bản ghi chỉ mục [số đường cong, 4]: offset, cột, hàng, mã metadata."""
+        if self._index_cache is None:
+            self._index_cache = np.concatenate(self._index)
+            self._index = [self._index_cache]
+        return self._index_cache
+
+    def __len__(self):
+        return self._count
+
+    def _values(self, end):
+        # memmap toàn bộ dữ liệu float64, ánh xạ lại khi kho đã lớn thêm
+        # (chỉ phần có chỉ mục: ở chế độ chỉ đọc đuôi dở dang vẫn còn trên đĩa)
+        if self._map is None or len(self._map) < end:
+            self._map = np.memmap(self.path, dtype='<f8', mode='r', offset=HEADER_BYTES,
+                                  shape=(self._data_values,))
+        return self._map
+
+    def __getitem__(self, i):
+        """
+        Đường cong thứ i: dict tên cột -> view trên memmap (không sao chép).
+        """
+        offset, n_cols, n_rows, meta_id = self.index[i]
+        block = self._values(offset + n_cols * n_rows)[offset:offset + n_cols * n_rows]
+        block = block.reshape(n_cols, n_rows)
+        names = self._meta[meta_id]['columns']
+        return {name: block[j] for j, name in enumerate(names)}
+
+    def meta(self, i):
+        """Metadata của đường cong thứ i, kèm tên cột."""
+        entry = self._meta[self.index[i][3]]
+        return dict(entry['meta'], columns=entry['columns'])
+
+    def to_csv(self, csv_path, indices=None):
+        """
+        Xuất các đường cong (mặc định: tất cả) ra CSV, thêm cột 'curve' là
+        chỉ số đường cong. Các đường cong phải có cùng tên cột. Số được ghi
+        đủ 17 chữ số nên đọc lại không mất độ chính xác.
+        """
+        indices = range(len(self)) if indices is None else indices
+        names = None
+        with open(csv_path, 'w', encoding='utf-8') as f, trace.stage('to_csv') as span:
+            n_rows = 0
+            for i in indices:
+                curve = self[i]
+                if names is None:
+                    names = list(curve)
+                    f.write(','.join(['curve'] + names) + '\n')
+                elif list(curve) != names:
+                    raise ValueError("Các đường cong có cột khác nhau, không gộp được vào một CSV")
+                rows = np.column_stack([np.full(len(curve[names[0]]), i)] +
+                                       [curve[name] for name in names])
+                np.savetxt(f, rows, delimiter=',', fmt=['%d'] + ['%.17g'] * len(names))
+                n_rows += len(rows)
+            span.set(points_out=n_rows)
+
+    # ---- đóng ----
+
+    def close(self):
+        if self.mode == 'a':
+            self._data.close()
+            self._idx.close()
+            self._meta_file.close()
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_curves(columns, store_path, csv_path=None, **meta):
+    """
+    Ghi kết quả làm mượt vào kho store_path (ghi thêm, không ghi đè).
+    columns: dict tên cột -> mảng [số hàng] (một đường cong) hoặc
+    [số nét, số hàng] (mỗi nét một đường cong). Nếu có csv_path thì xuất
+    thêm các đường cong vừa ghi ra CSV. Trả về range chỉ số đường cong.
+    """
+    batch = {name: np.atleast_2d(np.asarray(col, dtype=float)) for name, col in columns.items()}
+    with CurveStore(store_path) as store:
+        written = store.append_many(batch, **meta)
+        if csv_path:
+            store.to_csv(csv_path, written)
+    return written
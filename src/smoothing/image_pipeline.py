@@ -0,0 +1,463 @@
+import time
+
+import numpy as np
+
+from .adaptive_sample import sample_graph, scipy_segments
+from .bezier import graph_to_bezier, scipy_spline_bezier
+from .cache import file_digest
+from .simplify import simplify_polyline, simplify_ragged, subdivide_polyline, subdivide_ragged
+from .strokes import (RaggedPoly, RaggedSpline, RaggedStrokes, dedupe_x,
+                      evaluate_models_ragged, fit_models_ragged, limit_points_ragged,
+                      savgol_ragged)
+from .tiled_contour import largest_contour_tiled
+from . import trace
+
+# Số điểm giữ lại cho mỗi đỉnh RDP trước khi làm mượt
+SIMPLIFY_POINTS_PER_VERTEX = 4
+
+
+@trace.traced('imread')
+def read_grayscale(image_path):
+    """
+    Đọc ảnh -> ảnh trắng đen với mỗi ô có giá trị 0-255.
+    """
+    import cv2
+
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError(f"Không đọc được ảnh: {image_path}")
+    return img
+
+
+def largest_contour(img, threshold=127):
+    """
+    Nhị phân hóa ảnh và trả về đường biên dài nhất, mảng [N, 2] (x, y).
+    """
+    import cv2
+
+    # Với ô > threshold thì thành 0, <= threshold thì thành 255
+    with trace.stage('threshold', points_in=img.size):
+        _, binary = cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY_INV)
+
+    # Tìm ra các đường biên là các đường bao quanh nhóm các điểm 255
+    with trace.stage('find_contours', points_in=binary.size) as span:
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        span.set(points_out=sum(len(c) for c in contours), contours=len(contours))
+    if len(contours) == 0:
+        raise ValueError("Không tìm thấy đường vẽ!")
+
+    # Chọn đường biên dài nhất
+    contour = max(contours, key=len)
+    return contour[:, 0, :]
+
+
+def all_contours(img, threshold=127, min_points=20):
+    """
+    Mọi đường biên ngoài có ít nhất min_points điểm (bỏ đốm nhiễu),
+    gói trong RaggedStrokes theo thứ tự cv2.findContours.
+    """
+    import cv2
+
+    with trace.stage('threshold', points_in=img.size):
+        _, binary = cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY_INV)
+    with trace.stage('find_contours', points_in=binary.size) as span:
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        span.set(points_out=sum(len(c) for c in contours), contours=len(contours))
+    contours = [c[:, 0, :] for c in contours if len(c) >= min_points]
+    if len(contours) == 0:
+        raise ValueError("Không tìm thấy đường vẽ!")
+    return RaggedStrokes.from_list(contours)
+
+
+@trace.traced('find_contours_coarse_to_fine')
+def largest_contour_coarse_to_fine(img, threshold=127, factor=8, pad=None, candidates=8):
+    """
+    Như largest_contour nhưng tìm theo hai mức cho ảnh lớn:
+      - mức thô: thu nhỏ ảnh nhị phân 'factor' lần (INTER_AREA cho tỉ lệ
+        mực trong mỗi khối), giữ khối có nét đi qua (tỉ lệ >= 1/(2*factor),
+        đốm nhiễu lẻ bị bỏ), tìm đường biên và giữ 'candidates' đường dài
+        nhất;
+      - mức mịn: dò lại từng ứng viên ở độ phân giải gốc trong khung bao của
+        nó, nới thêm 'pad' điểm ảnh, và chọn theo độ dài ở độ phân giải gốc
+        (nét ngoằn ngoèo ngắn ở mức thô có thể dài nhất ở mức gốc).
+    Nếu một đường biên tìm được chạm mép khung (khung chưa đủ rộng) thì quay
+    về dò trên toàn ảnh. Trả về (contour [N, 2], thời gian từng mức (giây)).
+    """
+    import cv2
+
+    start = time.perf_counter()
+    H, W = img.shape
+    h, w = H // factor, W // factor
+    if factor < 2 or h < 2 or w < 2:
+        contour = largest_contour(img, threshold)
+        return contour, {'coarse_s': 0.0, 'fine_s': time.perf_counter() - start}
+    if pad is None:
+        pad = 2 * factor
+
+    _, binary = cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY_INV)
+    small = cv2.resize(binary[:h * factor, :w * factor], (w, h), interpolation=cv2.INTER_AREA)
+    _, small = cv2.threshold(small, 255 / (2 * factor), 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(small, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    if len(contours) == 0:
+        # Nét quá mảnh để thấy ở mức thô
+        contour = largest_contour(img, threshold)
+        return contour, {'coarse_s': 0.0, 'fine_s': time.perf_counter() - start}
+    contours = sorted(contours, key=len, reverse=True)[:candidates]
+    coarse_done = time.perf_counter()
+
+    best = None
+    for coarse in contours:
+        bx, by, bw, bh = cv2.boundingRect(coarse)
+        # Khung ở độ phân giải gốc; chạm mép ảnh thu nhỏ thì mở tới mép ảnh gốc
+        x0 = max(0, bx * factor - pad)
+        y0 = max(0, by * factor - pad)
+        x1 = W if bx + bw >= w else min(W, (bx + bw) * factor + pad)
+        y1 = H if by + bh >= h else min(H, (by + bh) * factor + pad)
+        roi = np.ascontiguousarray(binary[y0:y1, x0:x1])
+        found, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE,
+                                    offset=(x0, y0))
+        contour = max(found, key=len)[:, 0, :] if len(found) else None
+        if contour is None or (
+                (x0 > 0 and contour[:, 0].min() <= x0) or
+                (y0 > 0 and contour[:, 1].min() <= y0) or
+                (x1 < W and contour[:, 0].max() >= x1 - 1) or
+                (y1 < H and contour[:, 1].max() >= y1 - 1)):
+            found, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+            best = max(found, key=len)[:, 0, :]
+            break
+        if best is None or len(contour) > len(best):
+            best = contour
+    return best, {'coarse_s': coarse_done - start,
+                  'fine_s': time.perf_counter() - coarse_done}
+
+
+def limit_points(contour, max_points):
+    """
+    Giới hạn số điểm gốc lại theo max_points (chia đều theo chỉ số).
+    """
+    if contour.shape[0] > max_points:
+        idx_ds = np.linspace(0, contour.shape[0] - 1, max_points, dtype=int)
+        contour = contour[idx_ds]
+    return contour
+
+
+@trace.traced('savgol')
+def smooth_points(x, y, polyorder=3, max_window=51):
+    """
+    Làm mượt bằng Savitzky-Golay với cửa sổ lẻ lớn nhất <= max_window.
+    """
+    from scipy.signal import savgol_filter
+
+    window = min(max_window, len(x))
+    if window % 2 == 0:
+        window -= 1
+
+    if window >= polyorder + 2:
+        try:
+            return (savgol_filter(x, window_length=window, polyorder=polyorder),
+                    savgol_filter(y, window_length=window, polyorder=polyorder))
+        except ValueError:
+            # Nếu vẫn lỗi, fallback về dữ liệu gốc
+            pass
+    return x, y
+
+
+def fit_spline_poly(x_smooth, y_smooth, degree=5):
+    """
+    Sắp lại theo x, bỏ x trùng, rồi khớp spline nội suy (CubicSpline,
+    not-a-knot) và BPTT bậc 'degree' (np.poly1d), chưa đánh giá.
+    """
+    from scipy.interpolate import CubicSpline
+
+    # Làm mượt có thể phá thứ tự tăng ngặt của x: sắp lại và bỏ x trùng
+    with trace.stage('dedupe', points_in=len(x_smooth)) as span:
+        x_smooth, unique_idx = np.unique(x_smooth, return_index=True)
+        y_smooth = np.asarray(y_smooth)[unique_idx]
+        span.set(points_out=len(x_smooth))
+    if len(x_smooth) < 2:
+        raise ValueError("Cần ít nhất 2 điểm.")
+
+    with trace.stage('spline_build', points_in=len(x_smooth)):
+        spline = CubicSpline(x_smooth, y_smooth)
+    with trace.stage('polyfit', points_in=len(x_smooth)):
+        poly = np.poly1d(np.polyfit(x_smooth, y_smooth, deg=degree))
+    return spline, poly
+
+
+def evaluate_spline_poly(spline, poly, n_dense=1000):
+    """
+    Đánh giá spline và BPTT trên lưới đều n_dense điểm giữa nút đầu và nút
+    cuối của spline. Trả về x_dense, y_spline, y_bptt.
+    """
+    x_dense = np.linspace(spline.x[0], spline.x[-1], n_dense)
+    with trace.stage('spline_eval', points_out=n_dense):
+        y_spline = spline(x_dense)
+    with trace.stage('polyfit_eval', points_out=n_dense):
+        y_poly = poly(x_dense)
+    return x_dense, y_spline, y_poly
+
+
+def fit_curves(x_smooth, y_smooth, n_dense=1000, degree=5, return_spline=False):
+    """
+    Spline nội suy đi qua mọi điểm mượt và BPTT bậc 'degree',
+    đánh giá trên lưới đều n_dense điểm. return_spline=True trả thêm
+    đối tượng CubicSpline (để xuất Bezier).
+    """
+    spline, poly = fit_spline_poly(x_smooth, y_smooth, degree)
+    x_dense, y_spline, y_poly = evaluate_spline_poly(spline, poly, n_dense)
+    if return_spline:
+        return x_dense, y_spline, y_poly, spline
+    return x_dense, y_spline, y_poly
+
+
+def _cached_fit(cache, image_path, params, fit):
+    """
+    Lấy mô hình (dict mảng) của ảnh từ cache nếu có, không thì gọi fit()
+    -> (mô hình, thời gian) và lưu lại. Trả về (mô hình, thời gian,
+    'hit' / 'miss' / None khi không dùng cache).
+    """
+    if cache is None:
+        return fit() + (None,)
+    start = time.perf_counter()
+    with trace.stage('cache_lookup') as span:
+        key = cache.key(file_digest(image_path), **params)
+        model = cache.get(key)
+        span.set(hit=model is not None)
+    if model is not None:
+        return model, {'cache_s': time.perf_counter() - start}, 'hit'
+    model, timing = fit()
+    cache.put(key, model)
+    return model, timing, 'miss'
+
+
+def _scaled_window(window, points, base):
+    """
+    Cửa sổ Savitzky-Golay cho dãy đã rút gọn: co theo tỉ lệ số điểm còn lại
+    (sau bỏ x trùng) so với base để cửa sổ vẫn phủ cùng một phần trục x như
+    khi chia đều base điểm.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = np.where(base > 0, np.rint(window * points / base), window)
+    return scaled.astype(np.int64)
+
+
+def _stats_model(stats):
+    """Thống kê rút gọn dưới dạng các khóa phẳng lưu được vào bộ đệm."""
+    return {f'simplify_{key}': value for key, value in stats.items()}
+
+
+def _stats_result(model):
+    """Ngược lại _stats_model: dict 'simplify' trong kết quả."""
+    return {'removed': int(model['simplify_removed']),
+            'max_deviation': float(model['simplify_max_deviation']),
+            'points_in': int(model['simplify_points_in']),
+            'points_smoothed': int(model['simplify_points_smoothed'])}
+
+
+def _fit_image(image_path, max_points, threshold, tolerance, coarse_factor, strip_rows,
+               window, polyorder, degree):
+    """
+    Phần nặng của process_image: đọc ảnh, đường biên, rút gọn, lọc x trùng,
+    Savitzky-Golay, khớp spline và BPTT. Trả về (mô hình, thời gian tìm
+    đường biên); mô hình gồm điểm gốc, nút và hệ số CubicSpline, hệ số
+    np.polyfit và thống kê rút gọn, đủ để process_image dựng lại kết quả.
+    """
+    start = time.perf_counter()
+    if strip_rows:
+        contour, height = largest_contour_tiled(image_path, threshold, strip_rows)
+        timing = {'tiled_s': time.perf_counter() - start}
+    else:
+        img = read_grayscale(image_path)
+        height = img.shape[0]
+        if coarse_factor:
+            contour, timing = largest_contour_coarse_to_fine(img, threshold, coarse_factor)
+        else:
+            start = time.perf_counter()
+            contour = largest_contour(img, threshold)
+            timing = {'full_s': time.perf_counter() - start}
+    stats = {'removed': 0, 'max_deviation': 0.0, 'points_in': len(contour)}
+    if tolerance is not None:
+        base = min(len(contour), max_points)
+        contour, simplified = simplify_polyline(contour, tolerance, closed=True)
+        stats.update(simplified)
+        contour = np.rint(subdivide_polyline(contour, base, closed=True,
+                                             max_parts=SIMPLIFY_POINTS_PER_VERTEX))
+    contour = limit_points(contour, max_points)
+
+    # Chuyển về tọa độ x, y
+    x = contour[:, 0]
+    y = height - contour[:, 1]
+
+    with trace.stage('dedupe', points_in=len(x)) as span:
+        x, unique_idx = np.unique(x, return_index=True)
+        y = y[unique_idx]
+        span.set(points_out=len(x))
+    if len(x) < 2:
+        raise ValueError("Cần ít nhất 2 điểm.")
+    stats['points_smoothed'] = len(x)
+    if tolerance is not None:
+        window = _scaled_window(window, len(x), base)
+
+    x_smooth, y_smooth = smooth_points(x, y, polyorder, int(window))
+    spline, poly = fit_spline_poly(x_smooth, y_smooth, degree)
+    model = {'x': x, 'y': y, 'spline_x': spline.x, 'spline_c': spline.c,
+             'bptt_coef': poly.coeffs, **_stats_model(stats)}
+    return model, timing
+
+
+def process_image(image_path, max_points, threshold=127, tolerance=1.0,
+                  coarse_factor=None, strip_rows=None, sample_tolerance=None,
+                  window=51, polyorder=3, degree=5, n_dense=1000, cache=None):
+    """
+    Toàn bộ quy trình cho một ảnh: ngưỡng, đường biên, rút gọn đường biên,
+    Savitzky-Golay, spline và BPTT. Không mở cửa sổ nào, trả về dict các
+    mảng kết quả kèm thống kê rút gọn ('simplify') và các đoạn Bezier của
+    spline ('bezier' [số khúc, 4, 2], 'bezier_offsets').
+    tolerance: sai lệch tối đa (điểm ảnh) khi rút gọn đường biên bằng
+    Ramer-Douglas-Peucker; các cạnh đã rút gọn được chia lại với bước như
+    khi chia đều max_points điểm nhưng không quá SIMPLIFY_POINTS_PER_VERTEX
+    phần mỗi cạnh, nên đoạn thẳng dài đưa ít điểm hơn vào làm mượt (cửa sổ
+    Savitzky-Golay co theo). 'simplify' báo 'points_in' (điểm đường biên) và
+    'points_smoothed' (điểm đưa vào Savitzky-Golay). None để chỉ chia đều
+    theo max_points như cũ.
+    coarse_factor: nếu đặt (ví dụ 8), tìm đường biên theo hai mức
+    thô-mịn (largest_contour_coarse_to_fine) và trả thời gian từng mức
+    trong 'contour_timing'.
+    strip_rows: nếu đặt, không nạp cả ảnh mà ngưỡng và dò đường biên theo
+    từng dải strip_rows hàng (tiled_contour), cho ảnh quét quá lớn.
+    sample_tolerance: nếu đặt (điểm ảnh), lấy mẫu spline thích nghi theo độ
+    cong với sai lệch tối đa này: 'samples' (RaggedStrokes) và báo cáo số
+    mẫu so với lưới đều trong 'sampling'.
+    window, polyorder: Savitzky-Golay; degree: bậc BPTT; n_dense: số điểm
+    lưới đánh giá.
+    cache: một cache.ResultCache để dùng lại hệ số đã khớp cho cùng nội
+    dung ảnh và tham số; 'cache' trong kết quả là 'hit' hoặc 'miss' và
+    'contour_timing' khi trúng chỉ có 'cache_s'.
+    """
+    params = {'pipeline': 'process_image', 'max_points': max_points, 'threshold': threshold,
+              'tolerance': tolerance, 'coarse_factor': coarse_factor,
+              'strip_rows': strip_rows, 'window': window, 'polyorder': polyorder,
+              'degree': degree, 'bc_type': 'not-a-knot'}
+    model, timing, cached = _cached_fit(
+        cache, image_path, params,
+        lambda: _fit_image(image_path, max_points, threshold, tolerance, coarse_factor,
+                           strip_rows, window, polyorder, degree))
+
+    from scipy.interpolate import CubicSpline
+
+    spline = CubicSpline.construct_fast(model['spline_c'], model['spline_x'])
+    poly = np.poly1d(model['bptt_coef'])
+    x_dense, y_spline, y_poly = evaluate_spline_poly(spline, poly, n_dense)
+    bezier = scipy_spline_bezier(spline)
+    result = {
+        'x': model['x'],
+        'y': model['y'],
+        'x_dense': x_dense,
+        'y_spline': y_spline,
+        'y_bptt': y_poly,
+        'bezier': bezier,
+        'bezier_offsets': np.array([0, len(bezier)]),
+        'simplify': _stats_result(model),
+        'contour_timing': timing,
+    }
+    if cached is not None:
+        result['cache'] = cached
+    if sample_tolerance:
+        result['samples'], result['sampling'] = sample_graph(
+            *scipy_segments(spline), sample_tolerance)
+    return result
+
+
+def _fit_image_strokes(image_path, max_points, threshold, tolerance, min_points,
+                       window, polyorder, degree):
+    """
+    Phần nặng của process_image_strokes, trả về (mô hình, thời gian tìm
+    đường biên); mô hình gồm các nét gốc, nút / hệ số / offsets của
+    RaggedSpline, hệ số RaggedPoly và thống kê rút gọn.
+    """
+    img = read_grayscale(image_path)
+    height = img.shape[0]
+    start = time.perf_counter()
+    strokes = all_contours(img, threshold, min_points)
+    timing = {'full_s': time.perf_counter() - start}
+    stats = {'removed': 0, 'max_deviation': 0.0, 'points_in': len(strokes.points)}
+    if tolerance is not None:
+        base = np.minimum(strokes.lengths, max_points)
+        strokes, simplified = simplify_ragged(strokes, tolerance, closed=True)
+        stats.update(simplified)
+        strokes = subdivide_ragged(strokes, base, closed=True,
+                                   max_parts=SIMPLIFY_POINTS_PER_VERTEX)
+        strokes.points[:] = np.rint(strokes.points)
+    strokes = limit_points_ragged(strokes, max_points)
+
+    # Chuyển về tọa độ x, y
+    strokes.points[:, 1] = height - strokes.points[:, 1]
+    strokes = dedupe_x(strokes)
+    keep = strokes.lengths >= 2
+    strokes = strokes.select_strokes(keep)
+    if len(strokes) == 0:
+        raise ValueError("Cần ít nhất 2 điểm.")
+    stats['points_smoothed'] = len(strokes.points)
+    if tolerance is not None:
+        window = _scaled_window(window, strokes.lengths, base[keep])
+
+    # Làm mượt có thể phá thứ tự tăng ngặt của x: sắp lại và bỏ x trùng
+    smooth = dedupe_x(savgol_ragged(strokes, window, polyorder))
+    keep = smooth.lengths >= 2
+    smooth = smooth.select_strokes(keep)
+    strokes = strokes.select_strokes(keep)
+    spline, poly = fit_models_ragged(smooth, degree)
+    model = {'points': strokes.points, 'offsets': strokes.offsets,
+             'spline_x': spline.x, 'spline_c': spline.c, 'spline_offsets': spline.offsets,
+             'bptt_coef': poly.coef, 'bptt_center': poly.center, 'bptt_scale': poly.scale,
+             **_stats_model(stats)}
+    return model, timing
+
+
+def process_image_strokes(image_path, max_points, threshold=127, tolerance=1.0,
+                          min_points=20, sample_tolerance=None, window=51, polyorder=3,
+                          degree=5, n_dense=1000, cache=None):
+    """
+    Như process_image nhưng cho mọi nét trong ảnh (mọi đường biên ngoài có
+    ít nhất min_points điểm). Rút gọn, Savitzky-Golay, spline và BPTT chạy
+    trên cả lô trong một lần gọi mỗi bước; max_points áp dụng cho từng nét.
+    Trả về dict: 'strokes' (RaggedStrokes các điểm gốc), 'x', 'y' (các điểm
+    gốc nối liền), 'x_dense', 'y_spline', 'y_bptt' (mỗi mảng [số nét, n_dense]),
+    'bezier' (điểm điều khiển [số khúc, 4, 2] của spline, đúng tuyệt đối),
+    'bezier_offsets' (khúc theo nét), 'simplify' và 'contour_timing';
+    với sample_tolerance thêm 'samples' và 'sampling' như process_image;
+    với cache thêm 'cache' như process_image.
+    """
+    params = {'pipeline': 'process_image_strokes', 'max_points': max_points,
+              'threshold': threshold, 'tolerance': tolerance, 'min_points': min_points,
+              'window': window, 'polyorder': polyorder, 'degree': degree,
+              'bc_type': 'not-a-knot'}
+    model, timing, cached = _cached_fit(
+        cache, image_path, params,
+        lambda: _fit_image_strokes(image_path, max_points, threshold, tolerance, min_points,
+                                   window, polyorder, degree))
+
+    strokes = RaggedStrokes(model['points'], model['offsets'])
+    spline = RaggedSpline.from_coefficients(model['spline_x'], model['spline_c'],
+                                            model['spline_offsets'])
+    poly = RaggedPoly(model['bptt_coef'], model['bptt_center'], model['bptt_scale'])
+    x_dense, y_spline, y_poly = evaluate_models_ragged(spline, poly, n_dense)
+    x0, h, coef, seg_offsets = spline.segments()
+    result = {
+        'strokes': strokes,
+        'x': strokes.points[:, 0],
+        'y': strokes.points[:, 1],
+        'x_dense': x_dense,
+        'y_spline': y_spline,
+        'y_bptt': y_poly,
+        'bezier': graph_to_bezier(x0, h, coef),
+        'bezier_offsets': seg_offsets,
+        'simplify': _stats_result(model),
+        'contour_timing': timing,
+    }
+    if cached is not None:
+        result['cache'] = cached
+    if sample_tolerance:
+        result['samples'], result['sampling'] = sample_graph(
+            x0, h, coef, seg_offsets, sample_tolerance)
+    return result
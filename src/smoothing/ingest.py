@@ -0,0 +1,325 @@
+"""
+Nhận luồng điểm từ nhiều bút cùng lúc bằng asyncio, có áp lực ngược
+(backpressure) thay vì để bộ nhớ tăng không giới hạn.
+
+Mỗi nét (khóa tùy ý, ví dụ (mã bút, số nét)) có một hàng đợi giới hạn
+stream_queue khối điểm và một task tiêu thụ: task bỏ điểm lặp liền nhau
+(vector hóa theo khối) và gom điểm của nét. Khi nét kết thúc, nét được đưa
+vào hàng đợi khớp (giới hạn fit_queue); task khớp gom tới max_batch nét
+rồi chạy các bước nặng trong executor (mặc định ProcessPoolExecutor):
+Savitzky-Golay, lọc x trùng, spline nội suy và BPTT bậc 'degree', như
+main_with_img.py. Kết quả vào hàng đợi kết quả (giới hạn result_queue).
+
+Chuỗi hàng đợi giới hạn truyền áp lực ngược về nguồn: người đọc kết quả
+chậm -> hàng đợi kết quả đầy -> task khớp dừng -> hàng đợi khớp đầy -> task
+tiêu thụ dừng -> hàng đợi của nét đầy -> push() và end() của bút phải
+chờ. Bộ nhớ đang chờ xử lý vì vậy bị chặn bởi kích thước các hàng đợi.
+
+Ví dụ:
+    pipeline = IngestPipeline()
+    await pipeline.start()
+    await pipeline.push(('pen1', 0), [[x, y], ...])   # chờ khi hàng đợi đầy
+    await pipeline.end(('pen1', 0))
+    result = await pipeline.get_result()   # {'stroke', 'x_dense', 'y_bptt', 'bezier', ...}
+    await pipeline.close()
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from .bezier import graph_to_bezier
+from .cache import array_digest
+from .strokes import RaggedStrokes, dedupe_x, fit_curves_ragged, savgol_ragged
+
+_END = object()
+
+
+def smooth_and_fit(points, offsets, window=51, polyorder=3, n_dense=1000, degree=5):
+    """
+    Các bước nặng cho một lô nét đã kết thúc (chạy trong executor):
+    Savitzky-Golay, lọc x trùng, spline nội suy và BPTT trên lưới n_dense.
+    Trả về danh sách theo nét: dict smoothed, x_dense, y_spline, y_bptt,
+    bezier (các đoạn Bezier đúng của spline), hoặc None nếu nét còn dưới
+    2 điểm sau khi lọc.
+    """
+    smooth = savgol_ragged(RaggedStrokes(points, offsets), window, polyorder)
+    unique = dedupe_x(smooth)
+    ok = unique.lengths >= 2
+    out = [None] * len(ok)
+    if not np.any(ok):
+        return out
+    x_dense, y_spline, y_poly, spline = fit_curves_ragged(
+        unique.select_strokes(ok), n_dense, degree, return_spline=True)
+    x0, h, coef, seg_offsets = spline.segments()
+    bezier = graph_to_bezier(x0, h, coef)
+    for j, s in enumerate(np.flatnonzero(ok)):
+        out[s] = {'smoothed': smooth[s],
+                  'x_dense': x_dense[j],
+                  'y_spline': y_spline[j],
+                  'y_bptt': y_poly[j],
+                  'bezier': bezier[seg_offsets[j]:seg_offsets[j + 1]]}
+    return out
+
+
+class StrokeStream:
+    """
+    Một nét đang nhận: hàng đợi giới hạn, các khối điểm đã lọc lặp và số
+    liệu độ trễ của riêng nét.
+    """
+
+    def __init__(self, key, maxsize, max_points):
+        self.key = key
+        self.queue = asyncio.Queue(maxsize)
+        self.max_points = max_points
+        self.chunks = []
+        self.last = None
+        self.points_in = 0
+        self.points_kept = 0
+        self.points_dropped = 0
+        self.max_queued = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.blocked = 0.0
+        self.opened = time.perf_counter()
+        self.ended = None
+        self.task = None
+
+    def add(self, pts):
+        # Bỏ điểm trùng với điểm ngay trước (kể cả điểm cuối của khối trước)
+        self.points_in += len(pts)
+        if len(pts) == 0:
+            return
+        keep = np.ones(len(pts), dtype=bool)
+        keep[1:] = np.any(pts[1:] != pts[:-1], axis=1)
+        if self.last is not None:
+            keep[0] = np.any(pts[0] != self.last)
+        pts = pts[keep]
+        room = self.max_points - self.points_kept
+        if len(pts) > room:
+            self.points_dropped += len(pts) - room
+            pts = pts[:room]
+        if len(pts):
+            self.chunks.append(pts)
+            self.last = pts[-1]
+            self.points_kept += len(pts)
+
+    def points(self):
+        return np.concatenate(self.chunks) if self.chunks else np.empty((0, 2))
+
+    def metrics(self, now):
+        return {'queued': self.queue.qsize(),
+                'max_queued': self.max_queued,
+                'points_in': self.points_in,
+                'points_kept': self.points_kept,
+                'points_dropped': self.points_dropped,
+                'lag_ms': self.lag * 1000,
+                'max_lag_ms': self.max_lag * 1000,
+                'blocked_ms': self.blocked * 1000,
+                'age_s': now - self.opened}
+
+
+class IngestPipeline:
+    """
+    Lớp nhận nét bất đồng bộ cho nhiều bút; xem mô tả module.
+
+    executor: executor chạy smooth_and_fit; None thì tạo ProcessPoolExecutor
+    'workers' tiến trình (đóng cùng pipeline). Với executor luồng, phần
+    Python của các bước khớp giữ GIL và làm chậm vòng lặp sự kiện.
+    max_points: số điểm tối đa giữ cho một nét; điểm vượt bị bỏ và đếm
+    trong points_dropped.
+    cache: một cache.ResultCache; nếu có, kết quả khớp được đệm theo nội
+    dung điểm của nét và các tham số khớp, nét đã gặp không gửi vào executor.
+    """
+
+    def __init__(self, executor=None, workers=None, stream_queue=64, fit_queue=64,
+                 result_queue=256, max_batch=32, max_inflight=None, window=51,
+                 polyorder=3, n_dense=1000, degree=5, max_points=100000, history=10000,
+                 cache=None):
+        self._own_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(workers)
+        self.stream_queue = stream_queue
+        self.max_batch = max_batch
+        self.max_points = max_points
+        self.params = dict(window=window, polyorder=polyorder, n_dense=n_dense, degree=degree)
+        self.cache = cache
+        self._fit_queue = asyncio.Queue(fit_queue)
+        self._results = asyncio.Queue(result_queue)
+        self._inflight = asyncio.Semaphore(max_inflight or workers or os.cpu_count() or 1)
+        self._streams = {}
+        self._consumers = set()
+        self._fit_tasks = set()
+        self._fitter = None
+        self._finished = deque(maxlen=history)
+        self.strokes_done = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def start(self):
+        """Bật task khớp; gọi trong vòng lặp sự kiện trước khi push."""
+        self._fitter = asyncio.create_task(self._fit_loop())
+
+    def _stream(self, key):
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = StrokeStream(key, self.stream_queue, self.max_points)
+            self._streams[key] = stream
+            task = asyncio.create_task(self._consume(stream))
+            stream.task = task
+            self._consumers.add(task)
+            task.add_done_callback(self._consumers.discard)
+        return stream
+
+    async def push(self, key, points):
+        """
+        Thêm các điểm (mảng [k, 2] hoặc một điểm (x, y)) vào nét 'key',
+        mở nét nếu chưa có. Chờ khi hàng đợi của nét đầy (áp lực ngược).
+        """
+        stream = self._stream(key)
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        start = time.perf_counter()
+        await stream.queue.put((pts, start))
+        stream.blocked += time.perf_counter() - start
+        stream.max_queued = max(stream.max_queued, stream.queue.qsize())
+
+    async def end(self, key):
+        """
+        Kết thúc nét 'key'. Chờ tới khi nét được nhận vào hàng đợi khớp, nên
+        khi khâu khớp tụt lại, bút không mở được nét mới (áp lực ngược không
+        bị lách qua các nét mới). push sau đó với cùng khóa mở một nét mới.
+        """
+        stream = self._streams.pop(key, None)
+        if stream is not None:
+            start = time.perf_counter()
+            await stream.queue.put((_END, start))
+            await stream.task
+            stream.blocked += time.perf_counter() - start
+
+    async def _consume(self, stream):
+        while True:
+            item, queued_at = await stream.queue.get()
+            now = time.perf_counter()
+            stream.lag = now - queued_at
+            stream.max_lag = max(stream.max_lag, stream.lag)
+            if item is _END:
+                break
+            stream.add(item)
+        stream.ended = time.perf_counter()
+        # Chờ khi hàng đợi khớp đầy: áp lực ngược lan về hàng đợi của nét
+        await self._fit_queue.put(stream)
+
+    async def _fit_loop(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            stream = await self._fit_queue.get()
+            if stream is None:
+                break
+            batch = [stream]
+            # Gom các nét đã chờ sẵn, không đợi thêm
+            while len(batch) < self.max_batch and not self._fit_queue.empty():
+                stream = self._fit_queue.get_nowait()
+                if stream is None:
+                    closing = True
+                    break
+                batch.append(stream)
+            await self._inflight.acquire()
+            task = asyncio.create_task(self._fit(loop, batch))
+            self._fit_tasks.add(task)
+            task.add_done_callback(self._fit_tasks.discard)
+
+    async def _fit(self, loop, batch):
+        try:
+            points = [s.points() for s in batch]
+            fitted, keys = [None] * len(batch), None
+            if self.cache is not None:
+                keys = [self.cache.key(array_digest(p), pipeline='ingest',
+                                       bc_type='not-a-knot', **self.params) for p in points]
+                fitted = [self.cache.get(key) for key in keys]
+            missing = [i for i, result in enumerate(fitted) if result is None]
+            if missing:
+                todo = [points[i] for i in missing]
+                offsets = np.concatenate([[0], np.cumsum([len(p) for p in todo])])
+                try:
+                    computed = await loop.run_in_executor(
+                        self.executor, partial(smooth_and_fit, **self.params),
+                        np.concatenate(todo), offsets)
+                except Exception as exc:
+                    computed = [{'error': f"{type(exc).__name__}: {exc}"}] * len(missing)
+                self.batches += 1
+                for i, result in zip(missing, computed):
+                    fitted[i] = result
+                    if keys is not None and result is not None and 'error' not in result:
+                        self.cache.put(keys[i], result)
+            for stream, result in zip(batch, fitted):
+                result = dict(result) if result is not None else {
+                    'error': "Nét cần ít nhất 2 điểm sau khi lọc"}
+                if 'error' in result:
+                    self.errors += 1
+                now = time.perf_counter()
+                result['stroke'] = stream.key
+                result['metrics'] = dict(stream.metrics(now), fit_ms=(now - stream.ended) * 1000)
+                # Chờ khi người đọc kết quả chậm
+                await self._results.put(result)
+                self._finished.append(result['metrics'])
+                self.strokes_done += 1
+        finally:
+            self._inflight.release()
+
+    async def get_result(self):
+        """Kết quả kế tiếp; None sau khi close() đã xả hết."""
+        return await self._results.get()
+
+    async def results(self):
+        """Duyệt kết quả cho tới khi pipeline đóng (async for)."""
+        while True:
+            result = await self._results.get()
+            if result is None:
+                return
+            yield result
+
+    def metrics(self):
+        """
+        Số liệu hiện tại: từng nét đang nhận (hàng đợi, độ trễ từ lúc push
+        tới lúc được xử lý, thời gian push phải chờ...) và tổng hợp.
+        """
+        now = time.perf_counter()
+        streams = {key: s.metrics(now) for key, s in self._streams.items()}
+        finished = list(self._finished)
+        lags = np.array([m['max_lag_ms'] for m in finished]) if finished else np.zeros(0)
+        fits = np.array([m['fit_ms'] for m in finished]) if finished else np.zeros(0)
+        return {'active_streams': len(streams),
+                'queued_chunks': sum(m['queued'] for m in streams.values()),
+                'max_lag_ms': max([m['lag_ms'] for m in streams.values()], default=0.0),
+                'fit_queue': self._fit_queue.qsize(),
+                'result_queue': self._results.qsize(),
+                'strokes_done': self.strokes_done,
+                'batches': self.batches,
+                'errors': self.errors,
+                'stream_lag_p50_ms': float(np.percentile(lags, 50)) if len(lags) else None,
+                'stream_lag_p99_ms': float(np.percentile(lags, 99)) if len(lags) else None,
+                'fit_p50_ms': float(np.percentile(fits, 50)) if len(fits) else None,
+                'fit_p99_ms': float(np.percentile(fits, 99)) if len(fits) else None,
+                'cache': self.cache.stats() if self.cache is not None else None,
+                'streams': streams}
+
+    async def close(self):
+        """
+        Kết thúc mọi nét còn mở, chờ khớp xong, rồi đặt None vào hàng đợi
+        kết quả (nên vẫn cần người đọc kết quả tới lúc đó).
+        """
+        for key in list(self._streams):
+            await self.end(key)
+        while self._consumers:
+            await asyncio.gather(*list(self._consumers))
+        await self._fit_queue.put(None)
+        await self._fitter
+        while self._fit_tasks:
+            await asyncio.gather(*list(self._fit_tasks))
+        await self._results.put(None)
+        if self._own_executor:
+            self.executor.shutdown()
@@ -0,0 +1,141 @@
+"""
+Vẽ nhanh kết quả làm mượt thẳng vào ảnh Pillow, không qua Matplotlib.
+
+Dùng cho chế độ chạy hàng loạt: điểm gốc và các đường cong được đổi sang
+tọa độ điểm ảnh bằng NumPy rồi vẽ bằng ImageDraw trên ảnh phóng to
+'supersample' lần, sau đó thu nhỏ (Image.reduce) để khử răng cưa. Không có trục,
+chú thích hay lưới; cần hình có chú thích thì dùng Matplotlib như cũ.
+"""
+import os
+
+import numpy as np
+
+from .strokes import join_rows
+from . import trace
+
+RAW_COLOR = (255, 178, 178)      # đỏ nhạt, như 'r.' với alpha=0.3
+SPLINE_COLOR = (0, 0, 255)
+BPTT_COLOR = (0, 128, 0)
+
+
+class RasterCanvas:
+    """
+    Ảnh RGB width x height cho vùng dữ liệu bounds = (xmin, xmax, ymin, ymax),
+    trục y hướng lên như đồ thị, chừa lề 'margin' (tỉ lệ theo cạnh ảnh).
+    """
+
+    def __init__(self, width, height, bounds, margin=0.04, supersample=3,
+                 background=(255, 255, 255)):
+        from PIL import Image, ImageDraw
+
+        self.width, self.height = width, height
+        self.ss = max(1, int(supersample))
+        self.image = Image.new('RGB', (width * self.ss, height * self.ss), background)
+        self.draw = ImageDraw.Draw(self.image)
+        xmin, xmax, ymin, ymax = bounds
+        W, H = self.image.size
+        pad_x, pad_y = margin * W, margin * H
+        # Cùng tỉ lệ cho hai trục để hình không méo
+        scale = min((W - 2 * pad_x) / max(xmax - xmin, 1e-12),
+                    (H - 2 * pad_y) / max(ymax - ymin, 1e-12))
+        self._scale = scale
+        self._x0 = (W - scale * (xmax - xmin)) / 2 - scale * xmin
+        self._y0 = (H + scale * (ymax - ymin)) / 2 + scale * ymin
+
+    def to_pixels(self, x, y):
+        """Tọa độ dữ liệu -> tọa độ điểm ảnh (trên ảnh phóng to)."""
+        return (self._x0 + self._scale * np.asarray(x, dtype=float),
+                self._y0 - self._scale * np.asarray(y, dtype=float))
+
+    def polyline(self, x, y, color, width=2):
+        """
+        Đường gấp khúc qua (x, y); NaN tách thành nhiều đường (join_rows).
+        """
+        px, py = self.to_pixels(x, y)
+        finite = np.isfinite(px) & np.isfinite(py)
+        # Chỉ số bắt đầu / kết thúc của từng đoạn hữu hạn liên tiếp
+        edges = np.diff(np.concatenate([[0], finite.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        xy = np.column_stack([px, py])
+        w = max(1, int(round(width * self.ss)))
+        for a, b in zip(starts, ends):
+            if b - a >= 2:
+                self.draw.line(xy[a:b].ravel().tolist(), fill=color, width=w, joint='curve')
+
+    def points(self, x, y, color, radius=1.5):
+        """
+        Các điểm tròn bán kính 'radius' (điểm ảnh của ảnh kết quả): mỗi độ
+        lệch trong hình tròn là một lệnh ImageDraw.point cho mọi điểm.
+        """
+        px, py = self.to_pixels(x, y)
+        keep = np.isfinite(px) & np.isfinite(py)
+        px = np.round(px[keep]).astype(int)
+        py = np.round(py[keep]).astype(int)
+        r = max(0, int(round(radius * self.ss)))
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        disk = dx ** 2 + dy ** 2 <= r * r
+        for ox, oy in zip(dx[disk], dy[disk]):
+            self.draw.point(np.column_stack([px + ox, py + oy]).ravel().tolist(), fill=color)
+
+    def to_image(self):
+        """
+        Ảnh kết quả width x height (thu nhỏ 'supersample' lần để khử răng cưa;
+        Image.reduce nhanh hơn resize nhiều với hệ số nguyên).
+        """
+        if self.ss == 1:
+            return self.image
+        return self.image.reduce(self.ss)
+
+
+def result_bounds(result):
+    # Khung bao mọi dữ liệu hữu hạn của kết quả
+    arrays_x = [result['x'], np.ravel(result['x_dense'])]
+    arrays_y = [result['y'], np.ravel(result['y_bptt'])]
+    if 'samples' in result:
+        arrays_x.append(result['samples'].points[:, 0])
+        arrays_y.append(result['samples'].points[:, 1])
+    else:
+        arrays_y.append(np.ravel(result['y_spline']))
+    xs = np.concatenate([np.asarray(a, dtype=float) for a in arrays_x])
+    ys = np.concatenate([np.asarray(a, dtype=float) for a in arrays_y])
+    xs, ys = xs[np.isfinite(xs)], ys[np.isfinite(ys)]
+    return xs.min(), xs.max(), ys.min(), ys.max()
+
+
+def render_result(result, size=(1200, 720), supersample=3):
+    """
+    Vẽ kết quả của image_pipeline (điểm gốc, spline, BPTT) thành ảnh Pillow.
+    Spline lấy từ 'samples' (lấy mẫu thích nghi) nếu có, không thì từ lưới
+    x_dense. Nhận cả kết quả một nét lẫn nhiều nét.
+    """
+    canvas = RasterCanvas(size[0], size[1], result_bounds(result), supersample=supersample)
+    canvas.points(result['x'], result['y'], RAW_COLOR)
+    x_dense = join_rows(np.atleast_2d(result['x_dense']))
+    if 'samples' in result:
+        spline = result['samples'].with_breaks()
+        canvas.polyline(spline[:, 0], spline[:, 1], SPLINE_COLOR, width=2)
+    else:
+        canvas.polyline(x_dense, join_rows(np.atleast_2d(result['y_spline'])),
+                        SPLINE_COLOR, width=2)
+    canvas.polyline(x_dense, join_rows(np.atleast_2d(result['y_bptt'])), BPTT_COLOR, width=1.5)
+    return canvas
+
+
+@trace.traced('render')
+def save_render(result, png_path, size=(1200, 720), thumbnail=None):
+    """
+    Ghi <png_path> và, nếu thumbnail (cạnh dài nhất, điểm ảnh) được đặt,
+    thêm <tên>_thumb.png cùng thư mục. Trả về danh sách file đã ghi.
+    """
+    from PIL import Image
+
+    image = render_result(result, size).to_image()
+    image.save(png_path, compress_level=1)
+    written = [png_path]
+    if thumbnail:
+        image.thumbnail((thumbnail, thumbnail), Image.BOX)
+        thumb_path = os.path.splitext(png_path)[0] + "_thumb.png"
+        image.save(thumb_path, compress_level=1)
+        written.append(thumb_path)
+    return written
@@ -0,0 +1,122 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def savgol_kernels(window, polyorder):
+    """
+    Hệ số Savitzky-Golay cho một cặp (window, polyorder), chỉ tính một lần:
+      center - vector [window] cho điểm giữa cửa sổ,
+      start  - ma trận [half, window] cho half điểm đầu nét,
+      end    - ma trận [half, window] cho half điểm cuối nét.
+    start/end là phép khớp đa thức bậc polyorder trên window điểm ở mép,
+    giống mode='interp' của scipy.signal.savgol_filter.
+    """
+    half = window // 2
+    t = np.arange(window, dtype=float)
+    fit = np.linalg.pinv(np.vander(t, polyorder + 1))
+    # Điểm giữa: cùng phép khớp, đánh giá tại tâm cửa sổ
+    # (bằng scipy.signal.savgol_coeffs(window, polyorder, use='dot'))
+    center = (np.vander(t[half:half + 1], polyorder + 1) @ fit)[0]
+    start = np.vander(t[:half], polyorder + 1) @ fit
+    end = np.vander(t[window - half:], polyorder + 1) @ fit
+    for arr in (center, start, end):
+        arr.setflags(write=False)
+    return center, start, end
+
+
+def savgol_batch(points, window=51, polyorder=3):
+    """
+    Lọc cả mảng points [n, dim] một lần, cùng quy tắc chọn cửa sổ với
+    image_pipeline.smooth_points: cửa sổ lẻ lớn nhất <= min(window, n),
+    trả nguyên dữ liệu nếu cửa sổ < polyorder + 2.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    w = min(window, n)
+    if w % 2 == 0:
+        w -= 1
+    if w < polyorder + 2:
+        return points.copy()
+    center, start, end = savgol_kernels(w, polyorder)
+    half = w // 2
+    out = np.empty_like(points)
+    windows = np.lib.stride_tricks.sliding_window_view(points, w, axis=0)
+    out[half:n - half] = np.einsum('k,n...k->n...', center, windows)
+    out[:half] = start @ points[:w]
+    out[n - half:] = end @ points[n - w:]
+    return out
+
+
+class StreamingSavgol:
+    """
+    Bộ lọc Savitzky-Golay trực tuyến cho nét vẽ đang được thu.
+
+    Giữ một ring buffer window mẫu gần nhất; mỗi mẫu mới push vào trả ra
+    điểm đã làm mượt trễ đúng half = window // 2 mẫu. Khi kết thúc nét
+    (finish), half điểm cuối được tính như mode='interp' của savgol_filter,
+    nên toàn bộ kết quả trùng với lọc cả mảng một lần mà không phải lọc lại.
+    """
+
+    def __init__(self, window=51, polyorder=3, dim=2):
+        if window % 2 == 0 or window < polyorder + 2:
+            raise ValueError("window phải lẻ và >= polyorder + 2.")
+        self.window = window
+        self.polyorder = polyorder
+        self.dim = dim
+        self.center, self.start, self.end = savgol_kernels(window, polyorder)
+        self.reset()
+
+    def reset(self):
+        """
+        Bắt đầu một nét mới.
+        """
+        self._ring = np.zeros((self.window, self.dim))
+        self._count = 0
+        self._chunks = []
+        self.finished = False
+
+    def _ordered(self):
+        # window mẫu gần nhất theo thứ tự thời gian
+        head = self._count % self.window
+        return np.roll(self._ring, -head, axis=0)
+
+    def push(self, point):
+        """
+        Thêm một mẫu, trả về các điểm mượt mới (mảng [k, dim], k = 0, 1
+        hoặc half + 1 khi cửa sổ vừa đầy lần đầu).
+        """
+        if self.finished:
+            raise RuntimeError("Nét đã kết thúc, gọi reset() để bắt đầu nét mới.")
+        self._ring[self._count % self.window] = point
+        self._count += 1
+        if self._count < self.window:
+            return np.empty((0, self.dim))
+        samples = self._ordered()
+        out = (self.center @ samples)[None, :]
+        if self._count == self.window:
+            out = np.vstack([self.start @ samples, out])
+        self._chunks.append(out)
+        return out
+
+    def finish(self):
+        """
+        Kết thúc nét, trả về các điểm mượt còn lại ở mép cuối.
+        """
+        self.finished = True
+        if self._count >= self.window:
+            out = self.end @ self._ordered()
+        else:
+            # Nét ngắn hơn cửa sổ: chưa phát điểm nào, lọc cả nét với cửa sổ nhỏ hơn
+            out = savgol_batch(self._ring[:self._count], self.window, self.polyorder)
+        self._chunks.append(out)
+        return out
+
+    def result(self):
+        """
+        Toàn bộ các điểm mượt đã phát ra, mảng [n, dim].
+        """
+        if not self._chunks:
+            return np.empty((0, self.dim))
+        return np.vstack(self._chunks)
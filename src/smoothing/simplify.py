@@ -0,0 +1,171 @@
+import numpy as np
+
+from .strokes import RaggedStrokes, _ranges
+from . import trace
+
+
+def _segment_distances(pts, idx, kept):
+    """
+    Khoảng cách từ các điểm pts[idx] đến dây cung của đoạn (giữa hai điểm
+    giữ lại liên tiếp trong kept) chứa chúng. Trả về (dist, seg).
+    """
+    seg = np.searchsorted(kept, idx, side='right') - 1
+    seg = np.minimum(seg, len(kept) - 2)
+    a = pts[kept[seg]]
+    ab = pts[kept[seg + 1]] - a
+    ap = pts[idx] - a
+    length = np.hypot(ab[:, 0], ab[:, 1])
+    cross = np.abs(ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dist = np.where(length > 0, cross / length, np.hypot(ap[:, 0], ap[:, 1]))
+    return dist, seg
+
+
+def _rdp(work, keep, tolerance):
+    """
+    Vòng lặp RDP theo mức trên work, với keep là các điểm đã giữ ban đầu
+    (ít nhất hai đầu mút). Cập nhật keep tại chỗ, trả về sai lệch lớn nhất.
+    """
+    # Chỉ các điểm thuộc đoạn chưa đạt ngưỡng mới cần tính lại
+    active = np.flatnonzero(~keep)
+    max_dev = 0.0
+
+    while active.size:
+        kept = np.flatnonzero(keep)
+        dist, seg = _segment_distances(work, active, kept)
+        start = np.flatnonzero(np.r_[True, seg[1:] != seg[:-1]])
+        seg_max = np.maximum.reduceat(dist, start)
+        split = seg_max > tolerance
+        if not np.all(split):
+            max_dev = max(max_dev, float(seg_max[~split].max()))
+        # Điểm xa nhất (đầu tiên) của mỗi đoạn cần tách
+        count = np.diff(np.r_[start, len(active)])
+        point_max = np.repeat(seg_max, count)
+        point_split = np.repeat(split, count)
+        cand = np.flatnonzero(point_split & (dist == point_max))
+        _, first = np.unique(seg[cand], return_index=True)
+        keep[active[cand[first]]] = True
+        active = active[point_split & ~keep[active]]
+    return max_dev
+
+
+@trace.traced('simplify')
+def simplify_polyline(points, tolerance=1.0, closed=False):
+    """
+    Rút gọn đường gấp khúc bằng Ramer-Douglas-Peucker, sai lệch tối đa
+    'tolerance' (cùng đơn vị với points, với ảnh là điểm ảnh).
+
+    Thay vì đệ quy từng đoạn, mỗi vòng tính khoảng cách cho mọi điểm
+    cùng lúc và tách đồng thời mọi đoạn còn vượt ngưỡng, nên mỗi vòng O(n)
+    và số vòng cỡ log n với đường biên thông thường.
+    closed=True cho đường khép kín (như đường biên của cv2.findContours).
+
+    Trả về (điểm đã rút gọn, thống kê {'removed', 'max_deviation'}).
+    """
+    pts = np.asarray(points)
+    n = len(pts)
+    if n <= 2:
+        return pts, {'removed': 0, 'max_deviation': 0.0}
+    work = pts.astype(float)
+    if closed:
+        # Nối điểm đầu vào cuối để xử lý như đường mở
+        work = np.vstack([work, work[:1]])
+    keep = np.zeros(len(work), dtype=bool)
+    keep[[0, -1]] = True
+    max_dev = _rdp(work, keep, tolerance)
+
+    if closed:
+        keep = keep[:-1]
+    kept_pts = pts[keep]
+    return kept_pts, {'removed': int(n - len(kept_pts)),
+                      'max_deviation': max_dev}
+
+
+@trace.traced('simplify')
+def simplify_ragged(strokes, tolerance=1.0, closed=False):
+    """
+    Như simplify_polyline cho mọi nét của RaggedStrokes trong cùng các vòng
+    lặp: đầu mút của mọi nét được giữ từ đầu nên không đoạn nào nối hai nét.
+    Nét có <= 2 điểm giữ nguyên. Trả về (RaggedStrokes, thống kê tổng).
+    """
+    n = strokes.lengths
+    ext = n + (1 if closed else 0) * (n > 2)
+    idx = _ranges(strokes.offsets[:-1], ext)
+    ends = np.cumsum(ext) - 1
+    if closed:
+        # Nối điểm đầu vào cuối mỗi nét khép kín
+        wrap = n > 2
+        idx[ends[wrap]] = strokes.offsets[:-1][wrap]
+    work = strokes.points[idx].astype(float)
+    keep = np.zeros(len(work), dtype=bool)
+    keep[(ends - ext + 1)[ext > 0]] = True
+    keep[ends[ext > 0]] = True
+    keep[np.repeat(ext <= 2, ext)] = True
+    max_dev = _rdp(work, keep, tolerance)
+
+    if closed:
+        # Bỏ điểm nối thêm
+        keep[ends[n > 2]] = False
+    counts = np.bincount(np.repeat(np.arange(len(n)), ext)[keep], minlength=len(n))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    out = RaggedStrokes(strokes.points[idx[keep]], offsets)
+    return out, {'removed': int(n.sum() - len(out.points)),
+                 'max_deviation': max_dev}
+
+
+@trace.traced('subdivide')
+def subdivide_ragged(strokes, counts, closed=False, max_parts=None):
+    """
+    Thêm điểm trên các cạnh của đường gấp khúc (thường là kết quả RDP): mỗi
+    cạnh được chia thành max(1, round(độ dài / bước)) phần bằng nhau, bước =
+    độ dài nét / counts[i], nên nét i có khoảng counts[i] điểm cách nhau gần
+    đều theo độ dài cung. max_parts giới hạn số phần của mỗi cạnh: cạnh
+    thẳng dài chỉ còn vài điểm, đoạn cong (nhiều đỉnh gần nhau) giữ mật độ
+    cũ. Mọi đỉnh cũ được giữ nguyên (góc RDP không bị dời); closed=True tính
+    cả cạnh nối điểm cuối về điểm đầu (nét > 2 điểm). Trả về RaggedStrokes
+    (float).
+    """
+    n = strokes.lengths
+    k = len(n)
+    counts = np.asarray(counts, dtype=float)
+    wrap = closed & (n > 2)
+    ext = n + wrap
+    idx = _ranges(strokes.offsets[:-1], ext)
+    ends = np.cumsum(ext) - 1
+    idx[ends[wrap]] = strokes.offsets[:-1][wrap]
+    work = strokes.points[idx].astype(float)
+    sid = np.repeat(np.arange(k), ext)
+
+    # Cạnh j nối work[j] và work[j + 1] trong cùng nét
+    is_edge = np.ones(len(work), dtype=bool)
+    is_edge[ends[ext > 0]] = False
+    edge = np.flatnonzero(is_edge)
+    length = np.hypot(*(work[edge + 1] - work[edge]).T)
+    total = np.bincount(sid[edge], length, minlength=k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step = np.where(counts > 0, total / counts, 0.0)
+        parts = np.where(step[sid[edge]] > 0, np.rint(length / step[sid[edge]]), 1)
+    if max_parts is not None:
+        parts = np.minimum(parts, max_parts)
+    parts = np.maximum(parts, 1).astype(np.int64)
+
+    # Điểm trên các cạnh (gồm đỉnh đầu cạnh), rồi đỉnh cuối của nét mở
+    start = np.repeat(edge, parts)
+    j = np.arange(parts.sum()) - np.repeat(np.cumsum(parts) - parts, parts)
+    frac = j / np.repeat(parts, parts)
+    last = ends[(ext > 0) & ~wrap]
+    pos = np.concatenate([start, last])
+    frac = np.concatenate([frac, np.zeros(len(last))])
+    order = np.lexsort((frac, pos))
+    pos, frac = pos[order], frac[order]
+    nxt = np.minimum(pos + 1, len(work) - 1)
+    points = work[pos] + frac[:, None] * (work[nxt] - work[pos])
+    out_counts = np.bincount(sid[pos], minlength=k)
+    return RaggedStrokes(points, np.concatenate([[0], np.cumsum(out_counts)]))
+
+
+def subdivide_polyline(points, count, closed=False, max_parts=None):
+    """Như subdivide_ragged cho một đường gấp khúc [n, 2]."""
+    pts = np.asarray(points)
+    strokes = RaggedStrokes(pts, [0, len(pts)])
+    return subdivide_ragged(strokes, [count], closed, max_parts).points
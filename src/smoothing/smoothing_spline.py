@@ -0,0 +1,293 @@
+"""
+Spline làm mượt có phạt (penalized cubic smoothing spline) cho nhiều nét,
+thay cho hai bước Savitzky-Golay + spline nội suy và BPTT bậc cố định.
+
+Với mỗi nét (t_i, y_i), hàm g là spline bậc 3 tự nhiên có nút tại mọi t_i
+cực tiểu hóa
+    sum (y_i - g(t_i))^2 + lam * tích phân g''(t)^2 dt.
+Theo dạng Reinsch (Green & Silverman), với gamma là đạo hàm bậc hai tại các
+nút trong, R ba đường chéo và Q [n, n-2] sai phân bậc hai: Q^T g = R gamma
+và g = y - lam Q gamma. Thay vì giải (R + lam Q^T Q) gamma = Q^T y (tạo
+Q^T Q làm số điều kiện tăng theo bình phương, hỏng khi lam lớn hoặc nút
+sát nhau), ta giải hệ mở rộng đối xứng tựa xác định (quasi-definite)
+    [ R   -Q^T  ] [gamma]   [   0    ]
+    [ -Q  -I/lam] [  g  ] = [ -y/lam ]
+xếp theo từng nút (gamma_i, g_i): ba đường chéo khối 2x2, O(n) mỗi nét.
+
+lam của từng nét được chọn bằng generalized cross-validation
+    GCV(lam) = n * RSS / (n - tr A)^2,
+A là ma trận mũ (g = A y), tr A là số bậc tự do hiệu dụng. Khối (g, g) của
+nghịch đảo hệ mở rộng bằng -lam A nên tr A chỉ cần các khối chéo của
+nghịch đảo (Hutchinson & de Hoog). Thay vì vòng lặp Python từng điểm như
+thuật toán gốc, hệ được giải bằng rút gọn vòng (cyclic reduction) trên cả
+lô: log2(n) bước vector hóa, mỗi bước vừa khử nghiệm vừa dựng lại các khối
+của nghịch đảo. Mọi nét (mỗi nét một lam) giải chung một lần vì các khối
+nối hai nét bằng 0.
+"""
+import numpy as np
+
+from .strokes import RaggedSpline, RaggedStrokes, arc_length_param
+from . import trace
+
+# lam được tìm theo độ rộng nhân tương đương w (số điểm), log10 w từ
+# GCV_RANGE[0] (gần nội suy) tới log10(n) + GCV_RANGE[1] (gần đường thẳng)
+GCV_RANGE = (-0.5, 0.5)
+GCV_GRID = 13
+GCV_STEPS = 8
+# Số điểm lưới khi tìm lại lam sau khi đổi tham số (xem smooth_parametric_ragged)
+GCV_REFINE_GRID = 5
+
+
+# Các lô ma trận 2x2 lưu dạng [2, 2, m] (vế phải [2, d, m]): einsum nhân cả
+# lô trên các mảng dài m, nhanh hơn nhiều so với np.matmul trên [m, 2, 2]
+def _mul(a, b):
+    """a [2, 2, m] nhân b [2, q, m] -> [2, q, m]."""
+    return np.einsum('ijm,jkm->ikm', a, b)
+
+
+def _tr(a):
+    return np.ascontiguousarray(a.transpose(1, 0, 2))
+
+
+def _inv2(a):
+    det = a[0, 0] * a[1, 1] - a[0, 1] * a[1, 0]
+    return np.stack([np.stack([a[1, 1], -a[0, 1]]), np.stack([-a[1, 0], a[0, 0]])]) / det
+
+
+def _shift(a, m):
+    """a[..., 1:m+1], thêm 0 ở cuối cho đủ m phần tử."""
+    out = np.zeros(a.shape[:-1] + (m,))
+    tail = a[..., 1:m + 1]
+    out[..., :tail.shape[-1]] = tail
+    return out
+
+
+def block_cyclic_reduction(D, E, f):
+    """
+    Giải hệ đối xứng ba đường chéo khối 2x2 mà mọi phần bù Schur của khối
+    đều khả nghịch (ví dụ xác định dương hoặc tựa xác định): khối chéo
+    D [2, 2, m], khối E [2, 2, m] nối khối i với i+1 (E[..., m-1] = 0), vế
+    phải f [2, d, m]. Trả về (nghiệm x [2, d, m], khối chéo S_ii và khối
+    S_{i,i+1} [2, 2, m] của nghịch đảo).
+    """
+    m = D.shape[-1]
+    if m == 1:
+        S = _inv2(D)
+        return _mul(S, f), S, np.zeros_like(D)
+    # Khử các khối lẻ (không nối nhau), còn lại hệ cùng dạng trên các khối chẵn
+    G = _inv2(D[..., 1::2])
+    k = G.shape[-1]
+    L = np.ascontiguousarray(E[..., 0::2][..., :k])  # E_{j-1}: khối lẻ j nối khối chẵn j-1
+    U = np.ascontiguousarray(E[..., 1::2])           # E_j: nối khối chẵn j+1 (0 ở cuối)
+    Lt, Ut = _tr(L), _tr(U)
+    fo = np.ascontiguousarray(f[..., 1::2])
+    LG = _mul(L, G)
+    GU = _mul(G, U)
+    De = D[..., 0::2].copy()
+    fe = f[..., 0::2].copy()
+    De[..., :k] -= _mul(LG, Lt)
+    fe[..., :k] -= _mul(LG, fo)
+    # Khối lẻ cuối cùng (m chẵn) không có khối chẵn bên phải: U = 0
+    r = De.shape[-1] - 1
+    De[..., 1:] -= _mul(Ut, GU)[..., :r]
+    fe[..., 1:] -= _mul(_tr(GU), fo)[..., :r]
+    Ee = np.zeros_like(De)
+    Ee[..., :k] = -_mul(LG, U)
+    xe, Sd_e, So_e = block_cyclic_reduction(De, Ee, fe)
+
+    # G đối xứng: G L^T = (L G)^T, U^T G = (G U)^T
+    GLt = _tr(LG)
+    x = np.empty_like(f)
+    x[..., 0::2] = xe
+    x[..., 1::2] = _mul(G, fo) - _mul(GLt, xe[..., :k]) - _mul(GU, _shift(xe, k))
+    So_k = So_e[..., :k]
+    S_left = -_mul(GLt, Sd_e[..., :k]) - _mul(GU, _tr(So_k))
+    S_right = -_mul(GLt, So_k) - _mul(GU, _shift(Sd_e, k))
+    Sd = np.empty_like(D)
+    Sd[..., 0::2] = Sd_e
+    Sd[..., 1::2] = G - _mul(S_left, LG) - _mul(S_right, _tr(GU))
+    So = np.zeros_like(D)
+    So[..., 0::2][..., :k] = _tr(S_left)
+    So[..., 1::2] = S_right
+    return x, Sd, So
+
+
+class _Problem:
+    """Phần không phụ thuộc lam của hệ mở rộng cho mọi nét."""
+
+    def __init__(self, t, y, offsets):
+        self.t, self.y, self.offsets = t, y, offsets
+        self.n = np.diff(offsets)
+        N = len(t)
+        self.sid = np.repeat(np.arange(len(self.n)), self.n)
+        first = np.zeros(N, dtype=bool)
+        first[offsets[:-1]] = True
+        last = np.zeros(N, dtype=bool)
+        last[offsets[1:] - 1] = True
+        # h[i]: khoảng từ nút i đến i+1 trong cùng nét (1 ở nút cuối)
+        h = np.ones(N)
+        h[:-1][~last[:-1]] = np.diff(t)[~last[:-1]]
+        h_left = np.ones(N)
+        h_left[1:] = h[:-1]
+        self.h = h
+        inner = ~first & ~last
+        inner_next = np.zeros(N, dtype=bool)
+        inner_next[:-1] = inner[1:]
+        # Khối chéo (gamma_i, g_i): R_ii (1 cho gamma giả ở hai đầu nét), -Q_ii;
+        # phần -1/lam điền khi giải
+        self.D = np.zeros((2, 2, N))
+        self.D[0, 0] = np.where(inner, (h_left + h) / 3, 1.0)
+        self.D[0, 1] = self.D[1, 0] = np.where(inner, 1 / h_left + 1 / h, 0.0)
+        # Khối nối nút i với i+1 trong cùng nét
+        self.E = np.zeros((2, 2, N))
+        self.E[0, 0] = np.where(inner & inner_next, h / 6, 0.0)
+        self.E[0, 1] = np.where(inner & ~last, -1 / h, 0.0)
+        self.E[1, 0] = np.where(inner_next, -1 / h, 0.0)
+        self.span = t[offsets[1:] - 1] - t[offsets[:-1]]
+
+    def lam_for_width(self, log_w):
+        """
+        lam ứng với độ rộng nhân tương đương 10^log_w điểm: với mật độ nút
+        rho = n / span, độ rộng theo t là (lam / rho)^(1/4).
+        """
+        return self.span ** 3 * 10.0 ** (4 * log_w) / self.n.astype(float) ** 3
+
+    def width_for_lam(self, lam):
+        """Ngược lại lam_for_width: log10 độ rộng nhân (số điểm) của lam [k]."""
+        return np.log10(lam * self.n.astype(float) ** 3 / self.span ** 3) / 4
+
+    def solve(self, lam):
+        """
+        Giải với lam [k] (> 0) cho mọi nét: (đạo hàm bậc hai gamma [N, d],
+        giá trị g [N, d], đường chéo ma trận mũ A_ii [N]).
+        """
+        lp = lam[self.sid]
+        D = self.D.copy()
+        D[1, 1] = -1 / lp
+        f = np.zeros((2,) + self.y.shape[::-1])
+        f[1] = -self.y.T / lp
+        x, Sd, _ = block_cyclic_reduction(D, self.E, f)
+        return x[0].T, x[1].T, -Sd[1, 1] / lp
+
+    def gcv(self, lam):
+        """(GCV [k], số bậc tự do tr A [k], gamma, g) với lam [k]."""
+        gamma, g, a = self.solve(lam)
+        k = len(self.n)
+        rss = np.bincount(self.sid, ((self.y - g) ** 2).sum(axis=1), minlength=k)
+        df = np.bincount(self.sid, a, minlength=k)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = self.n * rss / (self.n - df) ** 2
+        return score, df, gamma, g
+
+
+def _select_lam(problem, around=None, grid_size=GCV_GRID):
+    """
+    Chọn lam từng nét (mọi nét cùng lúc): lưới đều theo log10 độ rộng nhân
+    rồi tìm lát cắt vàng quanh điểm lưới có GCV nhỏ nhất. around [k]: chỉ
+    tìm trong khoảng nửa bậc mười quanh log10 độ rộng này.
+    """
+    lo = np.full(len(problem.n), GCV_RANGE[0])
+    hi = np.log10(problem.n) + GCV_RANGE[1]
+    if around is not None:
+        lo, hi = np.maximum(around - 0.5, lo), np.minimum(around + 0.5, hi)
+    grid = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, grid_size)
+    scores = np.column_stack([problem.gcv(problem.lam_for_width(w))[0] for w in grid.T])
+    scores = np.where(np.isfinite(scores), scores, np.inf)
+    best = grid[np.arange(len(grid)), np.argmin(scores, axis=1)]
+    step = (hi - lo) / (grid_size - 1)
+    a, b = np.maximum(best - step, lo), np.minimum(best + step, hi)
+    ratio = (np.sqrt(5) - 1) / 2
+    c = b - ratio * (b - a)
+    d = a + ratio * (b - a)
+    fc = problem.gcv(problem.lam_for_width(c))[0]
+    fd = problem.gcv(problem.lam_for_width(d))[0]
+    for _ in range(GCV_STEPS):
+        left = ~(fc > fd)
+        # Giữ [a, d] khi f(c) <= f(d), ngược lại [c, b]
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        d_new = np.where(left, c, a + ratio * (b - a))
+        c_new = np.where(left, b - ratio * (b - a), d)
+        f_new = problem.gcv(problem.lam_for_width(np.where(left, c_new, d_new)))[0]
+        fd, fc = np.where(left, fc, f_new), np.where(left, f_new, fd)
+        c, d = c_new, d_new
+    return problem.lam_for_width((a + b) / 2)
+
+
+def smoothing_spline_ragged(t, y, offsets, lam=None):
+    """
+    Spline làm mượt có phạt cho mọi nét: t [N] tăng ngặt trong từng nét,
+    y [N] hoặc [N, d] (d hàm cùng nút, cùng lam, ví dụ x(t) và y(t)),
+    offsets [k+1], mỗi nét ít nhất 2 điểm (nét 2 điểm: đoạn thẳng).
+    lam: None để chọn bằng GCV cho từng nét, hoặc số / mảng [k] dương.
+    Trả về (danh sách d RaggedSpline, lam [k], số bậc tự do [k]).
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = np.diff(offsets)
+    if np.any(n < 2):
+        raise ValueError("Mỗi nét cần ít nhất 2 điểm.")
+    problem = _Problem(t, y, offsets)
+    if lam is None:
+        lam = _select_lam(problem)
+    splines, lam, df, _ = _fit(problem, lam)
+    return splines, lam, df
+
+
+def _fit(problem, lam):
+    """(danh sách RaggedSpline, lam [k], số bậc tự do [k], giá trị g [N, d])."""
+    t, offsets = problem.t, problem.offsets
+    lam = np.broadcast_to(np.asarray(lam, dtype=float), (len(problem.n),)).copy()
+    _, df, m, g = problem.gcv(lam)
+
+    # Dạng lũy thừa trên từng khoảng theo d = t - t_i (như RaggedSpline)
+    h = problem.h[:, None]
+    g_next = np.roll(g, -1, axis=0)
+    m_next = np.roll(m, -1, axis=0)
+    c1 = (g_next - g) / h - h * (2 * m + m_next) / 6
+    c3 = (m_next - m) / (6 * h)
+    last = offsets[1:] - 1
+    splines = []
+    for j in range(g.shape[1]):
+        c = np.stack([g[:, j], c1[:, j], m[:, j] / 2, c3[:, j]])
+        c[1:, last] = 0
+        splines.append(RaggedSpline.from_coefficients(t, c, offsets))
+    return splines, lam, df, g
+
+
+def smooth_parametric_ragged(strokes, lam=None):
+    """
+    Làm mượt 2D như smooth_draw_spline_poly cho mọi nét bằng một bước: spline
+    làm mượt x(t), y(t) cùng lam (chọn bằng GCV trên tổng sai số hai tọa độ
+    nếu lam=None), t là độ dài cung chuẩn hóa. Độ dài cung đo trên điểm thô
+    mang theo nhiễu vào chính t, GCV khi đó chọn gần nội suy; vì vậy lần khớp
+    đầu dùng t đều theo chỉ số điểm, lần thứ hai dùng độ dài cung của đường
+    vừa làm mượt (GCV chỉ tìm quanh độ rộng nhân của lần đầu).
+    Mỗi nét cần ít nhất 2 điểm.
+    Trả về (spline_x, spline_y, lam [k], số bậc tự do [k]).
+    """
+    pts, offsets = strokes.points, strokes.offsets
+    n = strokes.lengths
+    if np.any(n < 2):
+        raise ValueError("Mỗi nét cần ít nhất 2 điểm.")
+    with trace.stage('smoothing_spline', points_in=len(pts), strokes=len(strokes)) as span:
+        sid = strokes.stroke_ids
+        uniform = (np.arange(len(pts)) - offsets[sid]) / (n[sid] - 1)
+        first = _Problem(uniform, pts, offsets)
+        _, lam1, _, g = _fit(first, _select_lam(first) if lam is None else lam)
+        t = arc_length_param(RaggedStrokes(g, offsets))
+        # Nét mà đường làm mượt có đoạn độ dài 0: giữ t đều
+        flat = np.zeros(len(pts), dtype=bool)
+        flat[:-1] = np.diff(t) <= 0
+        flat[offsets[1:] - 1] = False
+        bad = np.bincount(sid, flat, minlength=len(n)) > 0
+        t = np.where(bad[sid], uniform, t)
+        problem = _Problem(t, pts, offsets)
+        if lam is None:
+            lam = _select_lam(problem, first.width_for_lam(lam1), GCV_REFINE_GRID)
+        (spline_x, spline_y), lam, df, _ = _fit(problem, lam)
+        span.set(points_out=len(pts))
+    return spline_x, spline_y, lam, df
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class StrokeBuffer:
+    """
+    Bộ đệm điểm của một nét vẽ, lưu trong mảng NumPy [n, 2] tự nới rộng
+    (gấp đôi dung lượng khi đầy) thay cho hai list float của Python.
+
+    Giảm điểm ngay khi thu:
+      - min_dist: bỏ điểm cách điểm đã lưu gần nhất ít hơn min_dist,
+      - min_dt:   bỏ điểm đến sau điểm đã lưu gần nhất chưa đủ min_dt giây,
+      - arc_step: nếu đặt, thay vào đó lấy mẫu đều theo độ dài cung với
+                  bước arc_step dọc theo đường gấp khúc của các sự kiện.
+    Điểm thô cuối cùng luôn được giữ khi finish() để không mất đầu mút nét.
+    """
+
+    def __init__(self, min_dist=0.0, min_dt=0.0, arc_step=None, capacity=1024):
+        self.min_dist = min_dist
+        self.min_dt = min_dt
+        self.arc_step = arc_step
+        self._data = np.empty((capacity, 2))
+        self.clear()
+
+    def clear(self):
+        self._n = 0
+        self._last_t = None
+        self._last_raw = None
+        self._pending = False
+        self._carry = 0.0
+        self.raw_count = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def points(self):
+        return self._data[:self._n]
+
+    @property
+    def xs(self):
+        return self._data[:self._n, 0]
+
+    @property
+    def ys(self):
+        return self._data[:self._n, 1]
+
+    def _extend(self, pts):
+        k = len(pts)
+        if self._n + k > len(self._data):
+            capacity = max(2 * len(self._data), self._n + k)
+            data = np.empty((capacity, 2))
+            data[:self._n] = self._data[:self._n]
+            self._data = data
+        self._data[self._n:self._n + k] = pts
+        self._n += k
+        return self._data[self._n - k:self._n]
+
+    def append(self, x, y, t=None):
+        """
+        Thêm một sự kiện (x, y) tại thời điểm t (giây, có thể bỏ qua).
+        Trả về các điểm thực sự được lưu (mảng [k, 2], k có thể bằng 0).
+        """
+        p = np.array((x, y), dtype=float)
+        self.raw_count += 1
+        if self._n == 0:
+            self._last_raw, self._last_t = p, t
+            return self._extend(p[None])
+        if self.arc_step:
+            return self._append_arc(p)
+        last = self._data[self._n - 1]
+        too_close = np.hypot(*(p - last)) < self.min_dist
+        too_soon = (t is not None and self._last_t is not None
+                    and t - self._last_t < self.min_dt)
+        self._last_raw = p
+        if too_close or too_soon:
+            self._pending = True
+            return self._data[:0]
+        self._pending = False
+        self._last_t = t
+        return self._extend(p[None])
+
+    def _append_arc(self, p):
+        # Các mẫu cách đều arc_step trên đoạn thẳng từ điểm thô trước đến p
+        start = self._last_raw
+        seg = p - start
+        d = np.hypot(*seg)
+        if d == 0:
+            return self._data[:0]
+        total = self._carry + d
+        k = int(total // self.arc_step)
+        s = self.arc_step * np.arange(1, k + 1) - self._carry
+        self._carry = total - k * self.arc_step
+        self._last_raw = p
+        self._pending = self._carry > 0
+        return self._extend(start + (s / d)[:, None] * seg)
+
+    def finish(self):
+        """
+        Kết thúc nét: lưu điểm thô cuối nếu nó đã bị bỏ qua.
+        """
+        if self._pending:
+            self._pending = False
+            return self._extend(self._last_raw[None])
+        return self._data[:0]
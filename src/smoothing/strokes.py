@@ -0,0 +1,455 @@
+"""
+Nhiều nét vẽ trong một cấu trúc gọn và các bước làm mượt chạy trên cả lô.
+
+RaggedStrokes giữ mọi nét trong một mảng tọa độ nối liền points [N, 2] và
+mảng offsets [k+1]: nét thứ s là points[offsets[s]:offsets[s+1]].
+Các hàm bên dưới (lọc x trùng, Savitzky-Golay, spline bậc 3, bình phương
+tối thiểu) xử lý mọi nét trong một lần gọi vector hóa, không lặp Python
+theo từng nét.
+"""
+import numpy as np
+
+from .savgol_stream import savgol_kernels
+from . import trace
+
+
+class RaggedStrokes:
+    """
+    k nét vẽ độ dài khác nhau: points [N, 2] nối liền và offsets [k+1].
+    """
+
+    def __init__(self, points, offsets):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_list(cls, strokes):
+        strokes = [np.asarray(s, dtype=float).reshape(-1, 2) for s in strokes]
+        offsets = np.zeros(len(strokes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(s) for s in strokes])
+        points = np.concatenate(strokes) if strokes else np.empty((0, 2))
+        return cls(points, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, s):
+        return self.points[self.offsets[s]:self.offsets[s + 1]]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def stroke_ids(self):
+        """Chỉ số nét của từng điểm, [N]."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def with_breaks(self):
+        """
+        Các điểm [N + k, 2] với một hàng NaN sau mỗi nét, để vẽ mọi nét bằng
+        một lệnh plot.
+        """
+        out = np.full((len(self.points) + len(self), 2), np.nan)
+        out[np.arange(len(self.points)) + self.stroke_ids] = self.points
+        return out
+
+    def select_points(self, mask):
+        """
+        Giữ các điểm có mask True, offsets được tính lại (nét có thể rỗng).
+        """
+        counts = np.bincount(self.stroke_ids[mask], minlength=len(self))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return RaggedStrokes(self.points[mask], offsets)
+
+    def select_strokes(self, keep):
+        """
+        Chỉ giữ các nét có keep True.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        offsets = np.concatenate([[0], np.cumsum(self.lengths[keep])])
+        return RaggedStrokes(self.points[keep[self.stroke_ids]], offsets)
+
+
+def _ranges(starts, counts):
+    # Nối các dãy chỉ số starts[i] .. starts[i] + counts[i] - 1
+    counts = np.asarray(counts, dtype=np.int64)
+    shift = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return np.arange(counts.sum()) + shift
+
+
+def limit_points_ragged(strokes, max_points):
+    """
+    Như image_pipeline.limit_points cho từng nét: nét dài hơn max_points
+    được lấy max_points điểm chia đều theo chỉ số.
+    """
+    n = strokes.lengths
+    m = np.minimum(n, max_points)
+    sid = np.repeat(np.arange(len(strokes)), m)
+    j = np.arange(m.sum()) - np.repeat(np.concatenate([[0], np.cumsum(m)[:-1]]), m)
+    denom = np.maximum(np.repeat(m, m) - 1, 1)
+    local = np.where(np.repeat(n > max_points, m),
+                     (j * (np.repeat(n, m) - 1) // denom), j)
+    idx = strokes.offsets[sid] + local
+    offsets = np.concatenate([[0], np.cumsum(m)])
+    return RaggedStrokes(strokes.points[idx], offsets)
+
+
+@trace.traced('dedupe')
+def dedupe_x(strokes):
+    """
+    Như np.unique(x, return_index=True) trong từng nét: sắp theo x tăng
+    và chỉ giữ lần xuất hiện đầu tiên của mỗi giá trị x.
+    """
+    sid = strokes.stroke_ids
+    x = strokes.points[:, 0]
+    order = np.lexsort((np.arange(len(x)), x, sid))
+    sid_o, x_o = sid[order], x[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (sid_o[1:] != sid_o[:-1]) | (x_o[1:] != x_o[:-1])
+    sorted_strokes = RaggedStrokes(strokes.points[order], strokes.offsets)
+    return sorted_strokes.select_points(first)
+
+
+@trace.traced('drop_repeats')
+def drop_repeats(strokes):
+    """
+    Bỏ các điểm trùng với điểm ngay trước nó trong cùng nét, để tham số
+    độ dài cung tăng ngặt (nét từ ngoài vào có thể lặp điểm khi chuột đứng yên).
+    """
+    pts = strokes.points
+    keep = np.ones(len(pts), dtype=bool)
+    keep[1:] = np.any(pts[1:] != pts[:-1], axis=1)
+    keep[strokes.offsets[:-1][strokes.lengths > 0]] = True
+    return strokes.select_points(keep)
+
+
+@trace.traced('savgol')
+def savgol_ragged(strokes, window=51, polyorder=3):
+    """
+    Savitzky-Golay (mode='interp') cho mọi nét, cửa sổ của mỗi nét là số
+    lẻ lớn nhất <= min(window, độ dài nét) (window là một số hoặc mảng theo
+    nét); nét có cửa sổ < polyorder + 2
+    giữ nguyên. Các nét cùng cửa sổ được lọc chung một lần.
+    """
+    pts = strokes.points
+    out = pts.copy()
+    n = strokes.lengths
+    w_all = np.minimum(window, n)
+    w_all -= (w_all % 2 == 0)
+    for w in np.unique(w_all[w_all >= polyorder + 2]):
+        sel = np.flatnonzero(w_all == w)
+        idx = _ranges(strokes.offsets[sel], n[sel])
+        sub = pts[idx]
+        center, start, end = savgol_kernels(int(w), polyorder)
+        half = w // 2
+        res = np.empty_like(sub)
+        # Phần giữa: tích chập trên cả dãy nối; chỗ giáp hai nét sẽ bị ghi đè bởi mép
+        windows = np.lib.stride_tricks.sliding_window_view(sub, w, axis=0)
+        res[half:len(sub) - half] = np.einsum('k,n...k->n...', center, windows)
+        sub_off = np.concatenate([[0], np.cumsum(n[sel])])
+        head = sub[sub_off[:-1, None] + np.arange(w)]
+        tail = sub[sub_off[1:, None] - w + np.arange(w)]
+        res[sub_off[:-1, None] + np.arange(half)] = np.einsum('hw,gwd->ghd', start, head)
+        res[sub_off[1:, None] - half + np.arange(half)] = np.einsum('hw,gwd->ghd', end, tail)
+        out[idx] = res
+    return RaggedStrokes(out, strokes.offsets)
+
+
+class RaggedSpline:
+    """
+    Spline bậc 3 nội suy cho nhiều dãy (x, y) độ dài khác nhau, cùng điều
+    kiện biên 'not-a-knot' như scipy.interpolate.CubicSpline mặc định
+    (2 điểm: đoạn thẳng; 3 điểm: một parabol). Đạo hàm tại nút của mọi nét
+    được giải trong một hệ dải (1, 1) duy nhất, các khối không liên kết nhau.
+    x phải tăng ngặt trong từng nét và mỗi nét có ít nhất 2 điểm.
+    """
+
+    def __init__(self, x, y, offsets, linear_below=None):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n = np.diff(offsets)
+        if np.any(n < 2):
+            raise ValueError("Mỗi nét cần ít nhất 2 điểm.")
+        N = len(x)
+        sid = np.repeat(np.arange(len(n)), n)
+        local = np.arange(N) - offsets[sid]
+        size = n[sid]
+
+        dx = np.ones(N)
+        slope = np.zeros(N)
+        inner = np.ones(N, dtype=bool)
+        inner[offsets[1:] - 1] = False
+        # dx[g], slope[g]: khoảng từ điểm g đến g+1 (chỉ hợp lệ khi inner[g])
+        dx[:-1][inner[:-1]] = np.diff(x)[inner[:-1]]
+        slope[:-1][inner[:-1]] = (np.diff(y) / np.where(inner[:-1], dx[:-1], 1))[inner[:-1]]
+        dx_l = np.roll(dx, 1)      # khoảng bên trái điểm g
+        s_l = np.roll(slope, 1)
+
+        lower = np.zeros(N)
+        diag = np.ones(N)
+        upper = np.zeros(N)
+        rhs = np.zeros(N)
+        mid = (local > 0) & (local < size - 1)
+        lower[mid] = dx[mid]
+        diag[mid] = 2 * (dx_l[mid] + dx[mid])
+        upper[mid] = dx_l[mid]
+        rhs[mid] = 3 * (dx[mid] * s_l[mid] + dx_l[mid] * slope[mid])
+
+        first = offsets[:-1]
+        last = offsets[1:] - 1
+        # Nét 2 điểm: đạo hàm hai đầu bằng hệ số góc (đường thẳng)
+        two = n == 2
+        rhs[first[two]] = slope[first[two]]
+        rhs[last[two]] = slope[first[two]]
+        # Nét 3 điểm: m0 + m1 = 2 s0, m1 + m2 = 2 s1
+        three = n == 3
+        f, l = first[three], last[three]
+        upper[f] = 1
+        rhs[f] = 2 * slope[f]
+        lower[l] = 1
+        rhs[l] = 2 * slope[l - 1]
+        # Nét >= 4 điểm: not-a-knot
+        big = n >= 4
+        f, l = first[big], last[big]
+        d0 = x[f + 2] - x[f]
+        diag[f] = dx[f + 1]
+        upper[f] = d0
+        rhs[f] = ((dx[f] + 2 * d0) * dx[f + 1] * slope[f] + dx[f] ** 2 * slope[f + 1]) / d0
+        d1 = x[l] - x[l - 2]
+        diag[l] = dx[l - 2]
+        lower[l] = d1
+        rhs[l] = (dx[l - 1] ** 2 * slope[l - 2] + (2 * d1 + dx[l - 1]) * dx[l - 2] * slope[l - 1]) / d1
+
+        from scipy.linalg import solve_banded
+
+        ab = np.zeros((3, N))
+        ab[0, 1:] = upper[:-1]
+        ab[1] = diag
+        ab[2, :-1] = lower[1:]
+        m = solve_banded((1, 1), ab, rhs)
+
+        m_next = np.roll(m, -1)
+        t = (m + m_next - 2 * slope) / dx
+        c = np.zeros((4, N))
+        c[0] = y
+        c[1] = m
+        c[2] = (slope - m) / dx - t
+        c[3] = t / dx
+        if linear_below:
+            lin = (n < linear_below)[sid]
+            c[1, lin] = slope[lin]
+            c[2:, lin] = 0
+        self._set(x, c, offsets)
+
+    def _set(self, x, c, offsets):
+        n = np.diff(offsets)
+        inner = np.ones(len(x), dtype=bool)
+        inner[offsets[1:] - 1] = False
+        dx = np.ones(len(x))
+        dx[:-1][inner[:-1]] = np.diff(x)[inner[:-1]]
+        self.x, self.c, self.offsets = x, c, offsets
+        self._sid = np.repeat(np.arange(len(n)), n)
+        self._dx, self._inner = dx, inner
+
+    @classmethod
+    def from_coefficients(cls, x, c, offsets):
+        """
+        Dựng lại spline từ các nút x [N], hệ số c [4, N] và offsets [k+1]
+        (thuộc tính x, c, offsets của một RaggedSpline đã khớp), không giải lại.
+        """
+        spline = cls.__new__(cls)
+        spline._set(np.asarray(x, dtype=float), np.asarray(c, dtype=float),
+                    np.asarray(offsets, dtype=np.int64))
+        return spline
+
+    def segments(self):
+        """
+        Các khúc của mọi nét: (điểm đầu x0 [m], độ dài h [m], hệ số c [4, m]
+        theo d = x - x0, thấp trước, offsets [k+1] của khúc theo nét).
+        """
+        inner = self._inner
+        seg_offsets = self.offsets - np.arange(len(self.offsets))
+        return self.x[inner], self._dx[inner], self.c[:, inner], seg_offsets
+
+    def __call__(self, xq):
+        """
+        Đánh giá tại xq [k, m] (hàng s cho nét s); ngoài khoảng thì kéo dài
+        đa thức đầu/cuối như CubicSpline(extrapolate=True).
+        """
+        xq = np.asarray(xq, dtype=float)
+        k = len(self.offsets) - 1
+        lo = self.x[self.offsets[:-1]]
+        hi = self.x[self.offsets[1:] - 1]
+        span = hi - lo
+        # Khóa tăng toàn cục: nét s nằm trong [2s, 2s + 1]
+        key = 2 * self._sid + (self.x - lo[self._sid]) / span[self._sid]
+        qkey = 2 * np.arange(k)[:, None] + np.clip((xq - lo[:, None]) / span[:, None], 0, 1)
+        idx = np.searchsorted(key, qkey, side='right') - 1
+        idx = np.clip(idx, self.offsets[:-1, None], self.offsets[1:, None] - 2)
+        d = xq - self.x[idx]
+        c = self.c
+        return c[0, idx] + d * (c[1, idx] + d * (c[2, idx] + d * c[3, idx]))
+
+
+class RaggedPoly:
+    """
+    Đa thức riêng cho từng nét theo biến u = (x - center) / scale:
+    coef [k, D] (bậc thấp trước), center [k], scale [k].
+    """
+
+    def __init__(self, coef, center, scale):
+        self.coef = np.asarray(coef, dtype=float)
+        self.center = np.asarray(center, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    def __call__(self, xq):
+        """Đánh giá tại xq [k, m] (hàng s cho nét s) -> [k, m]."""
+        uq = (np.asarray(xq, dtype=float) - self.center[:, None]) / self.scale[:, None]
+        out = np.zeros_like(uq)
+        for j in range(self.coef.shape[1] - 1, -1, -1):
+            out = out * uq + self.coef[:, j:j + 1]
+        return out
+
+
+def polyfit_ragged(x, y, offsets, degree=5):
+    """
+    Bình phương tối thiểu bậc 'degree' cho từng nét trong một lần giải theo lô.
+    degree là số hoặc mảng [k] (bậc riêng từng nét), không vượt quá
+    số điểm của nét trừ 1. x được đổi biến
+    u = (x - center) / scale về [-1, 1] trong mỗi nét để hệ phương trình
+    chuẩn không bị suy biến số. Trả về RaggedPoly (gọi với xq [k, m] -> [k, m]).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    k = len(offsets) - 1
+    n = np.diff(offsets)
+    # Nét ít điểm hơn bậc + 1: hạ bậc xuống n - 1 (đa thức nội suy)
+    degree = np.minimum(np.broadcast_to(np.asarray(degree), (k,)), n - 1)
+    D = int(degree.max()) + 1
+    sid = np.repeat(np.arange(k), n)
+    lo = np.minimum.reduceat(x, offsets[:-1])
+    hi = np.maximum.reduceat(x, offsets[:-1])
+    center = (lo + hi) / 2
+    scale = np.where(hi > lo, (hi - lo) / 2, 1.0)
+    u = (x - center[sid]) / scale[sid]
+    V = np.vander(u, D, increasing=True)
+    G = np.add.reduceat(V[:, :, None] * V[:, None, :], offsets[:-1])
+    r = np.add.reduceat(V * y[:, None], offsets[:-1])
+    # Nét dùng bậc thấp hơn: cột thừa thành hàng đơn vị, hệ số bằng 0
+    used = np.arange(D)[None, :] <= degree[:, None]
+    G = G * (used[:, :, None] & used[:, None, :]) + np.eye(D) * ~used[:, :, None]
+    r = r * used
+    coef = np.linalg.solve(G, r[..., None])[..., 0]
+    return RaggedPoly(coef, center, scale)
+
+
+def dense_grid(lo, hi, n_dense):
+    """
+    Lưới đều n_dense điểm trên [lo[s], hi[s]] cho từng nét -> [k, n_dense],
+    điểm cuối đúng bằng hi.
+    """
+    x_dense = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, n_dense)[None, :]
+    x_dense[:, -1] = hi
+    return x_dense
+
+
+def fit_models_ragged(strokes, degree=5):
+    """
+    Khớp spline nội suy và BPTT bậc 'degree' cho mọi nét, chưa đánh giá.
+    Nét phải có x tăng ngặt và ít nhất 2 điểm. Trả về (RaggedSpline, RaggedPoly).
+    """
+    x, y = strokes.points[:, 0], strokes.points[:, 1]
+    with trace.stage('spline_build', points_in=len(x), strokes=len(strokes)):
+        spline = RaggedSpline(x, y, strokes.offsets)
+    with trace.stage('polyfit', points_in=len(x), strokes=len(strokes)):
+        poly = polyfit_ragged(x, y, strokes.offsets, degree)
+    return spline, poly
+
+
+def evaluate_models_ragged(spline, poly, n_dense=1000):
+    """
+    Đánh giá spline và BPTT trên lưới đều n_dense điểm giữa nút đầu và nút
+    cuối của từng nét. Trả về x_dense, y_spline, y_bptt, mỗi mảng [k, n_dense].
+    """
+    x, offsets = spline.x, spline.offsets
+    x_dense = dense_grid(x[offsets[:-1]], x[offsets[1:] - 1], n_dense)
+    with trace.stage('spline_eval', points_out=x_dense.size):
+        y_spline = spline(x_dense)
+    with trace.stage('polyfit_eval', points_out=x_dense.size):
+        y_poly = poly(x_dense)
+    return x_dense, y_spline, y_poly
+
+
+def fit_curves_ragged(strokes, n_dense=1000, degree=5, return_spline=False):
+    """
+    Như image_pipeline.fit_curves cho mọi nét: spline nội suy và BPTT,
+    đánh giá trên lưới đều n_dense điểm của từng nét.
+    Nét phải có x tăng ngặt và ít nhất 2 điểm.
+    Trả về x_dense, y_spline, y_bptt, mỗi mảng [k, n_dense]; với
+    return_spline=True trả thêm đối tượng RaggedSpline (để xuất Bezier).
+    """
+    spline, poly = fit_models_ragged(strokes, degree)
+    x_dense, y_spline, y_poly = evaluate_models_ragged(spline, poly, n_dense)
+    if return_spline:
+        return x_dense, y_spline, y_poly, spline
+    return x_dense, y_spline, y_poly
+
+
+def arc_length_param(strokes):
+    """
+    Tham số hóa theo độ dài cung chuẩn hóa về [0, 1] trong từng nét
+    (như smooth_draw_spline_poly); nét có độ dài 0 dùng lưới đều.
+    """
+    pts = strokes.points
+    sid = strokes.stroke_ids
+    step = np.zeros(len(pts))
+    step[1:] = np.hypot(*np.diff(pts, axis=0).T)
+    step[strokes.offsets[:-1]] = 0
+    cum = np.cumsum(step)
+    cum -= np.repeat(cum[strokes.offsets[:-1]], strokes.lengths)
+    total = cum[strokes.offsets[1:] - 1]
+    n = strokes.lengths
+    local = np.arange(len(pts)) - strokes.offsets[sid]
+    uniform = local / np.maximum(n[sid] - 1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(total[sid] > 0, cum / total[sid], uniform)
+    return t
+
+
+def fit_parametric_ragged(strokes, n_dense=1000, degree=5, linear_below=4):
+    """
+    Làm mượt 2D như smooth_draw_spline_poly cho mọi nét: tham số độ dài cung
+    t, spline bậc 3 x(t), y(t) (nét dưới linear_below điểm: tuyến tính) và
+    BPTT bậc 'degree' (nét ít điểm hơn degree + 1: bậc <= 3) trên lưới đều
+    n_dense giá trị t. Mỗi nét cần ít nhất 2 điểm, không lặp điểm liền nhau
+    (xem drop_repeats).
+    Trả về (spline_x, spline_y, x_bptt [k, n_dense], y_bptt [k, n_dense]).
+    """
+    x, y = strokes.points[:, 0], strokes.points[:, 1]
+    n = strokes.lengths
+    t = arc_length_param(strokes)
+    t_dense = np.broadcast_to(np.linspace(0, 1, n_dense), (len(strokes), n_dense))
+    with trace.stage('spline_build', points_in=len(x), strokes=len(strokes)):
+        spline_x = RaggedSpline(t, x, strokes.offsets, linear_below=linear_below)
+        spline_y = RaggedSpline(t, y, strokes.offsets, linear_below=linear_below)
+    deg = np.where(n >= degree + 1, degree, np.minimum(3, n - 1))
+    with trace.stage('polyfit', points_in=len(x), strokes=len(strokes)):
+        poly_x = polyfit_ragged(t, x, strokes.offsets, deg)
+        poly_y = polyfit_ragged(t, y, strokes.offsets, deg)
+    with trace.stage('polyfit_eval', points_out=t_dense.size):
+        x_poly = poly_x(t_dense)
+        y_poly = poly_y(t_dense)
+    return spline_x, spline_y, x_poly, y_poly
+
+
+def join_rows(a):
+    """
+    Nối các hàng của mảng [k, m] thành một dãy, chèn NaN giữa hai hàng
+    để vẽ k đường bằng một lệnh plot.
+    """
+    a = np.asarray(a, dtype=float)
+    return np.hstack([a, np.full((len(a), 1), np.nan)]).ravel()
+
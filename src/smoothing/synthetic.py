@@ -0,0 +1,24 @@
+"""
+Nét vẽ tổng hợp để đo tải và kiểm tra, không cần chuột hay ảnh.
+"""
+import numpy as np
+
+
+def synthetic_strokes(rng, k, points=(20, 200), noise=0.01):
+    """
+    k nét tổng hợp: đường cong trơn ngẫu nhiên (tổng vài sóng sin) lấy mẫu
+    số điểm trong khoảng 'points', cộng nhiễu tay run độ lớn 'noise'.
+    Trả về danh sách mảng [n, 2].
+    """
+    strokes = []
+    for _ in range(k):
+        n = int(rng.integers(points[0], points[1] + 1))
+        t = np.linspace(0, 1, n)
+        freq = rng.uniform(0.5, 3, size=(2, 3))
+        amp = rng.uniform(0.1, 1, size=(2, 3))
+        phase = rng.uniform(0, 2 * np.pi, size=(2, 3))
+        curve = np.sum(amp[..., None] * np.sin(2 * np.pi * freq[..., None] * t + phase[..., None]),
+                       axis=1)
+        curve[0] += 2 * t
+        strokes.append(curve.T + rng.normal(0, noise, size=(n, 2)))
+    return strokes
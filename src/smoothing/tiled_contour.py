@@ -0,0 +1,353 @@
+"""
+Ngưỡng và dò đường biên theo từng dải hàng cho ảnh quét rất lớn.
+
+Các định dạng không nén (.npy, PGM nhị phân P5, BMP 8/24 bit) được ánh xạ
+bộ nhớ (np.memmap) và đọc theo dải, không bao giờ nạp toàn bộ. Định dạng
+nén (PNG, JPEG, TIFF...) phải giải mã cả ảnh bằng cv2.imread nên bộ nhớ
+không còn bị chặn: open_rows cảnh báo (RuntimeWarning) hoặc báo lỗi với
+full_decode=False. Giải nén PNG theo dòng không đáng làm ở đây: bộ lọc
+Average/Paeth phụ thuộc tuần tự theo từng byte, không vector hóa được bằng
+NumPy; nên đổi ảnh quét lớn sang PGM/BMP/.npy trước.
+
+Kết quả giống largest_contour của image_pipeline (cv2.findContours với
+RETR_EXTERNAL, CHAIN_APPROX_NONE, rồi lấy đường biên dài nhất):
+  1. Lượt 1, theo dải: ngưỡng, gán nhãn thành phần liên thông 8 hướng
+     (cv2.connectedComponentsWithStats) và nối nhãn qua mép dải bằng
+     union-find; cộng dồn khung bao, điểm ảnh đầu tiên theo thứ tự quét
+     và số điểm ảnh biên của mỗi thành phần.
+  2. Duyệt các thành phần theo số điểm biên giảm dần, bỏ thành phần nằm
+     trong lỗ của thành phần khác, dò đường biên ngoài của vài thành phần
+     đầu tiên còn lại bằng thuật toán Suzuki-Abe (như OpenCV) trên một bộ
+     đệm vài dải, rồi chọn đường dài nhất.
+Với các định dạng đọc theo dải, bộ nhớ đỉnh tỉ lệ với strip_rows * chiều
+rộng ảnh, không với chiều cao ảnh.
+"""
+import os
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+from . import trace
+
+
+class RowSource:
+    """
+    Nguồn đọc ảnh xám theo dải hàng: read(r0, r1) -> mảng uint8 [r1-r0, W].
+    """
+
+    def __init__(self, array, bottom_up=False, palette=None):
+        self._array = array
+        self._bottom_up = bottom_up
+        self._palette = palette
+        self.shape = array.shape[:2]
+
+    def read(self, r0, r1):
+        H = self.shape[0]
+        if self._bottom_up:
+            rows = self._array[H - r1:H - r0][::-1]
+        else:
+            rows = self._array[r0:r1]
+        rows = np.asarray(rows)
+        if self._palette is not None:
+            return self._palette[rows]
+        if rows.ndim == 3:
+            import cv2
+            return cv2.cvtColor(np.ascontiguousarray(rows[:, :, :3]), cv2.COLOR_BGR2GRAY)
+        return np.ascontiguousarray(rows, dtype=np.uint8)
+
+
+def _open_pgm(path):
+    with open(path, 'rb') as f:
+        head = f.read(512)
+    if not head.startswith(b'P5'):
+        return None
+    # Header: P5 <w> <h> <maxval> rồi một ký tự trắng, có thể có dòng chú thích
+    tokens, pos = [], 2
+    while len(tokens) < 3:
+        while head[pos:pos + 1].isspace():
+            pos += 1
+        if head[pos:pos + 1] == b'#':
+            pos = head.index(b'\n', pos) + 1
+            continue
+        end = pos
+        while not head[end:end + 1].isspace():
+            end += 1
+        tokens.append(int(head[pos:end]))
+        pos = end
+    w, h, maxval = tokens
+    if maxval > 255:
+        return None
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=pos + 1, shape=(h, w))
+    return RowSource(data)
+
+
+def _open_bmp(path):
+    with open(path, 'rb') as f:
+        head = f.read(54)
+    if head[:2] != b'BM':
+        return None
+    offset = int.from_bytes(head[10:14], 'little')
+    header_size = int.from_bytes(head[14:18], 'little')
+    w = int.from_bytes(head[18:22], 'little', signed=True)
+    h = int.from_bytes(head[22:26], 'little', signed=True)
+    bpp = int.from_bytes(head[28:30], 'little')
+    compression = int.from_bytes(head[30:34], 'little')
+    if compression != 0 or bpp not in (8, 24):
+        return None
+    channels = bpp // 8
+    stride = (w * channels + 3) // 4 * 4
+    raw = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(abs(h), stride))
+    palette = None
+    if bpp == 8:
+        n_colors = int.from_bytes(head[46:50], 'little') or 256
+        with open(path, 'rb') as f:
+            f.seek(14 + header_size)
+            bgrx = np.frombuffer(f.read(4 * n_colors), dtype=np.uint8).reshape(-1, 4)
+        import cv2
+        palette = cv2.cvtColor(np.ascontiguousarray(bgrx[None, :, :3]), cv2.COLOR_BGR2GRAY)[0]
+        palette = np.pad(palette, (0, 256 - len(palette)))
+        pixels = raw[:, :w]
+    else:
+        pixels = raw[:, :w * 3].reshape(abs(h), w, 3)
+    return RowSource(pixels, bottom_up=h > 0, palette=palette)
+
+
+def open_rows(path, full_decode=True):
+    """
+    Mở ảnh để đọc theo dải, ánh xạ bộ nhớ khi định dạng cho phép. Định dạng
+    khác được giải mã toàn bộ kèm RuntimeWarning; full_decode=False thì
+    ValueError thay vì giải mã.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    source = None
+    if ext == '.npy':
+        data = np.load(path, mmap_mode='r')
+        source = RowSource(data)
+    elif ext in ('.pgm', '.pnm'):
+        source = _open_pgm(path)
+    elif ext == '.bmp':
+        source = _open_bmp(path)
+    if source is None:
+        if not full_decode:
+            raise ValueError(f"{path}: định dạng không đọc được theo dải "
+                             "(dùng .npy, PGM P5 hoặc BMP 8/24 bit không nén)")
+        warnings.warn(f"{path}: định dạng không đọc được theo dải, giải mã toàn bộ ảnh vào "
+                      "bộ nhớ; đổi sang .npy, PGM P5 hoặc BMP không nén để bộ nhớ bị chặn "
+                      "theo strip_rows", RuntimeWarning, stacklevel=2)
+        import cv2
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError(f"Không đọc được ảnh: {path}")
+        source = RowSource(img)
+    return source
+
+
+class _InkCache:
+    """
+    Truy cập từng điểm ảnh nhị phân (mực = True) qua bộ đệm LRU vài dải.
+    """
+
+    def __init__(self, source, threshold, strip_rows, max_strips=4):
+        self.source = source
+        self.threshold = threshold
+        self.strip_rows = strip_rows
+        self.max_strips = max_strips
+        self.H, self.W = source.shape
+        self._strips = OrderedDict()
+
+    def strip(self, k):
+        mask = self._strips.get(k)
+        if mask is None:
+            r0 = k * self.strip_rows
+            rows = self.source.read(r0, min(self.H, r0 + self.strip_rows))
+            mask = rows <= self.threshold
+            self._strips[k] = mask
+            if len(self._strips) > self.max_strips:
+                self._strips.popitem(last=False)
+        else:
+            self._strips.move_to_end(k)
+        return mask
+
+    def __call__(self, i, j):
+        if i < 0 or j < 0 or i >= self.H or j >= self.W:
+            return False
+        k, r = divmod(i, self.strip_rows)
+        return bool(self.strip(k)[r, j])
+
+
+# 8 hướng lân cận (di, dj) theo chiều ngược kim đồng hồ, bắt đầu từ bên phải
+_DIRS = ((0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1))
+
+
+def trace_outer(ink, i, j):
+    """
+    Dò đường biên ngoài (Suzuki-Abe, bước 3) bắt đầu từ điểm ảnh (i, j) là
+    điểm đầu tiên theo thứ tự quét của thành phần. Trả về mảng [N, 2] (x, y)
+    cùng thứ tự điểm với cv2.findContours(..., CHAIN_APPROX_NONE).
+    """
+    # (3.1) từ ô bên trái, tìm theo chiều kim đồng hồ điểm mực đầu tiên
+    first = None
+    for k in range(4, -4, -1):
+        di, dj = _DIRS[k % 8]
+        if ink(i + di, j + dj):
+            first = (i + di, j + dj)
+            d = k % 8
+            break
+    if first is None:
+        return np.array([[j, i]])
+    points = []
+    ci, cj = i, j
+    # d: hướng từ điểm hiện tại tới điểm trước đó (i2, j2)
+    while True:
+        # (3.3) tìm ngược kim đồng hồ, bắt đầu sau (i2, j2)
+        for step in range(1, 9):
+            k = (d + step) % 8
+            di, dj = _DIRS[k]
+            if ink(ci + di, cj + dj):
+                break
+        ni, nj = ci + di, cj + dj
+        points.append((cj, ci))
+        # (3.5) dừng khi quay về điểm đầu và điểm kế là điểm thứ nhất đã tìm
+        if (ni, nj) == (i, j) and (ci, cj) == first:
+            break
+        d = (k + 4) % 8
+        ci, cj = ni, nj
+    return np.array(points)
+
+
+def _find(parent, a):
+    while parent[a] != a:
+        parent[a] = parent[parent[a]]
+        a = parent[a]
+    return a
+
+
+def label_strips(source, threshold=127, strip_rows=1024):
+    """
+    Lượt 1: gán nhãn thành phần liên thông theo dải và nối qua mép dải.
+    Trả về dict các mảng theo thành phần: bbox (x0, y0, x1, y1 - không gồm
+    mép phải/dưới), start (hàng, cột của điểm ảnh đầu tiên), border (số điểm
+    ảnh biên, dùng để xếp hạng độ dài đường biên).
+    """
+    import cv2
+
+    H, W = source.shape
+    parent = []
+    x0, y0, x1, y1, first, border = [], [], [], [], [], []
+    prev_row = None
+    for r0 in range(0, H, strip_rows):
+        r1 = min(H, r0 + strip_rows)
+        a0, a1 = max(0, r0 - 1), min(H, r1 + 1)
+        ink = source.read(a0, a1) <= threshold
+        core = ink[r0 - a0:r0 - a0 + (r1 - r0)]
+        n, lab, stats, _ = cv2.connectedComponentsWithStats(
+            core.view(np.uint8), connectivity=8)
+        base = len(parent)
+        parent.extend(range(base, base + n - 1))
+        x0.extend(stats[1:, 0])
+        y0.extend(stats[1:, 1] + r0)
+        x1.extend(stats[1:, 0] + stats[1:, 2])
+        y1.extend(stats[1:, 1] + stats[1:, 3] + r0)
+
+        # Điểm ảnh đầu tiên theo thứ tự quét của mỗi nhãn nằm ở hàng trên cùng của nó
+        top_rows = np.unique(stats[1:, 1])
+        labels, idx = np.unique(lab[top_rows], return_index=True)
+        idx = idx[labels > 0]
+        first.extend((top_rows[idx // W] + r0) * W + idx % W)
+
+        # Điểm ảnh biên: mực có ít nhất một lân cận 4 hướng là nền (ngoài ảnh là nền)
+        ext = np.zeros((r1 - r0 + 2, W + 2), dtype=bool)
+        ext[1:-1, 1:-1] = core
+        if a0 < r0:
+            ext[0, 1:-1] = ink[0]
+        if a1 > r1:
+            ext[-1, 1:-1] = ink[-1]
+        interior = ext[:-2, 1:-1] & ext[2:, 1:-1] & ext[1:-1, :-2] & ext[1:-1, 2:]
+        border.extend(np.bincount(lab[core & ~interior], minlength=n)[1:])
+
+        # Nối với dải trước: lân cận 8 hướng giữa hàng cuối dải trước và hàng đầu dải này
+        cur_row = np.where(lab[0] > 0, lab[0] + base - 1, -1)
+        if prev_row is not None:
+            pairs = []
+            for shift in (-1, 0, 1):
+                a = cur_row[max(0, -shift):W - max(0, shift)]
+                b = prev_row[max(0, shift):W - max(0, -shift)]
+                ok = (a >= 0) & (b >= 0)
+                pairs.append(np.stack([a[ok], b[ok]], axis=1))
+            for a, b in np.unique(np.vstack(pairs), axis=0):
+                ra, rb = _find(parent, a), _find(parent, b)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+        prev_row = np.where(lab[-1] > 0, lab[-1] + base - 1, -1)
+
+    roots = np.array([_find(parent, a) for a in range(len(parent))], dtype=np.int64)
+    comp, inverse = np.unique(roots, return_inverse=True)
+    m = len(comp)
+
+    def reduce(values, ufunc, init):
+        out = np.full(m, init, dtype=np.int64)
+        ufunc.at(out, inverse, np.asarray(values, dtype=np.int64))
+        return out
+
+    big = np.iinfo(np.int64).max
+    start = reduce(first, np.minimum, big)
+    return {
+        'bbox': np.stack([reduce(x0, np.minimum, big), reduce(y0, np.minimum, big),
+                          reduce(x1, np.maximum, 0), reduce(y1, np.maximum, 0)], axis=1),
+        'start': np.stack([start // W, start % W], axis=1),
+        'border': reduce(border, np.add, 0),
+    }
+
+
+@trace.traced('find_contours_tiled')
+def largest_contour_tiled(image_path, threshold=127, strip_rows=1024, candidates=8,
+                          full_decode=True):
+    """
+    Đường biên ngoài dài nhất của ảnh, tính theo dải strip_rows hàng: dò
+    'candidates' thành phần không lồng trong lỗ của thành phần khác có
+    nhiều điểm biên nhất rồi lấy đường dài nhất. full_decode: xem open_rows.
+    Trả về (contour [N, 2] (x, y), chiều cao ảnh).
+    """
+    source = open_rows(image_path, full_decode)
+    H, W = source.shape
+    comps = label_strips(source, threshold, strip_rows)
+    if len(comps['border']) == 0:
+        raise ValueError("Không tìm thấy đường vẽ!")
+    ink = _InkCache(source, threshold, strip_rows)
+    traced = {}
+
+    def contour_of(c):
+        if c not in traced:
+            traced[c] = trace_outer(ink, *comps['start'][c])
+        return traced[c]
+
+    def is_nested(c):
+        import cv2
+
+        # Thành phần nằm trong lỗ của thành phần khác thì không phải biên ngoài
+        bx0, by0, bx1, by1 = comps['bbox'][c]
+        bb = comps['bbox']
+        outer = np.flatnonzero((bb[:, 0] < bx0) & (bb[:, 1] < by0) &
+                               (bb[:, 2] > bx1) & (bb[:, 3] > by1))
+        si, sj = comps['start'][c]
+        for o in outer:
+            poly = contour_of(o).reshape(-1, 1, 2).astype(np.int32)
+            if cv2.pointPolygonTest(poly, (float(sj), float(si)), False) > 0:
+                return True
+        return False
+
+    order = np.argsort(-comps['border'], kind='stable')
+    best = None
+    found = 0
+    for c in order:
+        if found == candidates:
+            break
+        if is_nested(c):
+            continue
+        found += 1
+        if best is None or len(contour_of(c)) > len(contour_of(best)):
+            best = c
+    if best is None:
+        raise ValueError("Không tìm thấy đường vẽ!")
+    return contour_of(best), H
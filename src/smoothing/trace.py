@@ -0,0 +1,326 @@
+"""
+Đo thời gian từng bước của quy trình làm mượt (đọc ảnh, ngưỡng, dò đường
+biên, lọc x trùng, Savitzky-Golay, dựng spline, BPTT, đánh giá lưới dày,
+xuất CSV, lưu hình...).
+
+Mỗi bước ghi một sự kiện: tên, thời điểm bắt đầu, thời gian chạy (ms), số
+điểm vào / ra, mức lồng nhau, tiến trình và luồng, đỉnh RSS của tiến trình
+(MB, nơi có module resource) và, nếu bật memory=True, đỉnh bộ nhớ cấp phát
+trong riêng bước đó (MB, đo bằng tracemalloc nên làm chậm mọi phép cấp phát;
+bộ nhớ cv2 tự cấp không được đếm). Sự kiện xuất được ra JSON lines hoặc
+định dạng trace-event của Chrome (mở bằng chrome://tracing hoặc Perfetto).
+
+Mặc định tắt: stage() trả về một đối tượng rỗng dùng chung và hàm có
+@traced chỉ kiểm tra một cờ trước khi gọi hàm gốc, nên chi phí còn vài
+trăm nano giây mỗi bước.
+
+Ví dụ:
+    from smoothing import trace
+    trace.enable()
+    with trace.stage('threshold', points_in=img.size) as span:
+        ...
+        span.set(points_out=len(contour))
+    trace.write_chrome_trace("trace.json")
+    print(trace.format_summary(trace.summary()))
+
+Các script chạy trực tiếp gọi enable_from_env(): đặt biến môi trường
+SMOOTHING_TRACE=<file .jsonl hoặc .json> (và SMOOTHING_TRACE_MEMORY=1 để đo
+bộ nhớ từng bước) thì khi thoát sẽ ghi file và in bảng tổng hợp. Chỉ giữ
+SMOOTHING_TRACE_MAX_EVENTS sự kiện mới nhất (mặc định DEFAULT_MAX_EVENTS,
+0 là không giới hạn) để tiến trình chạy lâu như dịch vụ không tốn bộ nhớ
+mãi.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+_events = deque()
+# Số sự kiện giữ lại mặc định khi bật bằng biến môi trường
+DEFAULT_MAX_EVENTS = 100000
+_local = threading.local()
+
+
+class _NoSpan:
+    """Bước rỗng khi đang tắt: không đo, không ghi gì."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả KB, macOS trả byte
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class _Span:
+    """Một bước đang chạy; ghi sự kiện vào bộ đệm khi kết thúc."""
+
+    def __init__(self, name, fields):
+        self.event = {'name': name, 'points_in': None, 'points_out': None}
+        self.event.update(fields)
+
+    def set(self, **fields):
+        self.event.update(fields)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.event['depth'] = len(stack)
+        if _memory:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            # Ghi đỉnh của bước ngoài trước khi đặt lại để đo riêng bước này
+            if stack:
+                stack[-1].peak_seen = max(stack[-1].peak_seen, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+            self.peak_seen = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = _local.stack
+        stack.pop()
+        event = self.event
+        event['ts'] = self.start
+        event['dur_ms'] = (end - self.start) * 1000
+        event['pid'] = os.getpid()
+        event['tid'] = threading.get_ident()
+        if _memory:
+            import tracemalloc
+
+            peak = max(self.peak_seen, tracemalloc.get_traced_memory()[1])
+            event['peak_mb'] = (peak - self.mem_start) / 2 ** 20
+            if stack:
+                stack[-1].peak_seen = max(stack[-1].peak_seen, peak)
+        event['max_rss_mb'] = _max_rss_mb()
+        if exc_type is not None:
+            event['error'] = exc_type.__name__
+        _events.append(event)
+        return False
+
+
+def count_points(value):
+    """
+    Số điểm của một giá trị vào / ra của bước: RaggedStrokes -> số điểm,
+    mảng [..., 2] -> số cặp tọa độ, mảng khác -> số phần tử (ví dụ số điểm
+    ảnh), tuple/list -> theo phần tử đầu, còn lại None.
+    """
+    if hasattr(value, 'points') and hasattr(value, 'offsets'):
+        return len(value.points)
+    if isinstance(value, np.ndarray):
+        if value.ndim >= 2 and value.shape[-1] == 2:
+            return value.size // 2
+        return value.size
+    if isinstance(value, (tuple, list)) and value:
+        return count_points(value[0])
+    return None
+
+
+def stage(name, **fields):
+    """
+    Ngữ cảnh đo một bước: with stage('savgol', points_in=n) as span: ...;
+    span.set(points_out=m, ...) thêm trường cho sự kiện. Khi tắt trả về
+    đối tượng rỗng dùng chung.
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, fields)
+
+
+def traced(name):
+    """
+    Decorator đo cả hàm như một bước; số điểm vào lấy từ tham số đầu, số
+    điểm ra từ giá trị trả về (xem count_points).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {'points_in': count_points(args[0]) if args else None}) as span:
+                result = func(*args, **kwargs)
+                span.set(points_out=count_points(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def enable(memory=False, max_events=None):
+    """
+    Bật đo, xóa các sự kiện cũ. memory=True đo thêm đỉnh bộ nhớ từng bước
+    (tracemalloc, chậm). max_events giới hạn số sự kiện giữ lại (bỏ cũ
+    nhất), cho tiến trình chạy lâu như dịch vụ.
+    """
+    global _enabled, _memory, _events, _started_tracemalloc
+    if memory:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+    _events = deque(maxlen=max_events)
+    _memory = memory
+    _enabled = True
+
+
+def disable():
+    """Tắt đo (các sự kiện đã ghi vẫn giữ tới khi collect)."""
+    global _enabled, _memory, _started_tracemalloc
+    _enabled = False
+    if _memory and _started_tracemalloc:
+        import tracemalloc
+
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def collect(clear=True):
+    """Danh sách sự kiện đã ghi (theo thứ tự kết thúc); clear=True thì xóa bộ đệm."""
+    events = list(_events)
+    if clear:
+        _events.clear()
+    return events
+
+
+def extend(events):
+    """Thêm sự kiện ghi ở nơi khác (ví dụ tiến trình worker) vào bộ đệm."""
+    _events.extend(events)
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def write_jsonl(path, events=None):
+    """Ghi mỗi sự kiện một dòng JSON (mặc định: các sự kiện trong bộ đệm)."""
+    events = collect(clear=False) if events is None else events
+    with open(path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, default=_jsonable) + '\n')
+
+
+def write_chrome_trace(path, events=None):
+    """
+    Ghi sự kiện theo định dạng trace-event của Chrome (sự kiện 'X', thời
+    gian theo micro giây); mỗi tiến trình worker là một hàng riêng.
+    """
+    events = collect(clear=False) if events is None else events
+    trace_events = []
+    for event in events:
+        args = {k: v for k, v in event.items()
+                if k not in ('name', 'ts', 'dur_ms', 'pid', 'tid') and v is not None}
+        trace_events.append({'name': event['name'], 'cat': 'smoothing', 'ph': 'X',
+                             'ts': event['ts'] * 1e6, 'dur': event['dur_ms'] * 1000,
+                             'pid': event['pid'], 'tid': event['tid'], 'args': args})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f,
+                  ensure_ascii=False, default=_jsonable)
+
+
+def write(path, events=None):
+    """Ghi JSON lines nếu path kết thúc bằng .jsonl, không thì trace Chrome."""
+    if path.endswith('.jsonl'):
+        write_jsonl(path, events)
+    else:
+        write_chrome_trace(path, events)
+
+
+def summary(events=None):
+    """
+    Tổng hợp theo tên bước: số lần, tổng / p50 / p99 / lớn nhất (ms), tổng
+    số điểm vào / ra, đỉnh bộ nhớ lớn nhất (MB). Thời gian của bước ngoài
+    đã gồm các bước lồng bên trong.
+    """
+    events = collect(clear=False) if events is None else events
+    groups = {}
+    for event in events:
+        groups.setdefault(event['name'], []).append(event)
+    out = {}
+    for name, group in groups.items():
+        dur = np.array([e['dur_ms'] for e in group])
+        peaks = [e['peak_mb'] for e in group if e.get('peak_mb') is not None]
+        out[name] = {
+            'count': len(group),
+            'total_ms': float(dur.sum()),
+            'p50_ms': float(np.percentile(dur, 50)),
+            'p99_ms': float(np.percentile(dur, 99)),
+            'max_ms': float(dur.max()),
+            'points_in': sum(e['points_in'] or 0 for e in group),
+            'points_out': sum(e['points_out'] or 0 for e in group),
+            'peak_mb': max(peaks) if peaks else None,
+            'errors': sum('error' in e for e in group),
+        }
+    return out
+
+
+def format_summary(stats):
+    """Bảng tổng hợp từ summary(), xếp theo tổng thời gian giảm dần."""
+    lines = [f"{'bước':<24}{'lần':>7}{'tổng ms':>11}{'p50 ms':>9}{'p99 ms':>9}"
+             f"{'điểm vào':>12}{'điểm ra':>12}{'đỉnh MB':>9}"]
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]['total_ms']):
+        peak = f"{s['peak_mb']:9.1f}" if s['peak_mb'] is not None else f"{'-':>9}"
+        lines.append(f"{name:<24}{s['count']:7d}{s['total_ms']:11.1f}{s['p50_ms']:9.2f}"
+                     f"{s['p99_ms']:9.2f}{s['points_in']:12d}{s['points_out']:12d}{peak}")
+    return '\n'.join(lines)
+
+
+def enable_from_env():
+    """
+    Bật đo nếu có biến môi trường SMOOTHING_TRACE (đường dẫn file kết quả),
+    giữ tối đa SMOOTHING_TRACE_MAX_EVENTS sự kiện mới nhất; khi tiến trình
+    thoát thì ghi file và in bảng tổng hợp. Trả về True nếu bật.
+    """
+    path = os.environ.get('SMOOTHING_TRACE')
+    if not path:
+        return False
+    max_events = int(os.environ.get('SMOOTHING_TRACE_MAX_EVENTS', DEFAULT_MAX_EVENTS))
+    enable(memory=os.environ.get('SMOOTHING_TRACE_MEMORY', '') not in ('', '0'),
+           max_events=max_events if max_events > 0 else None)
+
+    def finish():
+        events = collect()
+        write(path, events)
+        print(format_summary(summary(events)))
+        print(f"Đã ghi {len(events)} sự kiện đo thời gian: {path}")
+
+    atexit.register(finish)
+    return True
@@ -0,0 +1,13 @@
+"""
+Cấu hình chung cho pytest: các script và gói smoothing nằm trong src/, các
+phương pháp số của bài giảng trong code_PPT/ (không phải gói cài đặt), nên
+thêm hai thư mục này vào sys.path.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for name in ('src', 'code_PPT'):
+    path = os.path.join(ROOT, name)
+    if path not in sys.path:
+        sys.path.insert(0, path)
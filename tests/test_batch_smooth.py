@@ -0,0 +1,41 @@
+import os
+
+from batch_smooth import output_stems, run_pool
+
+
+def _task(name, value):
+    if name == 'crash':
+        os._exit(1)  # như worker bị segfault / OOM kill
+    if name == 'error':
+        raise ValueError(name)
+    return value * 2
+
+
+def test_run_pool_survives_dead_worker():
+    jobs = [(f'ok{i}', i) for i in range(12)]
+    jobs[3] = ('crash', 3)
+    jobs[7] = ('error', 7)
+    results = {job[0]: (result, error) for job, result, error in run_pool(jobs, _task, workers=2)}
+    assert len(results) == len(jobs)
+    for name, value in jobs:
+        result, error = results[name]
+        if name == 'crash':
+            assert result is None and error.startswith('BrokenProcessPool')
+        elif name == 'error':
+            assert result is None and error == 'ValueError: error'
+        else:
+            assert error is None and result == value * 2
+
+
+def test_output_stems_unique():
+    paths = [os.path.join('scans', 'a', 'x.png'), os.path.join('scans', 'b', 'x.png'),
+             os.path.join('scans', 'b', 'x.jpg'), os.path.join('scans', 'y.png'),
+             os.path.join('scans', 'a_b', 'x.png'), os.path.join('scans', 'a', 'b_x.png')]
+    stems = output_stems(paths)
+    assert stems[paths[3]] == 'y'
+    assert stems[paths[0]] == 'a_x_png' and stems[paths[2]] == 'b_x_jpg'
+    assert len({s.lower() for s in stems.values()}) == len(paths)
+    assert output_stems(['X.png', 'x.png'])['X.png'] != output_stems(['X.png', 'x.png'])['x.png']
+    # <x>_figure.png của ảnh x không được trùng kết quả của ảnh x_figure
+    stems = output_stems(['x.png', 'x_figure.png'])
+    assert stems['x.png'] + '_figure' != stems['x_figure.png']
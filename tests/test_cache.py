@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from smoothing.cache import ResultCache, array_digest
+from smoothing.image_pipeline import process_image, process_image_strokes
+
+
+@pytest.fixture()
+def image_path(tmp_path):
+    img = np.full((300, 400), 255, np.uint8)
+    x = np.arange(20, 380)
+    cv2.polylines(img, [np.column_stack([x, 150 + 60 * np.sin(x / 40)]).astype(np.int32)],
+                  False, 0, 3)
+    cv2.circle(img, (300, 60), 30, 0, 2)
+    path = str(tmp_path / 'stroke.png')
+    cv2.imwrite(path, img)
+    return path
+
+
+def _assert_same(a, b):
+    assert set(a) - {'cache', 'contour_timing'} == set(b) - {'cache', 'contour_timing'}
+    for name in a:
+        if name in ('cache', 'contour_timing'):
+            continue
+        if name == 'strokes':
+            np.testing.assert_array_equal(a[name].points, b[name].points)
+            np.testing.assert_array_equal(a[name].offsets, b[name].offsets)
+        elif isinstance(a[name], dict):
+            assert a[name] == b[name]
+        else:
+            np.testing.assert_array_equal(a[name], b[name])
+
+
+@pytest.mark.parametrize('process', [process_image, process_image_strokes])
+def test_hit_equals_miss(tmp_path, image_path, process):
+    directory = str(tmp_path / 'cache')
+    cache = ResultCache(directory)
+    miss = process(image_path, 200, cache=cache)
+    hit = process(image_path, 200, cache=cache)
+    disk = process(image_path, 200, cache=ResultCache(directory))
+    plain = process(image_path, 200)
+    assert (miss['cache'], hit['cache'], disk['cache']) == ('miss', 'hit', 'hit')
+    for result in (hit, disk, plain):
+        _assert_same(miss, result)
+    # Tham số khác: khóa khác
+    assert process(image_path, 150, cache=cache)['cache'] == 'miss'
+
+
+def test_version_change_invalidates(tmp_path):
+    directory = str(tmp_path / 'cache')
+    old = ResultCache(directory, version='0' * 16)
+    key = old.key(array_digest(np.arange(3)), window=51)
+    old.put(key, {'a': np.arange(3)})
+    np.testing.assert_array_equal(ResultCache(directory, version='0' * 16).get(key)['a'],
+                                  np.arange(3))
+    new = ResultCache(directory, version='1' * 16)
+    assert new.get(new.key(array_digest(np.arange(3)), window=51)) is None
+    assert ResultCache(directory, version='0' * 16).get(key) is None
+
+
+def test_eviction_respects_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_items=1, max_bytes=3000)
+    for i in range(10):
+        cache.put(cache.key(str(i)), {'a': np.full(100, i, dtype=float)})
+    assert cache.disk_bytes() <= 3000
+    assert cache.stats()['evictions'] > 0
+    np.testing.assert_array_equal(cache.get(cache.key('9'))['a'], np.full(100, 9.0))
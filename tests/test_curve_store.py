@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from smoothing.curve_store import CurveStore, HEADER_BYTES, save_curves
+
+
+def _fill(path, n=3):
+    with CurveStore(path) as store:
+        for i in range(n):
+            store.append({'x': np.arange(5.0) + i, 'y': np.full(5, float(i))}, item=i)
+
+
+def _check(path, n):
+    with CurveStore(path, mode='r') as store:
+        assert len(store) == n
+        for i in range(n):
+            curve = store[i]
+            np.testing.assert_array_equal(curve['x'], np.arange(5.0) + i)
+            np.testing.assert_array_equal(curve['y'], np.full(5, float(i)))
+            assert store.meta(i)['item'] == i
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'c.crv')
+    _fill(path)
+    written = save_curves({'a': np.ones((2, 4)), 'b': np.zeros((2, 4))}, path,
+                          str(tmp_path / 'c.csv'), method='batch')
+    assert list(written) == [3, 4]
+    with CurveStore(path, mode='r') as store:
+        assert len(store) == 5
+        np.testing.assert_array_equal(store[4]['a'], np.ones(4))
+        assert store.meta(4) == {'method': 'batch', 'columns': ['a', 'b']}
+    lines = open(tmp_path / 'c.csv', encoding='utf-8').read().splitlines()
+    assert lines[0] == 'curve,a,b' and len(lines) == 9
+
+
+def test_read_only_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CurveStore(str(tmp_path / 'none.crv'), mode='r')
+
+
+@pytest.mark.parametrize('suffix, tail', [
+    ('.idx', b'\x01' * 12),          # bản ghi chỉ mục thiếu byte
+    ('', b'\x02' * 13),              # dữ liệu chưa có chỉ mục, lẻ byte
+    ('.meta', b'{"columns": ["x"'),  # dòng metadata ghi dở
+], ids=['idx', 'data', 'meta'])
+def test_recover_interrupted_write(tmp_path, suffix, tail):
+    path = str(tmp_path / 'c.crv')
+    _fill(path)
+    sizes = {s: os.path.getsize(path + s) for s in ('', '.idx', '.meta')}
+    with open(path + suffix, 'ab') as f:
+        f.write(tail)
+    # Chỉ đọc: bỏ qua phần đuôi, không sửa file
+    _check(path, 3)
+    assert os.path.getsize(path + suffix) == sizes[suffix] + len(tail)
+    # Ghi thêm: cắt phần đuôi rồi nối tiếp đúng chỗ
+    with CurveStore(path) as store:
+        store.append({'x': np.arange(5.0) + 3, 'y': np.full(5, 3.0)}, item=3)
+    _check(path, 4)
+    assert os.path.getsize(path) == HEADER_BYTES + 4 * 2 * 5 * 8
+
+
+def test_recover_data_without_index(tmp_path):
+    # Dữ liệu và metadata đã ghi nhưng chỉ mục chưa kịp ghi
+    path = str(tmp_path / 'c.crv')
+    _fill(path)
+    with open(path, 'ab') as f:
+        f.write(np.ones(10).tobytes())
+    with open(path + '.meta', 'a', encoding='utf-8') as f:
+        f.write('{"columns": ["x", "y"], "meta": {}}\n')
+    with CurveStore(path) as store:
+        assert len(store) == 3
+        store.append({'x': np.arange(5.0) + 3, 'y': np.full(5, 3.0)}, item=3)
+    _check(path, 4)
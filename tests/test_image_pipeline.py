@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from smoothing.image_pipeline import largest_contour, largest_contour_coarse_to_fine
+
+
+def _line_and_scribble():
+    # Đường thẳng dài ở mức thô nhưng nét ngoằn ngoèo dài hơn ở mức gốc
+    img = np.full((800, 800), 255, np.uint8)
+    cv2.line(img, (50, 50), (750, 50), 0, 2)
+    pts = np.array([[300 + (i % 2) * 120, 300 + i * 2] for i in range(61)], np.int32)
+    cv2.polylines(img, [pts], False, 0, 1)
+    return img
+
+
+def _random_strokes(seed):
+    rng = np.random.default_rng(seed)
+    img = np.full((1200, 1000), 255, np.uint8)
+    for _ in range(6):
+        pts = np.cumsum(rng.normal(0, 25, (40, 2)), axis=0) + rng.uniform(200, 800, 2)
+        cv2.polylines(img, [pts.astype(np.int32)], False, 0, int(rng.integers(1, 4)))
+    return img
+
+
+@pytest.mark.parametrize('img', [_line_and_scribble()] + [_random_strokes(s) for s in range(4)],
+                         ids=['line_scribble'] + [f'random{s}' for s in range(4)])
+def test_coarse_to_fine_matches_full_resolution(img):
+    expected = largest_contour(img)
+    contour, timing = largest_contour_coarse_to_fine(img)
+    assert set(timing) == {'coarse_s', 'fine_s'}
+    assert len(contour) == len(expected)
+    np.testing.assert_array_equal(np.sort(contour, axis=0), np.sort(expected, axis=0))
+
+
+@pytest.mark.parametrize('thickness', [1, 3, 6])
+def test_default_simplify_no_worse_than_decimation(tmp_path, thickness):
+    from smoothing.image_pipeline import process_image, process_image_strokes
+
+    height = 400
+    x = np.arange(20, 880)
+    row = 200 + 100 * np.sin(x / 60)
+    img = np.full((height, 900), 255, np.uint8)
+    cv2.polylines(img, [np.column_stack([x, row]).astype(np.int32)], False, 0, thickness)
+    path = str(tmp_path / 'sine.png')
+    cv2.imwrite(path, img)
+
+    def error(result):
+        truth = height - (200 + 100 * np.sin(result['x_dense'] / 60))
+        return np.abs(result['y_spline'] - truth).max()
+
+    # RDP đưa ít điểm hơn vào làm mượt; sai số được phép lệch dưới 1 px so
+    # với chỉ chia đều
+    baseline = process_image(path, 500, tolerance=None)
+    simplified = process_image(path, 500)
+    assert error(simplified) <= error(baseline) + 1
+    assert simplified['simplify']['points_smoothed'] < baseline['simplify']['points_smoothed']
+    assert error(process_image_strokes(path, 500)) <= error(
+        process_image_strokes(path, 500, tolerance=None)) + 1
+
+
+def test_subdivide_keeps_vertices():
+    from smoothing.simplify import subdivide_polyline
+
+    square = np.array([[0, 0], [4, 0], [4, 4], [0, 4]])
+    closed = subdivide_polyline(square, 8, closed=True)
+    np.testing.assert_allclose(np.hypot(*np.diff(np.vstack([closed, closed[:1]]), axis=0).T), 2)
+    # Đường mở dài 12 với bước 3: mỗi cạnh dài 4 chia 1 phần, giữ mọi đỉnh
+    np.testing.assert_allclose(subdivide_polyline(square, 4), square)
+    # Cạnh dài 100 chỉ chia tối đa max_parts phần, cạnh ngắn giữ bước 1
+    ramp = np.array([[0, 0], [100, 0], [100, 2]])
+    out = subdivide_polyline(ramp, 102, max_parts=4)
+    np.testing.assert_allclose(out, [[0, 0], [25, 0], [50, 0], [75, 0], [100, 0],
+                                     [100, 1], [100, 2]])
+
+
+@pytest.mark.parametrize('strokes', [False, True], ids=['single', 'strokes'])
+def test_straight_runs_reduce_smoothed_points(tmp_path, strokes):
+    from smoothing.image_pipeline import process_image, process_image_strokes
+
+    # Bậc thang: các đoạn thẳng dài nối bằng góc vuông
+    img = np.full((400, 900), 255, np.uint8)
+    steps = np.array([[50, 350], [250, 350], [250, 250], [450, 250], [450, 150],
+                      [650, 150], [650, 50], [850, 50]], np.int32)
+    cv2.polylines(img, [steps], False, 0, 3)
+    path = str(tmp_path / 'steps.png')
+    cv2.imwrite(path, img)
+
+    fit = process_image_strokes if strokes else process_image
+    baseline = fit(path, 500, tolerance=None)['simplify']
+    stats = fit(path, 500)['simplify']
+    assert stats['points_in'] == baseline['points_in']
+    assert stats['points_smoothed'] < baseline['points_smoothed'] / 2
+
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from smoothing.cache import ResultCache
+from smoothing.ingest import IngestPipeline, smooth_and_fit
+from smoothing.synthetic import synthetic_strokes
+
+
+async def _run_pens(pipeline, pens):
+    """Mỗi bút đẩy nét của mình theo khối 7 điểm rồi kết thúc; trả về kết quả theo khóa."""
+    async def pen(name, strokes):
+        for s, stroke in enumerate(strokes):
+            for i in range(0, len(stroke), 7):
+                await pipeline.push((name, s), stroke[i:i + 7])
+            await pipeline.end((name, s))
+
+    await pipeline.start()
+    results = {}
+
+    async def reader():
+        async for result in pipeline.results():
+            results[result['stroke']] = result
+
+    reading = asyncio.create_task(reader())
+    await asyncio.gather(*(pen(name, strokes) for name, strokes in pens.items()))
+    await pipeline.close()
+    await reading
+    return results
+
+
+def test_cache_skips_seen_strokes():
+    strokes = synthetic_strokes(np.random.default_rng(2), 3)
+    cache = ResultCache()
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            first = IngestPipeline(executor, n_dense=40, cache=cache)
+            one = await _run_pens(first, {'a': strokes})
+            second = IngestPipeline(executor, n_dense=40, cache=cache)
+            two = await _run_pens(second, {'b': strokes})
+        return one, two, second.batches
+
+    one, two, batches = asyncio.run(main())
+    assert batches == 0
+    for s in range(len(strokes)):
+        for name in ('x_dense', 'y_spline', 'y_bptt', 'bezier'):
+            np.testing.assert_array_equal(one[('a', s)][name], two[('b', s)][name])
+    assert cache.stats()['memory_hits'] == len(strokes)
+
+
+def test_pens_match_direct_fit():
+    rng = np.random.default_rng(3)
+    pens = {f'pen{i}': synthetic_strokes(rng, 4) for i in range(3)}
+
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            pipeline = IngestPipeline(executor, stream_queue=4, fit_queue=2, max_batch=3,
+                                      n_dense=60)
+            return await _run_pens(pipeline, pens), pipeline.metrics()
+
+    results, metrics = asyncio.run(main())
+    assert set(results) == {(name, s) for name, strokes in pens.items()
+                            for s in range(len(strokes))}
+    assert metrics['strokes_done'] == len(results) and metrics['errors'] == 0
+    for (name, s), result in results.items():
+        stroke = pens[name][s]
+        expected, = smooth_and_fit(stroke, [0, len(stroke)], n_dense=60)
+        for key in ('smoothed', 'x_dense', 'y_spline', 'y_bptt', 'bezier'):
+            np.testing.assert_allclose(result[key], expected[key], rtol=0, atol=1e-9)
+
+
+def test_stalled_reader_blocks_pen():
+    strokes = synthetic_strokes(np.random.default_rng(4), 12, points=(20, 40))
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            pipeline = IngestPipeline(executor, stream_queue=2, fit_queue=1, result_queue=1,
+                                      max_batch=1, max_inflight=1, n_dense=20)
+            await pipeline.start()
+            progress = []
+
+            async def pen():
+                for s, stroke in enumerate(strokes):
+                    for i in range(0, len(stroke), 5):
+                        await pipeline.push(('pen', s), stroke[i:i + 5])
+                    await pipeline.end(('pen', s))
+                    progress.append(s)
+
+            writer = asyncio.create_task(pen())
+            await asyncio.sleep(0.5)
+            # Không ai đọc kết quả: hàng đợi kết quả và hàng đợi khớp đầy, bút
+            # dừng ở end() sau một số nét giới hạn bởi kích thước các hàng đợi
+            # và không push được nét kế tiếp
+            stalled = pipeline.metrics()
+            assert not writer.done()
+            assert stalled['result_queue'] == 1 and stalled['fit_queue'] == 1
+            assert stalled['active_streams'] == 0
+            assert len(progress) <= 4
+            results = [await pipeline.get_result() for _ in strokes]
+            await writer
+            await pipeline.close()
+            assert await pipeline.get_result() is None
+            return results
+
+    results = asyncio.run(main())
+    assert [r['stroke'] for r in results] == [('pen', s) for s in range(len(strokes))]
+    assert max(r['metrics']['blocked_ms'] for r in results) > 100
+
+
+def test_stream_lag_metrics():
+    stroke = synthetic_strokes(np.random.default_rng(5), 1, points=(30, 31))[0]
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            pipeline = IngestPipeline(executor, n_dense=20)
+            await pipeline.start()
+            for i in range(0, len(stroke), 10):
+                await pipeline.push('pen', stroke[i:i + 10])
+            queued = pipeline.metrics()['streams']['pen']['queued']
+            # Chặn vòng lặp sự kiện: các khối đang chờ bị xử lý trễ ít nhất 50 ms
+            time.sleep(0.05)
+            await asyncio.sleep(0.01)
+            live = pipeline.metrics()
+            await pipeline.end('pen')
+            result = await pipeline.get_result()
+            await pipeline.close()
+            return queued, live, result, pipeline.metrics()
+
+    queued, live, result, final = asyncio.run(main())
+    assert queued == len(range(0, len(stroke), 10))
+    stream = live['streams']['pen']
+    assert stream['queued'] == 0 and stream['points_in'] == len(stroke)
+    assert stream['max_lag_ms'] >= 50 and live['max_lag_ms'] == stream['lag_ms']
+    assert result['metrics']['max_lag_ms'] >= 50
+    assert final['active_streams'] == 0 and final['strokes_done'] == 1
+    assert final['stream_lag_p50_ms'] == result['metrics']['max_lag_ms']
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from larange import BarycentricLagrange
+
+
+def _chebyshev(n, a, b):
+    k = np.arange(n)
+    return (a + b) / 2 + (b - a) / 2 * np.cos((2 * k + 1) * np.pi / (2 * n))
+
+
+@pytest.mark.parametrize('n, a, b', [(400, 0.0, 1000.0), (100, 0.0, 1e-3), (1000, -3.0, 7.0)])
+def test_weights_do_not_overflow(n, a, b):
+    x = _chebyshev(n, a, b)
+    f = lambda t: np.sin(6 * np.pi * (t - a) / (b - a))
+    q = np.linspace(a, b, 501)
+    interp = BarycentricLagrange(x, f(x))
+    assert np.abs(interp(q) - f(q)).max() < 1e-12
+    # Thêm dần một nửa số node phải cho cùng kết quả
+    incremental = BarycentricLagrange(x[:n // 2], f(x[:n // 2]))
+    for xi in x[n // 2:]:
+        incremental.add_node(xi, f(xi))
+    assert np.abs(incremental(q) - f(q)).max() < 1e-12
+
+
+def test_nodes_return_exact_values():
+    interp = BarycentricLagrange([0.0, 1.0, 3.0], [1.0, 2.0, -1.0])
+    np.testing.assert_array_equal(interp([0.0, 1.0, 3.0]), [1.0, 2.0, -1.0])
+    with pytest.raises(ValueError):
+        interp.add_node(1.0, 5.0)
@@ -0,0 +1,124 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from smooth_server import decode_json_strokes, make_server
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = make_server(port=0, workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.batcher.close()
+    server.server_close()
+
+
+def _post_json(server, payload):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        conn.request('POST', '/smooth?n_dense=20', json.dumps(payload),
+                     {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('strokes', [
+    [[[0, 0, 1], [1, 1, 1]]],   # ba tọa độ mỗi điểm
+    [[0, 1, 2, 3]],             # số rời, không phải cặp
+    [[[0, 0], [1]]],            # cặp thiếu tọa độ
+    [[[0, 0], ['a', 1]]],
+    5,
+], ids=['triples', 'flat', 'ragged', 'text', 'not_list'])
+def test_malformed_strokes_rejected(server, strokes):
+    status, body = _post_json(server, {'strokes': strokes})
+    assert status == 400 and 'error' in body
+
+
+def test_json_request(server):
+    status, body = _post_json(server, {'strokes': [[[0, 0], [1, 1], [2, 0], [3, 1]]]})
+    assert status == 200
+    assert np.asarray(body['strokes'][0]['bptt']).shape == (20, 2)
+
+
+def test_decode_json_strokes():
+    strokes = decode_json_strokes('{"strokes": [[[0, 0], [1, 2]], [[3, 4], [5, 6], [7, 8]]]}')
+    np.testing.assert_array_equal(strokes.lengths, [2, 3])
+    np.testing.assert_array_equal(strokes.points[-1], [7, 8])
+
+
+def test_binary_round_trip(server):
+    from smooth_client import SmoothClient
+    from smooth_server import (decode_result, decode_strokes, encode_result, encode_strokes,
+                               prepare_strokes, smooth_strokes)
+    from smoothing.strokes import RaggedStrokes
+    from smoothing.synthetic import synthetic_strokes
+
+    strokes = RaggedStrokes.from_list(synthetic_strokes(np.random.default_rng(0), 7))
+    decoded = decode_strokes(encode_strokes(strokes))
+    np.testing.assert_array_equal(decoded.points, strokes.points)
+    np.testing.assert_array_equal(decoded.offsets, strokes.offsets)
+
+    expected = smooth_strokes(prepare_strokes(strokes), n_dense=50)
+    for part, back in zip(expected, decode_result(encode_result(*expected))):
+        np.testing.assert_array_equal(part, back)
+
+    client = SmoothClient(*server.server_address)
+    try:
+        for binary in (True, False):
+            result = client.smooth(strokes, n_dense=50, binary=binary)
+            for part, want in zip(result, expected):
+                np.testing.assert_allclose(part, want, rtol=0, atol=1e-9)
+    finally:
+        client.close()
+
+
+def test_batcher_caches_per_stroke():
+    from smooth_server import MicroBatcher, prepare_strokes, smooth_strokes
+    from smoothing.cache import ResultCache
+    from smoothing.strokes import RaggedStrokes
+    from smoothing.synthetic import synthetic_strokes
+
+    a, b, c = synthetic_strokes(np.random.default_rng(1), 3)
+    batcher = MicroBatcher(workers=1, cache=ResultCache())
+    try:
+        for pair in ([a, b], [b, c], [c, a]):
+            strokes = prepare_strokes(RaggedStrokes.from_list(pair))
+            result = batcher.submit(strokes, n_dense=30).result(timeout=10)
+            for part, want in zip(result, smooth_strokes(strokes, n_dense=30)):
+                np.testing.assert_allclose(part, want, rtol=0, atol=1e-9)
+    finally:
+        batcher.close()
+    stats = batcher.stats()['cache']
+    # Mỗi nét chỉ được khớp một lần
+    assert (stats['misses'], stats['memory_hits'], stats['puts']) == (3, 3, 3)
+
+
+def test_batcher_isolates_failing_request():
+    from smooth_server import MicroBatcher, smooth_strokes
+    from smoothing.strokes import RaggedStrokes
+    from smoothing.synthetic import synthetic_strokes
+
+    good = [RaggedStrokes.from_list(synthetic_strokes(np.random.default_rng(s), 2))
+            for s in range(2)]
+    # Bỏ qua prepare_strokes: nét một điểm làm lần khớp chung của cả lô lỗi
+    bad = RaggedStrokes.from_list([[[0.0, 0.0]]])
+    batcher = MicroBatcher(workers=1, max_wait=0.2)
+    try:
+        futures = [batcher.submit(strokes, n_dense=25) for strokes in (good[0], bad, good[1])]
+        for strokes, future in zip(good, futures[::2]):
+            for part, want in zip(future.result(timeout=10), smooth_strokes(strokes, n_dense=25)):
+                np.testing.assert_allclose(part, want, rtol=0, atol=1e-9)
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=10)
+    finally:
+        batcher.close()
+    stats = batcher.stats()
+    assert (stats['batches'], stats['requests'], stats['errors']) == (1, 3, 1)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from smoothing.smoothing_spline import (block_cyclic_reduction, smooth_parametric_ragged,
+                                        smoothing_spline_ragged)
+from smoothing.strokes import RaggedStrokes
+
+
+def _strokes(rng, lengths):
+    t, y = [], []
+    for n in lengths:
+        x = np.sort(rng.uniform(0, 10, n))
+        t.append(x)
+        y.append(np.column_stack([np.sin(x), np.cos(2 * x)]) + rng.normal(0, 0.1, (n, 2)))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return np.concatenate(t), np.concatenate(y), offsets
+
+
+# lam lớn hơn thì chính scipy mất độ chính xác (hệ R + lam Q^T Q), còn hệ mở
+# rộng ở đây vẫn đúng tới ~1e-12 so với lời giải 60 chữ số
+@pytest.mark.parametrize('lam', [1e-4, 0.1, 1.0])
+def test_fixed_lam_matches_scipy(lam):
+    make_smoothing_spline = pytest.importorskip('scipy.interpolate').make_smoothing_spline
+    rng = np.random.default_rng(0)
+    t, y, offsets = _strokes(rng, [5, 40, 200])
+    splines, lam_out, _ = smoothing_spline_ragged(t, y, offsets, lam)
+    np.testing.assert_allclose(lam_out, lam)
+    for s in range(3):
+        ts = t[offsets[s]:offsets[s + 1]]
+        tq = np.linspace(ts[0], ts[-1], 97)
+        for j in range(2):
+            expected = make_smoothing_spline(ts, y[offsets[s]:offsets[s + 1], j], lam=lam)(tq)
+            actual = splines[j](np.tile(tq, (3, 1)))[s]
+            np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-8)
+
+
+def test_large_lam_tends_to_least_squares_line():
+    rng = np.random.default_rng(3)
+    t, y, offsets = _strokes(rng, [50, 80])
+    splines, _, df = smoothing_spline_ragged(t, y, offsets, 1e12)
+    np.testing.assert_allclose(df, 2.0, atol=1e-6)
+    for s in range(2):
+        ts = t[offsets[s]:offsets[s + 1]]
+        for j in range(2):
+            line = np.polyval(np.polyfit(ts, y[offsets[s]:offsets[s + 1], j], 1), ts)
+            actual = splines[j](np.resize(ts, (2, len(ts))))[s]
+            np.testing.assert_allclose(actual, line, atol=1e-6)
+
+
+def test_degrees_of_freedom_is_hat_trace():
+    make_smoothing_spline = pytest.importorskip('scipy.interpolate').make_smoothing_spline
+    rng = np.random.default_rng(1)
+    t = np.sort(rng.uniform(0, 5, 30))
+    y = np.sin(t) + rng.normal(0, 0.1, 30)
+    _, lam, df = smoothing_spline_ragged(t, y, [0, 30])
+    # tr A: giá trị tại nút i của spline làm mượt vectơ đơn vị e_i
+    eye = np.eye(30)
+    trace = sum(make_smoothing_spline(t, eye[i], lam=lam[0])(t[i]) for i in range(30))
+    assert df[0] == pytest.approx(trace, rel=1e-8)
+    assert 2 < df[0] < 30
+
+
+@pytest.mark.parametrize('m', [1, 2, 3, 4, 7, 16, 33])
+def test_block_cyclic_reduction_matches_dense(m):
+    rng = np.random.default_rng(m)
+    n = 2 * m
+    full = np.zeros((n, n))
+    for b in range(m):
+        for c in (b - 1, b, b + 1):
+            if 0 <= c < m:
+                full[2 * b:2 * b + 2, 2 * c:2 * c + 2] = rng.normal(size=(2, 2))
+    # Đối xứng, tựa xác định như hệ mở rộng: khối dương / âm xen kẽ
+    full = (full + full.T) / 2 + 6 * np.diag(np.where(np.arange(n) % 2, -1.0, 1.0))
+    D = np.stack([full[2 * b:2 * b + 2, 2 * b:2 * b + 2] for b in range(m)], axis=-1)
+    E = np.stack([full[2 * b:2 * b + 2, 2 * b + 2:2 * b + 4] if b < m - 1 else np.zeros((2, 2))
+                  for b in range(m)], axis=-1)
+    f = rng.normal(size=(2, 3, m))
+    x, Sd, So = block_cyclic_reduction(D, E, f)
+    inverse = np.linalg.inv(full)
+    expected = np.linalg.solve(full, f.transpose(2, 0, 1).reshape(n, 3))
+    np.testing.assert_allclose(x.transpose(2, 0, 1).reshape(n, 3), expected, atol=1e-12)
+    for b in range(m):
+        np.testing.assert_allclose(Sd[..., b], inverse[2 * b:2 * b + 2, 2 * b:2 * b + 2],
+                                   atol=1e-12)
+        if b < m - 1:
+            np.testing.assert_allclose(So[..., b], inverse[2 * b:2 * b + 2, 2 * b + 2:2 * b + 4],
+                                       atol=1e-12)
+
+
+def test_parametric_gcv_smooths_noisy_stroke():
+    rng = np.random.default_rng(2)
+    s = np.linspace(0, 6, 300)
+    clean = np.column_stack([s, np.cos(s)])
+    strokes = RaggedStrokes.from_list([clean + rng.normal(0, 0.02, clean.shape),
+                                       np.array([[0.0, 0.0], [1.0, 1.0]])])
+    spline_x, spline_y, lam, df = smooth_parametric_ragged(strokes)
+    assert len(lam) == 2 and np.all(lam > 0)
+    # Độ dài cung của điểm nhiễu không được đẩy GCV về gần nội suy
+    assert df[0] < 60
+    assert df[1] == pytest.approx(2.0)
+    # Đường đã làm mượt gần đường thật hơn điểm gốc
+    tq = np.linspace(0, 1, 300)
+    fitted = np.column_stack([spline_x(tq[None])[0], spline_y(tq[None])[0]])
+    assert np.abs(fitted[:, 1] - np.cos(fitted[:, 0])).max() < 0.03
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+from scipy.interpolate import CubicSpline
+from scipy.signal import savgol_filter
+
+from smoothing.savgol_stream import savgol_batch
+from smoothing.strokes import (RaggedSpline, RaggedStrokes, arc_length_param, dedupe_x,
+                               drop_repeats, fit_parametric_ragged, polyfit_ragged,
+                               savgol_ragged)
+
+LENGTHS = [2, 3, 4, 5, 9, 37, 120]
+
+
+def _random_xy(rng, lengths):
+    xs = [np.cumsum(rng.uniform(0.1, 2.0, n)) - 5 for n in lengths]
+    ys = [rng.normal(0, 3, n) for n in lengths]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return xs, ys, offsets
+
+
+def test_ragged_spline_matches_cubic_spline():
+    rng = np.random.default_rng(0)
+    xs, ys, offsets = _random_xy(rng, LENGTHS)
+    spline = RaggedSpline(np.concatenate(xs), np.concatenate(ys), offsets)
+    # Trong khoảng và ngoài hai đầu (kéo dài đa thức đầu/cuối)
+    xq = np.array([np.linspace(x[0] - 0.3 * np.ptp(x), x[-1] + 0.3 * np.ptp(x), 200)
+                   for x in xs])
+    got = spline(xq)
+    x0, h, coef, seg_offsets = spline.segments()
+    for s, (x, y) in enumerate(zip(xs, ys)):
+        ref = CubicSpline(x, y)
+        np.testing.assert_allclose(got[s], ref(xq[s]), rtol=1e-12, atol=1e-12)
+        # Hệ số từng khúc: thấp trước, scipy cao trước
+        a, b = seg_offsets[s], seg_offsets[s + 1]
+        np.testing.assert_allclose(coef[:, a:b], ref.c[::-1], rtol=1e-12, atol=1e-12)
+        np.testing.assert_array_equal(x0[a:b], x[:-1])
+        np.testing.assert_allclose(h[a:b], np.diff(x))
+
+    rebuilt = RaggedSpline.from_coefficients(spline.x, spline.c, spline.offsets)
+    np.testing.assert_array_equal(rebuilt(xq), got)
+
+
+def test_ragged_spline_four_points_not_a_knot():
+    # 4 điểm: not-a-knot ở cả hai đầu cho đúng một đa thức bậc 3
+    x = np.array([0.0, 1.0, 2.5, 4.0])
+    y = 1 - 2 * x + 0.5 * x ** 2 - 0.25 * x ** 3
+    spline = RaggedSpline(x, y, [0, 4])
+    xq = np.linspace(-2, 6, 41)[None, :]
+    np.testing.assert_allclose(spline(xq)[0], CubicSpline(x, y)(xq[0]), rtol=1e-13, atol=1e-12)
+    np.testing.assert_allclose(spline(xq)[0], 1 - 2 * xq[0] + 0.5 * xq[0] ** 2
+                               - 0.25 * xq[0] ** 3, rtol=1e-12, atol=1e-11)
+
+
+def test_ragged_spline_rejects_short_strokes():
+    with pytest.raises(ValueError):
+        RaggedSpline([0.0, 1.0, 2.0], [0.0, 1.0, 0.0], [0, 2, 3])
+
+
+def _savgol_reference(points, window, polyorder):
+    w = min(window, len(points))
+    w -= w % 2 == 0
+    if w < polyorder + 2:
+        return points
+    return savgol_filter(points, w, polyorder, axis=0, mode='interp')
+
+
+@pytest.mark.parametrize('window, polyorder', [(51, 3), (7, 2), (11, 5)])
+def test_savgol_matches_scipy(window, polyorder):
+    rng = np.random.default_rng(1)
+    # Có nét ngắn hơn cửa sổ và ngắn hơn polyorder + 2 (giữ nguyên)
+    strokes = RaggedStrokes.from_list([rng.normal(0, 1, (n, 2)).cumsum(axis=0)
+                                       for n in [3, 4, 5, 6, 8, 30, 51, 52, 120]])
+    got = savgol_ragged(strokes, window, polyorder)
+    np.testing.assert_array_equal(got.offsets, strokes.offsets)
+    for s in range(len(strokes)):
+        ref = _savgol_reference(strokes[s], window, polyorder)
+        np.testing.assert_allclose(got[s], ref, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(savgol_batch(strokes[s], window, polyorder), ref,
+                                   rtol=1e-12, atol=1e-12)
+
+
+def test_savgol_window_per_stroke():
+    rng = np.random.default_rng(2)
+    strokes = RaggedStrokes.from_list([rng.normal(0, 1, (n, 2)) for n in [40, 40, 40]])
+    windows = np.array([5, 21, 41])
+    got = savgol_ragged(strokes, windows, 3)
+    for s, w in enumerate(windows):
+        np.testing.assert_allclose(got[s], _savgol_reference(strokes[s], w, 3),
+                                   rtol=1e-12, atol=1e-12)
+
+
+def test_polyfit_ragged_matches_polyfit():
+    rng = np.random.default_rng(3)
+    xs, ys, offsets = _random_xy(rng, LENGTHS)
+    # Bậc riêng từng nét; nét ít điểm bị hạ xuống n - 1
+    degree = np.array([5, 5, 2, 4, 3, 5, 1])
+    poly = polyfit_ragged(np.concatenate(xs), np.concatenate(ys), offsets, degree)
+    xq = np.array([np.linspace(x[0], x[-1], 50) for x in xs])
+    got = poly(xq)
+    for s, (x, y) in enumerate(zip(xs, ys)):
+        deg = min(degree[s], len(x) - 1)
+        ref = np.polynomial.Polynomial.fit(x, y, deg)
+        np.testing.assert_allclose(got[s], ref(xq[s]), rtol=1e-8, atol=1e-8)
+
+
+def test_fit_parametric_ragged_matches_per_stroke():
+    rng = np.random.default_rng(4)
+    lengths = [2, 3, 4, 6, 25]
+    strokes = RaggedStrokes.from_list([rng.normal(0, 1, (n, 2)).cumsum(axis=0)
+                                       for n in lengths])
+    n_dense, degree = 30, 5
+    spline_x, spline_y, x_poly, y_poly = fit_parametric_ragged(strokes, n_dense, degree)
+    t_all = arc_length_param(strokes)
+    t_dense = np.linspace(0, 1, n_dense)
+    t_q = np.broadcast_to(t_dense, (len(strokes), n_dense))
+    xs, ys = spline_x(t_q), spline_y(t_q)
+    for s, n in enumerate(lengths):
+        pts = strokes[s]
+        t = t_all[strokes.offsets[s]:strokes.offsets[s + 1]]
+        assert t[0] == 0 and t[-1] == 1
+        deg = degree if n >= degree + 1 else min(3, n - 1)
+        for j, (curve, bptt) in enumerate([(xs, x_poly), (ys, y_poly)]):
+            if n < 4:
+                ref = np.interp(t_dense, t, pts[:, j])
+            else:
+                ref = CubicSpline(t, pts[:, j])(t_dense)
+            np.testing.assert_allclose(curve[s], ref, rtol=1e-12, atol=1e-12)
+            fit = np.polynomial.Polynomial.fit(t, pts[:, j], deg)
+            np.testing.assert_allclose(bptt[s], fit(t_dense), rtol=1e-8, atol=1e-8)
+
+
+def test_dedupe_x_offsets():
+    strokes = RaggedStrokes.from_list([
+        [[2, 0], [1, 1], [2, 5], [1, 3], [0, 7]],
+        np.empty((0, 2)),
+        [[4, 4]],
+        [[3, 1], [3, 2]],
+    ])
+    out = dedupe_x(strokes)
+    np.testing.assert_array_equal(out.offsets, [0, 3, 3, 4, 5])
+    np.testing.assert_array_equal(out[0], [[0, 7], [1, 1], [2, 0]])
+    np.testing.assert_array_equal(out[2], [[4, 4]])
+    np.testing.assert_array_equal(out[3], [[3, 1]])
+
+
+def test_drop_repeats_offsets():
+    strokes = RaggedStrokes.from_list([
+        [[0, 0], [0, 0], [1, 0], [1, 0], [1, 0]],
+        np.empty((0, 2)),
+        # Điểm đầu trùng điểm cuối nét trước vẫn được giữ
+        [[1, 0], [2, 2], [1, 0]],
+        [[5, 5], [5, 5]],
+    ])
+    out = drop_repeats(strokes)
+    np.testing.assert_array_equal(out.offsets, [0, 2, 2, 5, 6])
+    np.testing.assert_array_equal(out[0], [[0, 0], [1, 0]])
+    np.testing.assert_array_equal(out[2], [[1, 0], [2, 2], [1, 0]])
+    np.testing.assert_array_equal(out[3], [[5, 5]])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from smoothing.image_pipeline import largest_contour
+from smoothing.tiled_contour import largest_contour_tiled
+
+
+def _image(seed):
+    rng = np.random.default_rng(seed)
+    img = np.full((700, 500), 255, np.uint8)
+    for _ in range(5):
+        pts = np.cumsum(rng.normal(0, 30, (30, 2)), axis=0) + rng.uniform(100, 500, 2)
+        cv2.polylines(img, [pts.astype(np.int32)], False, 0, int(rng.integers(1, 5)))
+    # Vòng kín có nét bên trong lỗ (không phải biên ngoài) và đốm nhiễu
+    cv2.circle(img, (250, 350), 90, 0, 2)
+    cv2.circle(img, (250, 350), 20, 0, 1)
+    img[rng.integers(0, 700, 50), rng.integers(0, 500, 50)] = 0
+    return img
+
+
+@pytest.mark.parametrize('ext', ['.npy', '.pgm', '.bmp', '.png'])
+@pytest.mark.parametrize('strip_rows', [7, 64, 1024])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_tiled_matches_in_memory(tmp_path, ext, strip_rows, seed):
+    img = _image(seed)
+    path = str(tmp_path / f'img{ext}')
+    if ext == '.npy':
+        np.save(path, img)
+    else:
+        cv2.imwrite(path, img)
+    expected = largest_contour(img)
+    if ext == '.png':
+        # PNG phải giải mã toàn bộ: có cảnh báo, kết quả vẫn đúng
+        with pytest.warns(RuntimeWarning, match='giải mã toàn bộ'):
+            contour, height = largest_contour_tiled(path, strip_rows=strip_rows)
+    else:
+        contour, height = largest_contour_tiled(path, strip_rows=strip_rows)
+    assert height == img.shape[0]
+    np.testing.assert_array_equal(contour, expected)
+
+
+def test_compressed_format_without_full_decode(tmp_path):
+    path = str(tmp_path / 'img.png')
+    cv2.imwrite(path, _image(0))
+    with pytest.raises(ValueError, match='theo dải'):
+        largest_contour_tiled(path, full_decode=False)
+
+
+def test_candidates_skip_nested_components(tmp_path):
+    # Chín đường răng cưa trong lỗ của một vòng tròn, mỗi đường có nhiều
+    # điểm biên hơn vòng tròn: cần duyệt quá 8 thành phần đầu mới gặp biên ngoài
+    img = np.full((600, 600), 255, np.uint8)
+    cv2.circle(img, (300, 300), 230, 0, 1)
+    for gx in range(3):
+        for gy in range(3):
+            x0, y0 = 170 + gx * 90, 170 + gy * 90
+            pts = [[x0 + 3 * (i // 2), y0 + 70 * (((i + 1) // 2) % 2)] for i in range(48)]
+            cv2.polylines(img, [np.array(pts, np.int32)], False, 0, 1)
+    path = str(tmp_path / 'nested.npy')
+    np.save(path, img)
+    contour, _ = largest_contour_tiled(path, strip_rows=64, candidates=8)
+    np.testing.assert_array_equal(contour, largest_contour(img))
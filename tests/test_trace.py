@@ -0,0 +1,29 @@
+from smoothing import trace
+
+
+def test_enable_from_env_bounds_events(monkeypatch, tmp_path):
+    monkeypatch.setenv('SMOOTHING_TRACE', str(tmp_path / 'trace.json'))
+    monkeypatch.setenv('SMOOTHING_TRACE_MAX_EVENTS', '5')
+    monkeypatch.setattr(trace.atexit, 'register', lambda fn: None)
+    try:
+        assert trace.enable_from_env()
+        for i in range(20):
+            with trace.stage('step', points_in=i):
+                pass
+        events = trace.collect()
+        assert [e['points_in'] for e in events] == list(range(15, 20))
+    finally:
+        trace.disable()
+        trace.collect()
+
+
+def test_enable_from_env_default_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setenv('SMOOTHING_TRACE', str(tmp_path / 'trace.json'))
+    monkeypatch.delenv('SMOOTHING_TRACE_MAX_EVENTS', raising=False)
+    monkeypatch.setattr(trace.atexit, 'register', lambda fn: None)
+    try:
+        trace.enable_from_env()
+        assert trace._events.maxlen == trace.DEFAULT_MAX_EVENTS
+    finally:
+        trace.disable()
+        trace.collect()